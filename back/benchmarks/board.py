@@ -0,0 +1,108 @@
+"""
+Benchmark of the project board query on a project with many tasks.
+
+Runs against the test database from .env.dev:
+    python -m benchmarks.board --tasks 50000 --rounds 200
+"""
+import argparse
+import asyncio
+import random
+import uuid
+from sqlalchemy import delete, insert
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+from benchmarks.utils import get_test_engine, measure, print_table
+from src.apps.auth.models import User
+from src.apps.crm.models import (
+    Department,
+    Employee,
+    Project,
+    Task,
+    TaskPriority,
+    TaskStatus,
+    task_employee,
+    task_project,
+)
+from src.apps.crm.repositories import ProjectRepository
+from src.db.base_db import Base
+
+PREFIX = "bench-board-"
+CHUNK_SIZE = 5000
+
+
+async def main(tasks: int, rounds: int) -> None:
+    engine = get_test_engine()
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    session_maker = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+    user_id, department_id, employee_id, project_id = uuid.uuid4(), uuid.uuid4(), uuid.uuid4(), uuid.uuid4()
+    statuses, priorities = list(TaskStatus), list(TaskPriority)
+    rows = [
+        {
+            "id": uuid.uuid4(),
+            "title": f"{PREFIX}{i}",
+            "status": random.choice(statuses),
+            "priority": random.choice(priorities),
+            "author_id": employee_id,
+        }
+        for i in range(tasks)
+    ]
+    async with engine.begin() as conn:
+        await conn.execute(insert(User).values(id=user_id, email=f"{PREFIX}user", password="-"))
+        await conn.execute(insert(Department).values(id=department_id, title=f"{PREFIX}department"))
+        await conn.execute(
+            insert(Employee).values(
+                id=employee_id,
+                family="Bench",
+                name="Bench",
+                surname="Bench",
+                phone="000000000000",
+                department_id=department_id,
+                user_id=user_id,
+            )
+        )
+        await conn.execute(insert(Project).values(id=project_id, title=f"{PREFIX}project"))
+        for start in range(0, tasks, CHUNK_SIZE):
+            end = start + CHUNK_SIZE
+            await conn.execute(insert(Task), rows[start:end])
+            await conn.execute(
+                insert(task_project),
+                [{"task_id": row["id"], "project_id": project_id, "status": row["status"]} for row in rows[start:end]],
+            )
+            await conn.execute(
+                insert(task_employee),
+                [{"task_id": row["id"], "employee_id": employee_id} for row in rows[start:end:10]],
+            )
+    # visibility map of the new rows for the index only scans, like after autovacuum
+    async with engine.connect() as conn:
+        await conn.execution_options(isolation_level="AUTOCOMMIT")
+        await conn.exec_driver_sql("VACUUM ANALYZE task, task_project, task_employee")
+
+    async def board(offset: int = 0, **filters) -> None:
+        async with session_maker() as session:
+            await ProjectRepository(session).get_board(project_id, offset, 20, **filters)
+
+    try:
+        results = {
+            "board": await measure(lambda i: board(), rounds),
+            "board, page 10": await measure(lambda i: board(200), rounds),
+            "board, priority": await measure(lambda i: board(priority=TaskPriority.height), rounds),
+            "board, assignee": await measure(lambda i: board(employee_id=employee_id), rounds),
+            "one column": await measure(lambda i: board(task_status=TaskStatus.doing), rounds),
+        }
+        print_table(f"get_board, {tasks} tasks, {rounds} rounds", results)
+    finally:
+        async with engine.begin() as conn:
+            await conn.execute(delete(Task).where(Task.title.startswith(PREFIX)))
+            await conn.execute(delete(Project).where(Project.id == project_id))
+            await conn.execute(delete(Employee).where(Employee.id == employee_id))
+            await conn.execute(delete(Department).where(Department.id == department_id))
+            await conn.execute(delete(User).where(User.id == user_id))
+        await engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--tasks", type=int, default=50000)
+    parser.add_argument("--rounds", type=int, default=200)
+    args = parser.parse_args()
+    asyncio.run(main(args.tasks, args.rounds))
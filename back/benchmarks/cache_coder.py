@@ -0,0 +1,108 @@
+"""
+Benchmark of the cache coders on a page of tasks with their projects and employees,
+dumped by the response model like the cached GET /tasks response. Doesn't need the database:
+    python -m benchmarks.cache_coder --tasks 100 --rounds 200
+"""
+import argparse
+import asyncio
+import datetime
+import random
+import uuid
+from typing import List
+from fastapi_cache.coder import JsonCoder
+from sqlalchemy.orm.attributes import set_committed_value
+from benchmarks.utils import measure, print_table
+from src.apps.auth.models import User, UserPermission
+from src.apps.crm.models import Employee, Project, Task, TaskPriority, TaskStatus
+from src.apps.crm.schemas import TaskRead
+from src.base_utils.base_pagination import CursorPage
+from src.cache.coders import CODERS, get_coder
+from src.cache.decorator import dump_response
+
+COMPRESSIONS = ("zlib", "zstd", "lz4")
+
+
+def make_tasks(count: int) -> List[Task]:
+    """
+    Tasks loaded like TASK_READ_OPTIONS load them
+    :param count: count of the tasks
+    :return: list of the tasks
+    """
+    employees = []
+    for i in range(20):
+        user = User(id=uuid.uuid4(), email=f"employee{i}@example.com", permission=UserPermission.user)
+        employee = Employee(
+            id=uuid.uuid4(),
+            name="Name",
+            family="Family",
+            surname="Surname",
+            phone=f"{i:012d}",
+            user_id=user.id,
+            department_id=uuid.uuid4(),
+        )
+        set_committed_value(employee, "user", user)
+        employees.append(employee)
+    projects = [
+        Project(id=uuid.uuid4(), title=f"Project{i}", description="Project description " * 5, is_active=True)
+        for i in range(10)
+    ]
+    tasks = []
+    for i in range(count):
+        task = Task(
+            id=uuid.uuid4(),
+            title=f"Task{i}",
+            description="Task description " * 10,
+            status=random.choice(list(TaskStatus)),
+            priority=random.choice(list(TaskPriority)),
+            end=datetime.date.today(),
+            is_active=True,
+            author_id=employees[0].id,
+        )
+        # without backrefs, like the loaded tasks
+        set_committed_value(task, "projects", random.sample(projects, 2))
+        set_committed_value(task, "employees", random.sample(employees, 3))
+        tasks.append(task)
+    return tasks
+
+
+async def main(tasks: int, rounds: int, threshold: int, level: int) -> None:
+    page = dump_response({"items": make_tasks(tasks), "next_cursor": None}, CursorPage[TaskRead])
+    coders = {"json (current)": JsonCoder}
+    for name, coder in CODERS.items():
+        if coder is None or coder is JsonCoder:
+            continue
+        coders[name] = coder
+        for compression in COMPRESSIONS:
+            try:
+                coders[f"{name}+{compression}"] = get_coder(name, compression, threshold, level)
+            except ValueError:
+                continue
+
+    results = {}
+    for name, coder in coders.items():
+        encoded = coder.encode(page)
+
+        async def encode(_: int) -> None:
+            coder.encode(page)
+
+        async def decode(_: int) -> None:
+            coder.decode(encoded)
+
+        encode_res = await measure(encode, rounds)
+        decode_res = await measure(decode, rounds)
+        results[name] = {
+            "bytes": len(encoded),
+            "encode_p50_ms": encode_res["p50_ms"],
+            "decode_p50_ms": decode_res["p50_ms"],
+        }
+    print_table(f"cache coders, {tasks} tasks, threshold {threshold}, level {level}, {rounds} rounds", results)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--tasks", type=int, default=100)
+    parser.add_argument("--rounds", type=int, default=200)
+    parser.add_argument("--threshold", type=int, default=1024)
+    parser.add_argument("--level", type=int, default=1)
+    args = parser.parse_args()
+    asyncio.run(main(args.tasks, args.rounds, args.threshold, args.level))
@@ -0,0 +1,74 @@
+"""
+Benchmark of the event loop stalls during a burst of logins. A probe coroutine, standing in
+for the /tasks requests of the same worker, measures how late the loop wakes it up while
+bcrypt verifications run inline or in the hashing pool. Doesn't need the database:
+    python -m benchmarks.login_burst --logins 20 --workers 2
+"""
+import argparse
+import asyncio
+import time
+from typing import Awaitable, Callable, Dict, List
+from benchmarks.utils import print_table
+from src.apps.auth.hashing import HashingPool
+from src.apps.auth.utils import pwd_context
+
+PROBE_INTERVAL = 0.005
+
+
+async def measure_lag(burst: Callable[[], Awaitable]) -> Dict[str, float]:
+    """
+    Run the burst and collect the delays of the probe wake ups
+    :param burst: async function with the logins
+    :return: dictionary with delays in milliseconds
+    """
+    delays: List[float] = []
+    done = asyncio.Event()
+
+    async def probe() -> None:
+        while not done.is_set():
+            start = time.perf_counter()
+            await asyncio.sleep(PROBE_INTERVAL)
+            delays.append((time.perf_counter() - start - PROBE_INTERVAL) * 1000)
+
+    task = asyncio.create_task(probe())
+    start = time.perf_counter()
+    await burst()
+    elapsed = time.perf_counter() - start
+    done.set()
+    await task
+    delays.sort()
+    return {
+        "burst_s": round(elapsed, 3),
+        "lag_p50_ms": round(delays[len(delays) // 2], 3),
+        "lag_p99_ms": round(delays[int(len(delays) * 0.99) - 1], 3),
+        "lag_max_ms": round(delays[-1], 3),
+    }
+
+
+async def main(logins: int, workers: int) -> None:
+    hashed = pwd_context.hash("password")
+    pool = HashingPool(workers, max_pending=logins)
+
+    async def inline_login() -> None:
+        pwd_context.verify("password", hashed)
+
+    async def inline() -> None:
+        await asyncio.gather(*[inline_login() for _ in range(logins)])
+
+    async def pooled() -> None:
+        await asyncio.gather(*[pool.run(pwd_context.verify, "password", hashed) for _ in range(logins)])
+
+    try:
+        results = {"inline (before)": await measure_lag(inline), f"pool of {workers}": await measure_lag(pooled)}
+        print_table(f"login burst, {logins} logins", results)
+        print(f"  {'pool':<32} " + "  ".join(f"{key}={value}" for key, value in pool.as_dict().items()))
+    finally:
+        pool.shutdown()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--logins", type=int, default=20)
+    parser.add_argument("--workers", type=int, default=2)
+    args = parser.parse_args()
+    asyncio.run(main(args.logins, args.workers))
@@ -0,0 +1,73 @@
+"""
+Benchmark of the upsert put_one against the previous get + add_one/edit_one path.
+
+Runs against the test database from .env.dev:
+    python -m benchmarks.put_one --rounds 500
+"""
+import argparse
+import asyncio
+import uuid
+from sqlalchemy import delete, select
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+from benchmarks.utils import get_test_engine, measure, print_table
+from src.apps.crm.models import Department
+from src.apps.crm.repositories import DepartmentRepository
+from src.apps.crm.schemas import DepartmentCreate
+from src.db.base_db import Base
+
+TITLE_PREFIX = "bench-put-"
+
+
+async def legacy_put_one(session: AsyncSession, self_id: uuid.UUID, data: DepartmentCreate) -> Department:
+    """
+    put_one as it was before the upsert: get, then add or select + setattr + refresh
+    """
+    res = await session.get(Department, self_id)
+    if not res:
+        res = Department(id=self_id, **data.model_dump())
+    else:
+        res = (await session.execute(select(Department).filter_by(id=self_id))).scalar_one()
+        for key, value in data.model_dump(exclude_unset=True).items():
+            setattr(res, key, value)
+    session.add(res)
+    await session.commit()
+    await session.refresh(res)
+    return res
+
+
+async def main(rounds: int) -> None:
+    engine = get_test_engine()
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    session_maker = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+    legacy_ids = [uuid.uuid4() for _ in range(rounds)]
+    upsert_ids = [uuid.uuid4() for _ in range(rounds)]
+
+    async def legacy(i: int, suffix: str) -> None:
+        async with session_maker() as session:
+            await legacy_put_one(session, legacy_ids[i], DepartmentCreate(title=f"{TITLE_PREFIX}legacy-{i}{suffix}"))
+
+    async def upsert(i: int, suffix: str) -> None:
+        async with session_maker() as session:
+            await DepartmentRepository(session).put_one(
+                upsert_ids[i], DepartmentCreate(title=f"{TITLE_PREFIX}upsert-{i}{suffix}")
+            )
+
+    try:
+        results = {
+            "legacy insert": await measure(lambda i: legacy(i, ""), rounds),
+            "upsert insert": await measure(lambda i: upsert(i, ""), rounds),
+            "legacy update": await measure(lambda i: legacy(i, "-changed"), rounds),
+            "upsert update": await measure(lambda i: upsert(i, "-changed"), rounds),
+        }
+        print_table(f"put_one, {rounds} rounds", results)
+    finally:
+        async with engine.begin() as conn:
+            await conn.execute(delete(Department).where(Department.title.startswith(TITLE_PREFIX)))
+        await engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rounds", type=int, default=500)
+    asyncio.run(main(parser.parse_args().rounds))
@@ -0,0 +1,87 @@
+"""
+Benchmark of the realtime fan out: one worker with many subscribed connections.
+
+Every connection is a consumer coroutine with its own queue, like the WebSocket and SSE
+handlers. Events go through a real NOTIFY on the test database from .env.dev and the
+dedicated LISTEN connection:
+    python -m benchmarks.realtime --connections 20000 --projects 200 --rounds 50
+"""
+import argparse
+import asyncio
+import json
+import os
+import tracemalloc
+from typing import Dict, Optional
+from sqlalchemy import func, select
+from benchmarks.utils import get_test_engine, measure, print_table
+from src.apps.realtime.hub import EventHub, EventListener
+
+CHANNEL = "bench_realtime"
+
+
+async def main(connections: int, projects: int, rounds: int, queue_size: int) -> None:
+    engine = get_test_engine()
+    dsn = engine.url.set(drivername="postgresql").render_as_string(hide_password=False)
+    hub = EventHub(queue_size)
+    listener = EventListener(dsn, CHANNEL, hub)
+    listener.start()
+    while not listener.listening:
+        await asyncio.sleep(0.01)
+
+    expected: Dict[str, int] = {}
+    received: Dict[str, int] = {}
+    done: Dict[str, asyncio.Event] = {}
+
+    async def consume(queue: asyncio.Queue) -> None:
+        while True:
+            payload = await queue.get()
+            seq = json.loads(payload).get("seq")
+            if seq not in received:
+                continue
+            received[seq] += 1
+            if received[seq] == expected[seq]:
+                done[seq].set()
+
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    consumers = []
+    for i in range(connections):
+        consumers.append(asyncio.create_task(consume(hub.subscribe(f"p{i % projects}"))))
+    await asyncio.sleep(0)
+    per_connection = (tracemalloc.get_traced_memory()[0] - before) / connections
+    tracemalloc.stop()
+
+    async def send(seq: str, project: Optional[str], recipients: int) -> None:
+        expected[seq], received[seq], done[seq] = recipients, 0, asyncio.Event()
+        payload = json.dumps({"entity": "task", "action": "update", "project": project, "seq": seq})
+        async with engine.begin() as conn:
+            await conn.execute(select(func.pg_notify(CHANNEL, payload)))
+        await done.pop(seq).wait()
+
+    project_size = len([i for i in range(connections) if i % projects == 0])
+    try:
+        results = {
+            "one project": await measure(lambda i: send(f"one-{i}", "p0", project_size), rounds),
+            "all projects": await measure(lambda i: send(f"all-{i}", None, connections), rounds),
+        }
+        print_table(
+            f"fan out, {connections} connections, {projects} projects, {rounds} rounds, "
+            f"{per_connection:.0f} bytes per connection, pid {os.getpid()}",
+            results,
+        )
+        print(f"  {'hub':<32} " + "  ".join(f"{key}={value}" for key, value in listener.as_dict().items()))
+    finally:
+        for consumer in consumers:
+            consumer.cancel()
+        await listener.stop()
+        await engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--connections", type=int, default=20000)
+    parser.add_argument("--projects", type=int, default=200)
+    parser.add_argument("--rounds", type=int, default=50)
+    parser.add_argument("--queue-size", type=int, default=100)
+    args = parser.parse_args()
+    asyncio.run(main(args.connections, args.projects, args.rounds, args.queue_size))
@@ -0,0 +1,52 @@
+import os
+import statistics
+import time
+from typing import Awaitable, Callable, Dict, List
+from dotenv import find_dotenv, load_dotenv
+from sqlalchemy.ext.asyncio import AsyncEngine, create_async_engine
+
+load_dotenv(find_dotenv(".env.dev"))
+
+
+def get_test_engine() -> AsyncEngine:
+    """
+    Engine for the test database from .env.dev
+    :return: async engine
+    """
+    user = os.environ.get("TEST_DB_USER")
+    password = os.environ.get("TEST_DB_PASS")
+    host = os.environ.get("TEST_DB_HOST")
+    name = os.environ.get("TEST_DB_NAME")
+    port = os.environ.get("TEST_DB_PORT")
+    return create_async_engine(f"postgresql+asyncpg://{user}:{password}@{host}:{port}/{name}")
+
+
+async def measure(func: Callable[[int], Awaitable], rounds: int) -> Dict[str, float]:
+    """
+    Run func(round) the given number of times and collect timings
+    :param func: async function for measure
+    :param rounds: count of runs
+    :return: dictionary with timings in milliseconds
+    """
+    timings: List[float] = []
+    for i in range(rounds):
+        start = time.perf_counter()
+        await func(i)
+        timings.append((time.perf_counter() - start) * 1000)
+    timings.sort()
+    return {
+        "mean_ms": round(statistics.mean(timings), 3),
+        "p50_ms": round(timings[len(timings) // 2], 3),
+        "p95_ms": round(timings[int(len(timings) * 0.95) - 1], 3),
+    }
+
+
+def print_table(title: str, rows: Dict[str, Dict[str, float]]) -> None:
+    """
+    Print benchmark results
+    :param title: benchmark title
+    :param rows: results by case name
+    """
+    print(title)
+    for name, res in rows.items():
+        print(f"  {name:<32} " + "  ".join(f"{key}={value}" for key, value in res.items()))
@@ -11,6 +11,77 @@ DB_PORT = os.environ.get("DB_PORT")
 
 DATABASE_URL = f"postgresql+asyncpg://{DB_USER}:{DB_PASS}@{DB_HOST}:{DB_PORT}/{DB_NAME}"
 
+DB_POOL_SIZE = int(os.environ.get("DB_POOL_SIZE", 10))
+DB_POOL_MAX_OVERFLOW = int(os.environ.get("DB_POOL_MAX_OVERFLOW", 10))
+DB_POOL_TIMEOUT = float(os.environ.get("DB_POOL_TIMEOUT", 30))
+DB_POOL_RECYCLE = int(os.environ.get("DB_POOL_RECYCLE", 1800))
+DB_POOL_PRE_PING = os.environ.get("DB_POOL_PRE_PING", "true").lower() == "true"
+DB_POOL_MIN_SIZE = int(os.environ.get("DB_POOL_MIN_SIZE", 2))
+
+DB_REPLICA_HOST = os.environ.get("DB_REPLICA_HOST")
+DB_REPLICA_PORT = os.environ.get("DB_REPLICA_PORT", DB_PORT)
+REPLICA_DATABASE_URL = (
+    f"postgresql+asyncpg://{DB_USER}:{DB_PASS}@{DB_REPLICA_HOST}:{DB_REPLICA_PORT}/{DB_NAME}"
+    if DB_REPLICA_HOST
+    else None
+)
+DB_REPLICA_MAX_LAG_SECONDS = float(os.environ.get("DB_REPLICA_MAX_LAG_SECONDS", 5))
+DB_REPLICA_CHECK_INTERVAL_SECONDS = float(os.environ.get("DB_REPLICA_CHECK_INTERVAL_SECONDS", 5))
+DB_READ_YOUR_WRITES_SECONDS = float(os.environ.get("DB_READ_YOUR_WRITES_SECONDS", 5))
+# recent writes of the principals are kept in Redis under this prefix
+READ_YOUR_WRITES_PREFIX = os.environ.get("READ_YOUR_WRITES_PREFIX", "recent_writes")
+
+# plain asyncpg DSN of the dedicated LISTEN connection
+LISTEN_DATABASE_URL = f"postgresql://{DB_USER}:{DB_PASS}@{DB_HOST}:{DB_PORT}/{DB_NAME}"
+REALTIME_CHANNEL = os.environ.get("REALTIME_CHANNEL", "crm_events")
+REALTIME_QUEUE_SIZE = int(os.environ.get("REALTIME_QUEUE_SIZE", 100))
+REALTIME_HEARTBEAT_SECONDS = float(os.environ.get("REALTIME_HEARTBEAT_SECONDS", 25))
+
+# bcrypt runs in this count of threads, logins over the pending limit get 503
+PASSWORD_HASH_WORKERS = int(os.environ.get("PASSWORD_HASH_WORKERS", 2))
+PASSWORD_HASH_MAX_PENDING = int(os.environ.get("PASSWORD_HASH_MAX_PENDING", 64))
+
+# claims of the verified jwt tokens, a repeated token skips the signature check
+JWT_CLAIMS_CACHE_MAX_SIZE = int(os.environ.get("JWT_CLAIMS_CACHE_MAX_SIZE", 10000))
+
+# users of the access tokens are reused for this time without query
+PRINCIPAL_CACHE_TTL_SECONDS = float(os.environ.get("PRINCIPAL_CACHE_TTL_SECONDS", 30))
+PRINCIPAL_CACHE_MAX_SIZE = int(os.environ.get("PRINCIPAL_CACHE_MAX_SIZE", 10000))
+# changes of the users are broadcast to the principal caches of all the workers by this channel
+PRINCIPAL_CHANNEL = os.environ.get("PRINCIPAL_CHANNEL", "principal_evictions")
+
+REDIS_URL = os.environ.get("REDIS_URL", "redis://localhost")
+REDIS_POOL_SIZE = int(os.environ.get("REDIS_POOL_SIZE", 50))
+# waiting for a free connection of the pool
+REDIS_POOL_TIMEOUT_SECONDS = float(os.environ.get("REDIS_POOL_TIMEOUT_SECONDS", 0.2))
+REDIS_SOCKET_TIMEOUT_SECONDS = float(os.environ.get("REDIS_SOCKET_TIMEOUT_SECONDS", 0.2))
+REDIS_CONNECT_TIMEOUT_SECONDS = float(os.environ.get("REDIS_CONNECT_TIMEOUT_SECONDS", 0.2))
+REDIS_HEALTH_CHECK_INTERVAL_SECONDS = int(os.environ.get("REDIS_HEALTH_CHECK_INTERVAL_SECONDS", 30))
+# the cache is skipped after this count of Redis failures in a row and probed again every reset interval
+CACHE_BREAKER_MAX_FAILURES = int(os.environ.get("CACHE_BREAKER_MAX_FAILURES", 5))
+CACHE_BREAKER_RESET_SECONDS = float(os.environ.get("CACHE_BREAKER_RESET_SECONDS", 5))
+
+CACHE_EXPIRE_SECONDS = int(os.environ.get("CACHE_EXPIRE_SECONDS", 300))
+CACHE_TAG_EXPIRE_SECONDS = int(os.environ.get("CACHE_TAG_EXPIRE_SECONDS", 3600))
+# expired responses are served for this time while one request refreshes them
+CACHE_STALE_SECONDS = int(os.environ.get("CACHE_STALE_SECONDS", 60))
+# one worker recomputes a missed key, others wait for it up to CACHE_LOCK_WAIT_SECONDS
+CACHE_LOCK_TIMEOUT_SECONDS = float(os.environ.get("CACHE_LOCK_TIMEOUT_SECONDS", 10))
+CACHE_LOCK_WAIT_SECONDS = float(os.environ.get("CACHE_LOCK_WAIT_SECONDS", 2))
+# json, orjson or msgpack; payloads longer than the threshold are compressed by zlib, zstd or lz4
+CACHE_CODER = os.environ.get("CACHE_CODER", "orjson")
+CACHE_COMPRESSION = os.environ.get("CACHE_COMPRESSION", "zlib")
+CACHE_COMPRESSION_THRESHOLD = int(os.environ.get("CACHE_COMPRESSION_THRESHOLD", 1024))
+CACHE_COMPRESSION_LEVEL = int(os.environ.get("CACHE_COMPRESSION_LEVEL", 1))
+# in-process tier in front of Redis, invalidated by the workers over pub/sub
+CACHE_LOCAL_TTL_SECONDS = float(os.environ.get("CACHE_LOCAL_TTL_SECONDS", 30))
+CACHE_LOCAL_MAX_ENTRIES = int(os.environ.get("CACHE_LOCAL_MAX_ENTRIES", 1000))
+CACHE_LOCAL_MAX_BYTES = int(os.environ.get("CACHE_LOCAL_MAX_BYTES", 64 * 1024 * 1024))
+CACHE_INVALIDATION_CHANNEL = os.environ.get("CACHE_INVALIDATION_CHANNEL", "cache_invalidation")
+
+TASK_RANK_MAX_LENGTH = int(os.environ.get("TASK_RANK_MAX_LENGTH", 32))
+TASK_RANK_REBALANCE_INTERVAL_SECONDS = float(os.environ.get("TASK_RANK_REBALANCE_INTERVAL_SECONDS", 3600))
+
 POSTGRES_DB = os.environ.get("POSTGRES_DB")
 POSTGRES_USER = os.environ.get("POSTGRES_USER")
 POSTGRES_PASSWORD = os.environ.get("POSTGRES_PASSWORD")
@@ -26,3 +97,13 @@ JWT_SECRET_KEY = os.environ.get("JWT_SECRET_KEY")
 JWT_ALGORITHM = os.environ.get("JWT_ALGORITHM")
 JWT_ACCESS_TOKEN_EXP_DAYS = float(os.environ.get("JWT_ACCESS_TOKEN_EXP_DAYS"))
 JWT_REFRESH_TOKEN_EXP_DAYS = float(os.environ.get("JWT_REFRESH_TOKEN_EXP_DAYS"))
+# families of the refresh tokens are kept in Redis under this prefix
+REFRESH_TOKEN_PREFIX = os.environ.get("REFRESH_TOKEN_PREFIX", "refresh")
+# access tokens with id, permission and version of the user, authorized without database
+JWT_STATELESS = os.environ.get("JWT_STATELESS", "false").lower() == "true"
+JWT_STATELESS_ALGORITHM = os.environ.get("JWT_STATELESS_ALGORITHM", "ES256")
+# the private key signs the stateless tokens, its id goes to the kid header
+JWT_PRIVATE_KEY_FILE = os.environ.get("JWT_PRIVATE_KEY_FILE")
+JWT_KEY_ID = os.environ.get("JWT_KEY_ID")
+# <kid>.pem public keys accepted by the verification, the previous key is kept until its tokens expire
+JWT_PUBLIC_KEYS_DIR = os.environ.get("JWT_PUBLIC_KEYS_DIR")
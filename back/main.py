@@ -1,13 +1,54 @@
-from fastapi import FastAPI
+import asyncio
+from fastapi import FastAPI, Request
 from fastapi_cache import FastAPICache
-from fastapi_cache.backends.redis import RedisBackend
 from sqladmin import Admin
 from fastapi.middleware.cors import CORSMiddleware
 from redis import asyncio as aioredis
 from src.apps.apps_routers import apps_routers
 from src.apps.sqladmin.admin_auth import authentication_backend
 from src.apps.sqladmin.routers import admin_routers
-from src.db.base_db import engine
+from config import (
+    CACHE_BREAKER_MAX_FAILURES,
+    CACHE_BREAKER_RESET_SECONDS,
+    CACHE_CODER,
+    CACHE_COMPRESSION,
+    CACHE_COMPRESSION_LEVEL,
+    CACHE_COMPRESSION_THRESHOLD,
+    CACHE_INVALIDATION_CHANNEL,
+    CACHE_LOCAL_MAX_BYTES,
+    CACHE_LOCAL_MAX_ENTRIES,
+    CACHE_LOCAL_TTL_SECONDS,
+    CACHE_TAG_EXPIRE_SECONDS,
+    DB_POOL_MIN_SIZE,
+    DB_REPLICA_CHECK_INTERVAL_SECONDS,
+    DB_REPLICA_MAX_LAG_SECONDS,
+    JWT_STATELESS,
+    PRINCIPAL_CHANNEL,
+    REDIS_CONNECT_TIMEOUT_SECONDS,
+    REDIS_HEALTH_CHECK_INTERVAL_SECONDS,
+    REDIS_POOL_SIZE,
+    REDIS_POOL_TIMEOUT_SECONDS,
+    REDIS_SOCKET_TIMEOUT_SECONDS,
+    REDIS_URL,
+    TASK_RANK_MAX_LENGTH,
+    TASK_RANK_REBALANCE_INTERVAL_SECONDS,
+)
+from src.apps.auth.hashing import hashing_pool
+from src.apps.auth.keys import signing_keys
+from src.apps.auth.principals import principal_cache
+from src.apps.auth.refresh import refresh_tokens
+from src.apps.auth.versions import user_versions
+from src.apps.crm.rebalance import rebalance_task_ranks_forever
+from src.apps.realtime.hub import event_listener
+from src.cache.backend import TwoTierBackend
+from src.cache.breaker import CircuitBreaker
+from src.cache.coders import get_coder
+from src.cache.keys import request_key_builder
+from src.cache.local import LocalCache
+from src.cache.stats import CACHE_STATUS_HEADER, cache_stats
+from src.db.base_db import engine, replica_engine, recent_writes
+from src.db.pool import warm_up_pool
+from src.db.replica import get_principal_key
 
 
 app = FastAPI(title="Kanban API", summary="API for Kanban task manager", version="1.0")
@@ -34,7 +75,76 @@ for router in apps_routers:
     app.include_router(router)
 
 
+@app.middleware("http")
+async def remember_writes(request: Request, call_next):
+    response = await call_next(request)
+    if request.method in ("POST", "PATCH", "PUT", "DELETE") and response.status_code < 400:
+        principal_key = get_principal_key(request)
+        if principal_key:
+            await recent_writes.touch(principal_key)
+    return response
+
+
+@app.middleware("http")
+async def count_cache_hits(request: Request, call_next):
+    response = await call_next(request)
+    route = request.scope.get("route")
+    if route is not None:
+        cache_stats.add(route.path, response.headers.get(CACHE_STATUS_HEADER))
+    return response
+
+
 @app.on_event("startup")
 async def startup():
-    redis = aioredis.from_url("redis://localhost", encoding="utf8", decode_responses=True)
-    FastAPICache.init(RedisBackend(redis), prefix="fastapi-cache")
+    # the payloads are binary, they are not decoded as text
+    redis_pool = aioredis.BlockingConnectionPool.from_url(
+        REDIS_URL,
+        max_connections=REDIS_POOL_SIZE,
+        timeout=REDIS_POOL_TIMEOUT_SECONDS,
+        socket_timeout=REDIS_SOCKET_TIMEOUT_SECONDS,
+        socket_connect_timeout=REDIS_CONNECT_TIMEOUT_SECONDS,
+        health_check_interval=REDIS_HEALTH_CHECK_INTERVAL_SECONDS,
+    )
+    local_cache = LocalCache(CACHE_LOCAL_TTL_SECONDS, CACHE_LOCAL_MAX_ENTRIES, CACHE_LOCAL_MAX_BYTES)
+    app.state.cache_backend = TwoTierBackend(
+        aioredis.Redis(connection_pool=redis_pool),
+        CACHE_TAG_EXPIRE_SECONDS,
+        local_cache,
+        CACHE_INVALIDATION_CHANNEL,
+        CircuitBreaker(CACHE_BREAKER_MAX_FAILURES, CACHE_BREAKER_RESET_SECONDS),
+        # the replica is checked once per interval, it can lag up to the max lag after the check
+        replica_window=DB_REPLICA_MAX_LAG_SECONDS + DB_REPLICA_CHECK_INTERVAL_SECONDS if replica_engine else 0,
+    )
+    app.state.cache_backend.start()
+    refresh_tokens.init(app.state.cache_backend.redis)
+    recent_writes.init(app.state.cache_backend.redis, app.state.cache_backend.breaker)
+    FastAPICache.init(
+        app.state.cache_backend,
+        prefix="fastapi-cache",
+        coder=get_coder(CACHE_CODER, CACHE_COMPRESSION, CACHE_COMPRESSION_THRESHOLD, CACHE_COMPRESSION_LEVEL),
+        key_builder=request_key_builder,
+        cache_status_header=CACHE_STATUS_HEADER,
+    )
+    await warm_up_pool(engine, DB_POOL_MIN_SIZE)
+    if replica_engine:
+        await warm_up_pool(replica_engine, DB_POOL_MIN_SIZE)
+    event_listener.add_channel(PRINCIPAL_CHANNEL, principal_cache.on_notify, principal_cache.clear)
+    if JWT_STATELESS:
+        signing_keys.load()
+        event_listener.add_channel(PRINCIPAL_CHANNEL, user_versions.on_notify, user_versions.resync)
+    event_listener.start()
+    app.state.rank_rebalance = asyncio.create_task(
+        rebalance_task_ranks_forever(TASK_RANK_REBALANCE_INTERVAL_SECONDS, TASK_RANK_MAX_LENGTH)
+    )
+
+
+@app.on_event("shutdown")
+async def shutdown():
+    app.state.rank_rebalance.cancel()
+    await event_listener.stop()
+    await app.state.cache_backend.stop()
+    await app.state.cache_backend.redis.connection_pool.disconnect()
+    hashing_pool.shutdown()
+    await engine.dispose()
+    if replica_engine:
+        await replica_engine.dispose()
@@ -6,6 +6,13 @@ from src.apps.crm.routers.employees import router as router_crm_employee
 from src.apps.crm.routers.photos import router as router_crm_photo
 from src.apps.crm.routers.projects import router as router_crm_project
 from src.apps.crm.routers.tasks import router as router_crm_task
+from src.apps.crm.routers.sync import router as router_crm_sync
+
+from src.apps.monitoring.routers.auth import router as router_monitoring_auth
+from src.apps.monitoring.routers.cache import router as router_monitoring_cache
+from src.apps.monitoring.routers.db import router as router_monitoring_db
+
+from src.apps.realtime.routers.events import router as router_realtime_events
 
 apps_routers = [
     router_auth_auth,
@@ -15,4 +22,9 @@ apps_routers = [
     router_crm_photo,
     router_crm_project,
     router_crm_task,
+    router_crm_sync,
+    router_monitoring_auth,
+    router_monitoring_cache,
+    router_monitoring_db,
+    router_realtime_events,
 ]
@@ -0,0 +1,56 @@
+import hashlib
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+from config import JWT_CLAIMS_CACHE_MAX_SIZE
+
+
+class ClaimsCache:
+    """
+    Per worker LRU of the verified jwt claims by hash of the token.
+    Entries expire at the exp of their tokens, a repeated token skips the signature check
+    """
+
+    def __init__(self, max_size: int):
+        self.max_size = max_size
+        self._items: OrderedDict[bytes, Tuple[float, Dict[str, Any]]] = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def _key(token: str) -> bytes:
+        return hashlib.sha256(token.encode()).digest()
+
+    def get(self, token: str) -> Optional[Dict[str, Any]]:
+        """
+        Get the claims of the token verified before
+        :param token: jwt token
+        :return: copy of the claims or None if the token wasn't verified or expired
+        """
+        key = self._key(token)
+        item = self._items.get(key)
+        if item is None or item[0] < time.time():
+            self.misses += 1
+            if item is not None:
+                del self._items[key]
+            return None
+        self.hits += 1
+        self._items.move_to_end(key)
+        return dict(item[1])
+
+    def set(self, token: str, claims: Dict[str, Any]) -> None:
+        """
+        Cache the claims of the verified token
+        :param token: jwt token
+        :param claims: decoded claims with exp
+        """
+        if self.max_size <= 0:
+            return
+        key = self._key(token)
+        self._items.pop(key, None)
+        self._items[key] = (claims["exp"], dict(claims))
+        while len(self._items) > self.max_size:
+            self._items.popitem(last=False)
+
+
+claims_cache = ClaimsCache(JWT_CLAIMS_CACHE_MAX_SIZE)
@@ -0,0 +1,81 @@
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Optional, TypeVar, Union
+from config import PASSWORD_HASH_MAX_PENDING, PASSWORD_HASH_WORKERS
+from src.base_utils.base_errors import ERROR_503_BUSY
+
+T = TypeVar("T")
+
+
+class HashingPool:
+    """
+    Thread pool for the password hashing and verification out of the event loop.
+    bcrypt releases the GIL, so the workers run in parallel with the loop.
+    Calls over the pending limit are rejected instead of waiting in the queue
+    """
+
+    def __init__(self, workers: int, max_pending: int):
+        self.workers = workers
+        self.max_pending = max_pending
+        self.pending = 0
+        self.calls = 0
+        self.rejected = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+        self.run_total = 0.0
+        self._executor: Optional[ThreadPoolExecutor] = None
+
+    async def run(self, func: Callable[..., T], *args) -> T:
+        """
+        Run the function in the pool
+        :param func: blocking function
+        :param args: arguments of the function
+        :return: result of the function
+        """
+        if self.pending >= self.max_pending:
+            self.rejected += 1
+            raise ERROR_503_BUSY
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(self.workers, thread_name_prefix="password-hashing")
+        self.pending += 1
+        submitted_at = time.perf_counter()
+        try:
+            started_at, res = await asyncio.get_running_loop().run_in_executor(self._executor, _timed, func, args)
+        finally:
+            self.pending -= 1
+        wait = started_at - submitted_at
+        self.calls += 1
+        self.wait_total += wait
+        self.wait_max = max(self.wait_max, wait)
+        self.run_total += time.perf_counter() - started_at
+        return res
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+            self._executor = None
+
+    def as_dict(self) -> Dict[str, Union[int, float]]:
+        """
+        Snapshot of the pool counters, waits are the times in the queue
+        :return: dictionary
+        """
+        return {
+            "workers": self.workers,
+            "max_pending": self.max_pending,
+            "pending": self.pending,
+            "calls": self.calls,
+            "rejected": self.rejected,
+            "wait_total_ms": round(self.wait_total * 1000, 3),
+            "wait_avg_ms": round(self.wait_total * 1000 / self.calls, 3) if self.calls else 0.0,
+            "wait_max_ms": round(self.wait_max * 1000, 3),
+            "run_avg_ms": round(self.run_total * 1000 / self.calls, 3) if self.calls else 0.0,
+        }
+
+
+def _timed(func: Callable[..., T], args: tuple) -> tuple:
+    return time.perf_counter(), func(*args)
+
+
+hashing_pool = HashingPool(PASSWORD_HASH_WORKERS, PASSWORD_HASH_MAX_PENDING)
@@ -0,0 +1,87 @@
+import os
+import time
+from typing import Any, Dict, List, Optional
+from jose import jwk, jwt, JWTError
+from config import JWT_KEY_ID, JWT_PRIVATE_KEY_FILE, JWT_PUBLIC_KEYS_DIR, JWT_STATELESS_ALGORITHM
+
+# public keys are read again for an unknown kid at most once per this time
+KEYS_RELOAD_INTERVAL = 10.0
+
+
+class SigningKeys:
+    """
+    Asymmetric keys of the stateless access tokens. Tokens are signed by the private key
+    with its id in the kid header, verification accepts every <kid>.pem public key of the directory.
+    Keys rotate without downtime: the new public key is added to all the nodes, then the private key
+    and its id are switched, the old public key is removed after its tokens expire.
+    Nodes which don't know the kid yet read the directory again
+    """
+
+    def __init__(
+        self, algorithm: str, private_key_file: Optional[str], key_id: Optional[str], public_keys_dir: Optional[str]
+    ):
+        self.algorithm = algorithm
+        self.private_key_file = private_key_file
+        self.key_id = key_id
+        self.public_keys_dir = public_keys_dir
+        self.private_key: Optional[str] = None
+        self.public_keys: Dict[str, str] = {}
+        self._loaded_at = 0.0
+
+    @property
+    def enabled(self) -> bool:
+        return self.private_key is not None
+
+    def load(self) -> None:
+        """
+        Read the private key and the public keys
+        """
+        with open(self.private_key_file) as file:
+            self.private_key = file.read()
+        self.load_public_keys()
+
+    def load_public_keys(self) -> None:
+        public_keys = {}
+        for name in os.listdir(self.public_keys_dir):
+            kid, ext = os.path.splitext(name)
+            if ext == ".pem":
+                with open(os.path.join(self.public_keys_dir, name)) as file:
+                    public_keys[kid] = file.read()
+        self.public_keys = public_keys
+        self._loaded_at = time.monotonic()
+
+    def sign(self, claims: Dict[str, Any]) -> str:
+        """
+        Sign the claims by the private key
+        :param claims: claims of the token
+        :return: jwt token with the kid header
+        """
+        return jwt.encode(claims, self.private_key, self.algorithm, headers={"kid": self.key_id})
+
+    def verify(self, token: str, kid: str) -> Dict[str, Any]:
+        """
+        Verify the token by the public key of its kid
+        :param token: jwt token
+        :param kid: id of the key from the unverified header
+        :return: claims
+        """
+        key = self.public_keys.get(kid)
+        if key is None and self.public_keys_dir and time.monotonic() - self._loaded_at >= KEYS_RELOAD_INTERVAL:
+            self.load_public_keys()
+            key = self.public_keys.get(kid)
+        if key is None:
+            raise JWTError("Unknown key id")
+        return jwt.decode(token, key, algorithms=[self.algorithm])
+
+    def jwks(self) -> Dict[str, List[Dict[str, str]]]:
+        """
+        Public keys in the JWK set format, for the proxies which verify the tokens
+        :return: dictionary
+        """
+        keys = []
+        for kid, key in self.public_keys.items():
+            keys.append({**jwk.construct(key, self.algorithm).to_dict(), "kid": kid, "use": "sig"})
+        return {"keys": keys}
+
+
+signing_keys = SigningKeys(JWT_STATELESS_ALGORITHM, JWT_PRIVATE_KEY_FILE, JWT_KEY_ID, JWT_PUBLIC_KEYS_DIR)
@@ -1,9 +1,9 @@
 import datetime
 import enum
 
-from sqlalchemy import String
+from sqlalchemy import BigInteger, String
 from sqlalchemy.orm import Mapped, mapped_column
-from src.db.base_db import Base
+from src.db.base_db import Base, CHANGE_ID
 
 
 class UserPermission(enum.Enum):
@@ -22,6 +22,8 @@ class User(Base):
     is_verify: Mapped[bool] = mapped_column(default=False)
     registration_date: Mapped[datetime.datetime] = mapped_column(default=datetime.datetime.utcnow)
     permission: Mapped[UserPermission] = mapped_column(default=UserPermission.none)
+    # transaction of the last change, for the delta sync of the employees
+    change_id: Mapped[int] = mapped_column(BigInteger, default=CHANGE_ID, onupdate=CHANGE_ID, index=True)
 
     def __str__(self):
         return self.email
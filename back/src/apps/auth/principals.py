@@ -0,0 +1,129 @@
+import json
+import time
+import uuid
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, Optional, Tuple
+from sqlalchemy import Text, cast, event, func, inspect, select
+from sqlalchemy.dialects.postgresql import ARRAY, UUID
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import make_transient_to_detached
+from config import PRINCIPAL_CACHE_MAX_SIZE, PRINCIPAL_CACHE_TTL_SECONDS, PRINCIPAL_CHANNEL
+from src.apps.auth.models import User
+
+# NOTIFY payloads are limited to 8000 bytes, evictions carry at most this count of ids
+EVICTION_IDS_CHUNK = 100
+
+
+class PrincipalCache:
+    """
+    Per worker TTL cache of the users of the access tokens by email.
+    Every get builds new detached exemplar, so requests don't share ORM state.
+    Changes of the users are broadcast to the caches of other workers by NOTIFY,
+    ttl bounds the staleness while the notifications are lost
+    """
+
+    def __init__(self, ttl: float, max_size: int):
+        self.ttl = ttl
+        self.max_size = max_size
+        self._items: OrderedDict[str, Tuple[float, Dict[str, Any]]] = OrderedDict()
+        self._emails: Dict[uuid.UUID, str] = {}
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, email: str) -> Optional[User]:
+        """
+        Get the user if it was cached less than ttl seconds ago
+        :param email: email of the user
+        :return: detached user or None
+        """
+        item = self._items.get(email)
+        if item is None or item[0] <= time.monotonic():
+            self.misses += 1
+            if item is not None:
+                self._pop(email)
+            return None
+        self.hits += 1
+        self._items.move_to_end(email)
+        user = User(**item[1])
+        make_transient_to_detached(user)
+        return user
+
+    def set(self, user: User) -> None:
+        """
+        Cache the loaded user
+        :param user: user with all the columns loaded
+        """
+        if self.ttl <= 0:
+            return
+        values = {attr.key: getattr(user, attr.key) for attr in inspect(User).column_attrs}
+        self._pop(user.email)
+        self._items[user.email] = (time.monotonic() + self.ttl, values)
+        self._emails[user.id] = user.email
+        while len(self._items) > self.max_size:
+            self._pop(next(iter(self._items)))
+
+    def evict(self, user_ids: Iterable[uuid.UUID]) -> None:
+        """
+        Remove the users from the cache
+        :param user_ids: uuids of the users
+        """
+        for user_id in user_ids:
+            email = self._emails.get(user_id)
+            if email is not None:
+                self._pop(email)
+
+    async def evict_on_commit(self, session: AsyncSession, user_ids: Iterable[uuid.UUID]) -> None:
+        """
+        Remove the users from the caches of all the workers after commit of the session,
+        so requests can't cache the old values again before the commit
+        :param session: async session with the changes of the users
+        :param user_ids: uuids of the users
+        """
+        user_ids = list(user_ids)
+        if user_ids:
+            event.listen(session.sync_session, "after_commit", lambda _: self.evict(user_ids), once=True)
+            await publish_evictions(session, user_ids)
+
+    def on_notify(self, payload: str) -> None:
+        """
+        Remove the users of the eviction notification from the cache
+        :param payload: json list of the [user uuid, version] pairs
+        """
+        try:
+            user_ids = [uuid.UUID(user_id) for user_id, _ in json.loads(payload)]
+        except (ValueError, TypeError):
+            return
+        self.evict(user_ids)
+
+    def clear(self) -> None:
+        """
+        Remove all the users, evictions could be lost
+        """
+        self._items.clear()
+        self._emails.clear()
+
+    def _pop(self, email: str) -> None:
+        item = self._items.pop(email, None)
+        if item is not None:
+            self._emails.pop(item[1]["id"], None)
+
+
+async def publish_evictions(session: AsyncSession, user_ids: Iterable[uuid.UUID]) -> None:
+    """
+    Publish evictions of the users with their new versions, one NOTIFY per chunk of the users.
+    Postgres delivers them on commit of the session
+    :param session: async session inside the write transaction
+    :param user_ids: uuids of the changed users
+    """
+    user_ids = list(dict.fromkeys(user_ids))
+    for start in range(0, len(user_ids), EVICTION_IDS_CHUNK):
+        ids = func.unnest(cast(user_ids[start:][:EVICTION_IDS_CHUNK], ARRAY(UUID))).table_valued("id").render_derived()
+        # version of the deleted users is null
+        payload = func.json_agg(func.json_build_array(ids.c.id, User.change_id))
+        stmt = select(func.pg_notify(PRINCIPAL_CHANNEL, cast(payload, Text))).select_from(
+            ids.outerjoin(User, User.id == ids.c.id)
+        )
+        await session.execute(stmt)
+
+
+principal_cache = PrincipalCache(PRINCIPAL_CACHE_TTL_SECONDS, PRINCIPAL_CACHE_MAX_SIZE)
@@ -0,0 +1,118 @@
+import asyncio
+import logging
+import uuid
+from typing import Iterable, Tuple
+from redis.exceptions import RedisError
+from config import JWT_REFRESH_TOKEN_EXP_DAYS, REFRESH_TOKEN_PREFIX
+from src.base_utils.base_errors import ERROR_401, ERROR_503_UNAVAILABLE
+
+logger = logging.getLogger(__name__)
+
+# replaces the current token of the family, a replaced token revokes the whole family
+ROTATE_SCRIPT = """
+local current = redis.call('GET', KEYS[1])
+if not current then
+    return 0
+end
+if current ~= ARGV[1] then
+    redis.call('DEL', KEYS[1])
+    redis.call('SREM', KEYS[2], ARGV[3])
+    return -1
+end
+redis.call('SET', KEYS[1], ARGV[2], 'EX', ARGV[4])
+redis.call('EXPIRE', KEYS[2], ARGV[4])
+return 1
+"""
+
+
+class RefreshTokenStore:
+    """
+    Families of the refresh tokens in Redis. A login starts a family, every refresh replaces
+    its current token. A refresh by a replaced token means the token was stolen, the family is revoked.
+    Revoked and expired families have no key, so the check is one script call without database
+    """
+
+    def __init__(self, prefix: str, ttl: int):
+        self.prefix = prefix
+        self.ttl = ttl
+        self.redis = None
+        self.reuses = 0
+        self._rotate = None
+
+    def init(self, redis) -> None:
+        self.redis = redis
+        self._rotate = redis.register_script(ROTATE_SCRIPT)
+
+    def family_key(self, family: str) -> str:
+        return f"{self.prefix}:family:{family}"
+
+    def user_key(self, user_id: uuid.UUID) -> str:
+        return f"{self.prefix}:user:{user_id}"
+
+    async def start(self, user_id: uuid.UUID) -> Tuple[str, str]:
+        """
+        Start the family of the login
+        :param user_id: uuid of the user
+        :return: id of the family and id of its first token
+        """
+        family, token_id = uuid.uuid4().hex, uuid.uuid4().hex
+        try:
+            async with self.redis.pipeline(transaction=False) as pipe:
+                pipe.set(self.family_key(family), token_id, ex=self.ttl)
+                pipe.sadd(self.user_key(user_id), family)
+                pipe.expire(self.user_key(user_id), self.ttl)
+                await pipe.execute()
+        except (RedisError, OSError, asyncio.TimeoutError):
+            logger.warning("Error starting refresh token family:", exc_info=True)
+            raise ERROR_503_UNAVAILABLE
+        return family, token_id
+
+    async def rotate(self, user_id: uuid.UUID, family: str, token_id: str) -> str:
+        """
+        Replace the current token of the family
+        :param user_id: uuid of the user
+        :param family: id of the family from the token
+        :param token_id: id of the token
+        :return: id of the new token
+        """
+        new_token_id = uuid.uuid4().hex
+        try:
+            res = await self._rotate(
+                keys=[self.family_key(family), self.user_key(user_id)],
+                args=[token_id, new_token_id, family, self.ttl],
+            )
+        except (RedisError, OSError, asyncio.TimeoutError):
+            logger.warning("Error rotating refresh token:", exc_info=True)
+            raise ERROR_503_UNAVAILABLE
+        if res == -1:
+            self.reuses += 1
+            logger.warning("Reuse of refresh token, family %s of user %s is revoked", family, user_id)
+        if res != 1:
+            raise ERROR_401
+        return new_token_id
+
+    async def revoke_users(self, user_ids: Iterable[uuid.UUID]) -> None:
+        """
+        Revoke all the families of the users. Errors are logged, refresh of the inactive users
+        is still rejected by database
+        :param user_ids: uuids of the users
+        """
+        user_keys = [self.user_key(user_id) for user_id in dict.fromkeys(user_ids)]
+        if not user_keys or self.redis is None:
+            return
+        try:
+            async with self.redis.pipeline(transaction=False) as pipe:
+                for user_key in user_keys:
+                    pipe.smembers(user_key)
+                families = await pipe.execute()
+            keys = [
+                self.family_key(family.decode() if isinstance(family, bytes) else family)
+                for members in families
+                for family in members
+            ]
+            await self.redis.delete(*keys, *user_keys)
+        except (RedisError, OSError, asyncio.TimeoutError):
+            logger.warning("Error revoking refresh tokens:", exc_info=True)
+
+
+refresh_tokens = RefreshTokenStore(REFRESH_TOKEN_PREFIX, int(JWT_REFRESH_TOKEN_EXP_DAYS * 24 * 60 * 60))
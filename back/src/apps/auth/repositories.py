@@ -1,35 +1,44 @@
 import uuid
-from typing import List, Union
+from typing import List, Union, Optional, Dict, Iterable
 
 from fastapi import HTTPException, status
 from sqlalchemy import select
 from sqlalchemy.exc import IntegrityError
 from src.apps.auth.models import User
+from src.apps.auth.principals import principal_cache
+from src.apps.auth.refresh import refresh_tokens
 from src.apps.auth.schemas import UserCreate, UserUpdate, ReturnTokenSchema, RefreshTokenSchema, UserRead
-from src.apps.auth.utils import Hasher, pwd_context, create_access_jwt, create_refresh_jwt, decode_jwt
+from src.apps.auth.utils import Hasher, create_access_jwt, create_refresh_jwt, decode_jwt, get_access_claims
 from src.base_utils.base_errors import ERROR_401, ERROR_404
-from src.base_utils.base_repository import SQLAlchemyRepository, RepositoryWithoutInactive
+from src.base_utils.base_repository import SQLAlchemyRepository, RepositoryWithoutInactive, paginate
+from src.cache.tags import invalidate_on_commit
 
 
 class UserRepository(SQLAlchemyRepository, RepositoryWithoutInactive):
     model = User
 
-    async def get_list_users(self, offset: int, limit: int) -> List[UserRead]:
+    async def _publish(self, action: str, ids: Iterable[uuid.UUID]) -> None:
+        ids = list(ids)
+        await super()._publish(action, ids)
+        await principal_cache.evict_on_commit(self.session, ids)
+        if action in ("deactivate", "delete"):
+            # before commit, a failed commit only makes the users log in again
+            await refresh_tokens.revoke_users(ids)
+        # employees are listed by their users
+        invalidate_on_commit(self.session, ["employee:list"])
+
+    async def get_list_users(
+        self, offset: int, limit: int, cursor: Optional[str] = None
+    ) -> Union[List[UserRead], Dict]:
         """
         Get list of the user exemplars
         :param offset: offset value
         :param limit: limit value
-        :return: list model exemplars
+        :param cursor: keyset cursor
+        :return: list model exemplars or cursor page
         """
-        stmt = (
-            select(self.model)
-            .where(self.model.is_active.is_(True), self.model.is_verify.is_(True))
-            .offset(offset)
-            .limit(limit)
-        )
-        res = await self.session.execute(stmt)
-        res = [row[0] for row in res.all()]
-        return res
+        stmt = select(self.model).where(self.model.is_active.is_(True), self.model.is_verify.is_(True))
+        return await paginate(self.model, stmt, offset, limit, cursor, self.session)
 
     async def get_one_user(self, self_id: uuid.UUID) -> Union[UserRead, None]:
         """
@@ -44,12 +53,14 @@ class UserRepository(SQLAlchemyRepository, RepositoryWithoutInactive):
 
     async def add_one_user(self, user: UserCreate):
         try:
-            hashed_password = Hasher.get_password_hash(user.password)
+            hashed_password = await Hasher.get_password_hash(user.password)
             new_user = User(
                 email=user.email,
                 password=hashed_password,
             )
             self.session.add(new_user)
+            await self.session.flush()
+            await self._publish("create", [new_user.id])
             await self.session.commit()
             await self.session.refresh(new_user)
             return new_user
@@ -61,24 +72,11 @@ class UserRepository(SQLAlchemyRepository, RepositoryWithoutInactive):
             )
 
     async def edit_one_user(self, user_id: uuid.UUID, user: UserUpdate):
-        try:
-            res = await self.session.get(User, user_id)
-            if not res:
-                raise ERROR_404
-            res_data = user.model_dump(exclude_unset=True)
-            if "password" in res_data.keys():
-                hashed_password = Hasher.get_password_hash(res_data.pop("password"))
-                res_data.update({"password": hashed_password})
-
-            for key, value in res_data.items():
-                setattr(res, key, value)
-
-            self.session.add(res)
-            await self.session.commit()
-            await self.session.refresh(res)
-            return res
-        except ValueError as e:
-            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+        res_data = user.model_dump(exclude_unset=True)
+        if "password" in res_data.keys():
+            hashed_password = await Hasher.get_password_hash(res_data.pop("password"))
+            res_data.update({"password": hashed_password})
+        return await self._update_one({"id": user_id}, res_data)
 
 
 class AuthRepository(UserRepository):
@@ -90,24 +88,31 @@ class AuthRepository(UserRepository):
         if not user:
             raise ERROR_401
         # check if password matches
-        matches = pwd_context.verify(data.password, user.password)
+        matches = await Hasher.verify_password(data.password, user.password)
         if not matches:
             raise ERROR_401
-        # create jwt tokens
-        data = {"email": user.email}
-        access_tkn = await create_access_jwt(data)
-        refresh_tkn = await create_refresh_jwt(data)
+        # create jwt tokens, the refresh token starts a family
+        family, token_id = await refresh_tokens.start(user.id)
+        access_tkn = await create_access_jwt(get_access_claims(user))
+        refresh_tkn = await create_refresh_jwt(
+            {"email": user.email, "id": str(user.id), "fam": family, "jti": token_id}
+        )
         return ReturnTokenSchema(
             email=user.email, access_token=access_tkn, refresh_token=refresh_tkn, token_type="bearer"
         )
 
     async def get_refresh_token(self, token: RefreshTokenSchema) -> ReturnTokenSchema:
         data = await decode_jwt(token.refresh_token)
+        # expired or invalid token
+        if not data:
+            raise ERROR_401
         # check if "mode": "refresh_token"
         if "email" not in data and "mode" not in data:
             raise ERROR_401
-        if data["mode"] != "refresh_token":
+        if data["mode"] != "refresh_token" or "fam" not in data:
             raise ERROR_401
+        # replace the token in its family, revoked and reused tokens are rejected
+        token_id = await refresh_tokens.rotate(uuid.UUID(data["id"]), data["fam"], data["jti"])
         # check if user exists
         stmt = select(User).where(User.email == data["email"], User.is_active.is_(True), User.is_verify.is_(True))
         user = await self.session.execute(stmt)
@@ -115,9 +120,10 @@ class AuthRepository(UserRepository):
         if not user:
             raise ERROR_401
         # generate new tokens
-        data = {"email": user.email}
-        access_tkn = await create_access_jwt(data)
-        refresh_tkn = await create_refresh_jwt(data)
+        access_tkn = await create_access_jwt(get_access_claims(user))
+        refresh_tkn = await create_refresh_jwt(
+            {"email": user.email, "id": str(user.id), "fam": data["fam"], "jti": token_id}
+        )
         return ReturnTokenSchema(
             email=user.email, access_token=access_tkn, refresh_token=refresh_tkn, token_type="bearer"
         )
@@ -1,5 +1,7 @@
+from typing import Dict, List
 from fastapi import APIRouter, Depends
 from sqlalchemy.ext.asyncio import AsyncSession
+from src.apps.auth.keys import signing_keys
 from src.apps.auth.repositories import AuthRepository
 from src.apps.auth.schemas import UserCreate, ReturnTokenSchema, RefreshTokenSchema
 from src.db.base_db import get_session
@@ -30,3 +32,13 @@ async def get_refresh_token(
     token: RefreshTokenSchema, session: AsyncSession = Depends(get_session)
 ) -> ReturnTokenSchema:
     return await AuthRepository(session).get_refresh_token(token)
+
+
+@router.get(
+    "/jwks",
+    response_model=Dict[str, List[Dict[str, str]]],
+    summary="Get public keys",
+    description="Get public keys of the stateless access tokens in the JWK set format, empty if the mode is off",
+)
+async def get_jwks() -> Dict[str, List[Dict[str, str]]]:
+    return signing_keys.jwks()
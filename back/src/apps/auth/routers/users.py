@@ -1,14 +1,16 @@
 import uuid
-from typing import List
+from typing import List, Union
 from fastapi import APIRouter, Depends
-from fastapi_cache.decorator import cache
 from sqlalchemy.ext.asyncio import AsyncSession
+from config import CACHE_EXPIRE_SECONDS
 from src.apps.auth.models import User
 from src.apps.auth.permissions import check_permission_user, check_permission_moderator
 from src.apps.auth.repositories import UserRepository
 from src.apps.auth.schemas import UserRead, UserCreate, UserUpdate
-from src.db.base_db import get_session
+from src.db.base_db import get_session, get_read_session
+from src.cache.decorator import cache
 from src.base_utils.base_depends import Pagination
+from src.base_utils.base_pagination import CursorPage
 
 router = APIRouter(
     prefix="/users",
@@ -16,20 +18,22 @@ router = APIRouter(
 )
 
 
-@router.get("", response_model=List[UserRead], summary="Get users", description="Get user list")
-@cache(expire=30)
+@router.get(
+    "", response_model=Union[List[UserRead], CursorPage[UserRead]], summary="Get users", description="Get user list"
+)
+@cache(expire=CACHE_EXPIRE_SECONDS, tags=("user:list",))
 async def get_list(
     pagination: Pagination = Depends(Pagination),
-    session: AsyncSession = Depends(get_session),
+    session: AsyncSession = Depends(get_read_session),
     current_user: User = Depends(check_permission_user),
 ):
-    return await UserRepository(session).get_list_users(pagination.skip, pagination.limit)
+    return await UserRepository(session).get_list_users(pagination.skip, pagination.limit, pagination.cursor)
 
 
 @router.get("/{user_id}", response_model=UserRead, summary="Get user", description="Get user by id")
 async def get_one(
     user_id: uuid.UUID,
-    session: AsyncSession = Depends(get_session),
+    session: AsyncSession = Depends(get_read_session),
     current_user: User = Depends(check_permission_moderator),
 ):
     return await UserRepository(session).get_one_user(user_id)
@@ -1,4 +1,5 @@
 import datetime
+import uuid
 from typing import Union
 from fastapi import HTTPException, Depends, status, Request
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
@@ -6,8 +7,14 @@ from jose import jwt, JWTError
 from passlib.context import CryptContext
 from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import make_transient_to_detached
 from config import JWT_ACCESS_TOKEN_EXP_DAYS, JWT_REFRESH_TOKEN_EXP_DAYS, JWT_ALGORITHM, JWT_SECRET_KEY
-from src.apps.auth.models import User
+from src.apps.auth.hashing import hashing_pool
+from src.apps.auth.claims import claims_cache
+from src.apps.auth.keys import signing_keys
+from src.apps.auth.models import User, UserPermission
+from src.apps.auth.principals import principal_cache
+from src.apps.auth.versions import user_versions
 from src.db.base_db import get_session
 from src.base_utils.base_errors import ERROR_401
 
@@ -15,13 +22,17 @@ pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
 
 class Hasher:
+    """
+    bcrypt hashing in the hashing pool, out of the event loop
+    """
+
     @staticmethod
-    def verify_password(plain_password, hashed_password):
-        return pwd_context.verify(plain_password, hashed_password)
+    async def verify_password(plain_password: str, hashed_password: str) -> bool:
+        return await hashing_pool.run(pwd_context.verify, plain_password, hashed_password)
 
     @staticmethod
-    def get_password_hash(password: str):
-        return pwd_context.hash(password)
+    async def get_password_hash(password: str) -> str:
+        return await hashing_pool.run(pwd_context.hash, password)
 
 
 class JWTBearer(HTTPBearer):
@@ -33,27 +44,33 @@ class JWTBearer(HTTPBearer):
         if credentials:
             if not credentials.scheme == "Bearer":
                 raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Invalid authentication scheme")
-            if not await self.verify_jwt(credentials.credentials):
+            payload = await decode_jwt(credentials.credentials)
+            if not payload:
                 raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Invalid token or expired token")
+            # verified claims for the dependencies of the request, the token isn't decoded again
+            request.state.jwt_claims = payload
             return credentials.credentials
         else:
             raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Invalid authorization code")
 
-    async def verify_jwt(self, jwtoken: str) -> bool:
-        isTokenValid: bool = False
 
-        try:
-            payload = await decode_jwt(jwtoken)
-        except JWTError:
-            payload = None
-        if payload:
-            isTokenValid = True
-        return isTokenValid
+def get_access_claims(user: User) -> dict:
+    """
+    Claims of the access token. Stateless tokens carry id, permission and version of the user
+    :param user: user
+    :return: dictionary
+    """
+    data = {"email": user.email}
+    if signing_keys.enabled:
+        data.update(id=str(user.id), permission=user.permission.name, ver=user.change_id)
+    return data
 
 
 async def create_access_jwt(data: dict):
     data["exp"] = datetime.datetime.utcnow() + datetime.timedelta(days=JWT_ACCESS_TOKEN_EXP_DAYS)
     data["mode"] = "access_token"
+    if "ver" in data:
+        return signing_keys.sign(data)
     return jwt.encode(data, JWT_SECRET_KEY, JWT_ALGORITHM)
 
 
@@ -64,37 +81,102 @@ async def create_refresh_jwt(data: dict):
 
 
 async def decode_jwt(token: str) -> dict:
+    """
+    Verify the jwt token. Claims of the tokens verified before come from the claims cache
+    without the signature check. Tokens with the kid header are verified by the public keys
+    :param token: jwt token
+    :return: claims, None for the expired token, empty dict for the invalid token
+    """
+    claims = claims_cache.get(token)
+    if claims is not None:
+        return claims
     try:
-        decoded_token = jwt.decode(token, JWT_SECRET_KEY, algorithms=[JWT_ALGORITHM])
-        return decoded_token if decoded_token["exp"] >= datetime.datetime.utcnow().timestamp() else None
+        kid = jwt.get_unverified_header(token).get("kid")
+        if kid is None:
+            decoded_token = jwt.decode(token, JWT_SECRET_KEY, algorithms=[JWT_ALGORITHM])
+        else:
+            decoded_token = signing_keys.verify(token, kid)
     except JWTError:
         return {}
+    if decoded_token["exp"] < datetime.datetime.utcnow().timestamp():
+        return None
+    claims_cache.set(token, decoded_token)
+    return decoded_token
 
 
-async def verified_user(
-    token: str = Depends(JWTBearer()), session: AsyncSession = Depends(get_session)
-) -> Union[User, HTTPException]:
+async def get_user_by_claims(data: dict, session: AsyncSession) -> User:
     """
-    Validate the access jwt token
-    :param token:
-    :param session:
-    :return:
+    Get user of the verified access jwt claims. Users of the stateless tokens which aren't revoked
+    and recently seen users come from the principal cache without query, the session isn't used then
+    :param data: claims of the access jwt token
+    :param session: async session
+    :return: user
     """
-    try:
-        data = await decode_jwt(token)
-        # check if "mode": "refresh_token"
-        if "email" not in data and "mode" not in data:
-            raise ERROR_401
-        if data["mode"] != "access_token":
-            raise ERROR_401
-        # check if user exists
-        stmt = select(User).where(User.email == data["email"])
-        user = await session.execute(stmt)
-        user = user.scalar_one_or_none()
-
-        if not user:
-            raise ERROR_401
-
+    # expired or invalid token
+    if not data:
+        raise ERROR_401
+    # check if "mode": "refresh_token"
+    if "email" not in data and "mode" not in data:
+        raise ERROR_401
+    if data["mode"] != "access_token":
+        raise ERROR_401
+    if "ver" in data and user_versions.is_current(uuid.UUID(data["id"]), data["ver"]):
+        return get_stateless_user(data)
+    user = principal_cache.get(data["email"])
+    if user:
         return user
-    except JWTError:
+    # check if user exists
+    stmt = select(User).where(User.email == data["email"])
+    user = await session.execute(stmt)
+    user = user.scalar_one_or_none()
+
+    if not user:
         raise ERROR_401
+
+    principal_cache.set(user)
+    return user
+
+
+def get_stateless_user(data: dict) -> User:
+    """
+    Build the user of the stateless access token. Tokens are issued only for the active verified users,
+    their deactivation changes the version
+    :param data: claims of the stateless access token
+    :return: detached user with the columns of the claims
+    """
+    user = User(
+        id=uuid.UUID(data["id"]),
+        email=data["email"],
+        permission=UserPermission[data["permission"]],
+        is_active=True,
+        is_verify=True,
+        change_id=data["ver"],
+    )
+    make_transient_to_detached(user)
+    return user
+
+
+async def get_user_by_token(token: str, session: AsyncSession) -> User:
+    """
+    Get user of the access jwt token
+    :param token: access jwt token
+    :param session: async session
+    :return: user
+    """
+    return await get_user_by_claims(await decode_jwt(token), session)
+
+
+async def verified_user(
+    request: Request, token: str = Depends(JWTBearer()), session: AsyncSession = Depends(get_session)
+) -> Union[User, HTTPException]:
+    """
+    Validate the access jwt token, its claims were verified by JWTBearer
+    :param request: request
+    :param token: access jwt token
+    :param session: async session
+    :return: user
+    """
+    claims = getattr(request.state, "jwt_claims", None)
+    if claims is None:
+        claims = await decode_jwt(token)
+    return await get_user_by_claims(claims, session)
@@ -0,0 +1,73 @@
+import asyncio
+import json
+import uuid
+from typing import Dict, Optional
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import async_sessionmaker
+from src.apps.auth.models import User
+from src.db.base_db import async_session_maker
+
+
+class UserVersions:
+    """
+    Per worker table of the current versions of the users for the revocation of the stateless tokens.
+    A version is the change_id of the user, every change of the user revokes the tokens of the older versions.
+    The table is loaded after the worker LISTENs the principal evictions and kept by them
+    """
+
+    def __init__(self, session_maker: async_sessionmaker):
+        self.session_maker = session_maker
+        self.loaded = False
+        self._versions: Dict[uuid.UUID, int] = {}
+        self._task: Optional[asyncio.Task] = None
+
+    def is_current(self, user_id: uuid.UUID, version: int) -> bool:
+        """
+        Check if the token of the user version isn't revoked
+        :param user_id: uuid of the user
+        :param version: version from the token
+        :return: False for the revoked tokens and for the unknown users, they are checked by database
+        """
+        if not self.loaded:
+            return False
+        current = self._versions.get(user_id)
+        if current is None:
+            return False
+        return version >= current
+
+    async def load(self) -> None:
+        """
+        Read the versions of all the users, two columns of the user table
+        """
+        async with self.session_maker() as session:
+            rows = (await session.execute(select(User.id, User.change_id))).all()
+        # notifications received during the load can be newer than the rows
+        self._versions = {row[0]: max(row[1], self._versions.get(row[0], row[1])) for row in rows}
+        self.loaded = True
+
+    def on_notify(self, payload: str) -> None:
+        """
+        Update the versions by the eviction notification
+        :param payload: json list of the [user uuid, version] pairs, version is null for the deleted users
+        """
+        try:
+            pairs = [(uuid.UUID(user_id), version) for user_id, version in json.loads(payload)]
+        except (ValueError, TypeError):
+            return
+        for user_id, version in pairs:
+            if version is None:
+                self._versions.pop(user_id, None)
+            else:
+                self._versions[user_id] = max(version, self._versions.get(user_id, version))
+
+    def resync(self) -> None:
+        """
+        Load the table again, notifications could be lost.
+        Tokens are checked by database until the load ends
+        """
+        self.loaded = False
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self.load())
+
+
+user_versions = UserVersions(async_session_maker)
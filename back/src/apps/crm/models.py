@@ -2,10 +2,11 @@ import datetime
 import enum
 import uuid
 from typing import Optional, List
-from sqlalchemy import Column, ForeignKey, Table, String, UniqueConstraint
+from sqlalchemy import BigInteger, Boolean, Column, Enum, ForeignKey, Index, Table, String, UniqueConstraint, text
 from sqlalchemy.orm import Mapped, mapped_column, validates, relationship
 from src.apps.auth.models import User
-from src.db.base_db import Base
+from src.db.base_db import Base, CHANGE_ID
+from src.base_utils.base_rank import new_rank
 from src.base_utils.base_validators import name_valid, phone_valid
 
 
@@ -26,17 +27,33 @@ class TaskPriority(enum.Enum):
 task_project = Table(
     "task_project",
     Base.metadata,
-    Column("task_id", ForeignKey("task.id")),
-    Column("project_id", ForeignKey("project.id")),
+    Column("task_id", ForeignKey("task.id", ondelete="CASCADE")),
+    Column("project_id", ForeignKey("project.id", ondelete="CASCADE")),
+    # copies of the task status and activity, written with the task
+    Column("status", Enum(TaskStatus), default=TaskStatus.todo),
+    Column("is_active", Boolean, default=True),
+    # order inside the board column of the project
+    Column("rank", String(collation="C"), default=new_rank),
     UniqueConstraint("task_id", "project_id", name="uix_task_project"),
+    # pages and totals of the board columns, neighbor ranks of the tied tasks and the ordered rebalance of the columns
+    Index(
+        "ix_task_project_board",
+        "project_id",
+        "status",
+        "rank",
+        "task_id",
+        postgresql_where=text("is_active IS true"),
+    ),
 )
 
 task_employee = Table(
     "task_employee",
     Base.metadata,
-    Column("task_id", ForeignKey("task.id")),
-    Column("employee_id", ForeignKey("employee.id")),
+    Column("task_id", ForeignKey("task.id", ondelete="CASCADE")),
+    Column("employee_id", ForeignKey("employee.id", ondelete="CASCADE")),
     UniqueConstraint("task_id", "employee_id", name="uix_task_employee"),
+    # tasks of the assignee for the board filter
+    Index("ix_task_employee_employee_id_task_id", "employee_id", "task_id"),
 )
 
 
@@ -44,7 +61,7 @@ class Department(Base):
     __tablename__ = "department"
 
     title: Mapped[str] = mapped_column(String(100), unique=True, index=True)
-    employees: Mapped[Optional[List["Employee"]]] = relationship(back_populates="department", lazy="selectin")
+    employees: Mapped[Optional[List["Employee"]]] = relationship(back_populates="department", lazy="raise")
 
     def __str__(self):
         return self.title
@@ -57,7 +74,7 @@ class Photo(Base):
     path: Mapped[str]
 
     employee_id: Mapped[uuid.UUID] = mapped_column(ForeignKey("employee.id"), index=True)
-    employee: Mapped["Employee"] = relationship(back_populates="photo", single_parent=True, lazy="selectin")
+    employee: Mapped["Employee"] = relationship(back_populates="photo", single_parent=True, lazy="raise")
 
     __table_args__ = (UniqueConstraint("employee_id"),)
 
@@ -72,15 +89,17 @@ class Employee(Base):
     name: Mapped[str] = mapped_column(String(100))
     surname: Mapped[str] = mapped_column(String(100))
     phone: Mapped[str] = mapped_column(String(12), unique=True)
-    photo: Mapped["Photo"] = relationship(back_populates="employee", lazy="selectin")
-    my_tasks: Mapped[List["Task"]] = relationship(back_populates="author", lazy="selectin")
-    tasks: Mapped[List["Task"]] = relationship(secondary=task_employee, back_populates="employees", lazy="selectin")
+    photo: Mapped["Photo"] = relationship(back_populates="employee", lazy="raise")
+    my_tasks: Mapped[List["Task"]] = relationship(back_populates="author", lazy="raise")
+    tasks: Mapped[List["Task"]] = relationship(secondary=task_employee, back_populates="employees", lazy="raise")
 
     department_id: Mapped[uuid.UUID] = mapped_column(ForeignKey("department.id"))
-    department: Mapped["Department"] = relationship(back_populates="employees", lazy="selectin")
+    department: Mapped["Department"] = relationship(back_populates="employees", lazy="raise")
 
     user_id: Mapped[uuid.UUID] = mapped_column(ForeignKey("user.id"))
-    user: Mapped["User"] = relationship(single_parent=True, lazy="selectin")
+    user: Mapped["User"] = relationship(single_parent=True, lazy="raise")
+    # transaction of the last change, for the delta sync
+    change_id: Mapped[int] = mapped_column(BigInteger, default=CHANGE_ID, onupdate=CHANGE_ID, index=True)
 
     __table_args__ = (UniqueConstraint("user_id"),)
 
@@ -105,8 +124,10 @@ class Project(Base):
     title: Mapped[str] = mapped_column(String(100), unique=True, index=True)
     description: Mapped[Optional[str]] = mapped_column(default="")
     is_active: Mapped[bool] = mapped_column(default=True)
+    # transaction of the last change, for the delta sync
+    change_id: Mapped[int] = mapped_column(BigInteger, default=CHANGE_ID, onupdate=CHANGE_ID, index=True)
 
-    tasks: Mapped[List["Task"]] = relationship(secondary=task_project, back_populates="projects", lazy="selectin")
+    tasks: Mapped[List["Task"]] = relationship(secondary=task_project, back_populates="projects", lazy="raise")
 
     def __str__(self):
         return self.title
@@ -121,12 +142,14 @@ class Task(Base):
     priority: Mapped[Optional[TaskPriority]] = mapped_column(default=TaskPriority.none)
     end: Mapped[Optional[datetime.date]]
     is_active: Mapped[bool] = mapped_column(default=True)
+    # transaction of the last change, links to projects and employees included
+    change_id: Mapped[int] = mapped_column(BigInteger, default=CHANGE_ID, onupdate=CHANGE_ID, index=True)
 
     author_id: Mapped[uuid.UUID] = mapped_column(ForeignKey("employee.id"))
-    author: Mapped[Employee] = relationship(back_populates="my_tasks", lazy="selectin")
+    author: Mapped[Employee] = relationship(back_populates="my_tasks", lazy="raise")
 
-    projects: Mapped[List[Project]] = relationship(secondary=task_project, back_populates="tasks", lazy="selectin")
-    employees: Mapped[List[Employee]] = relationship(secondary=task_employee, back_populates="tasks", lazy="selectin")
+    projects: Mapped[List[Project]] = relationship(secondary=task_project, back_populates="tasks", lazy="raise")
+    employees: Mapped[List[Employee]] = relationship(secondary=task_employee, back_populates="tasks", lazy="raise")
 
     def __str__(self):
         return self.title
@@ -0,0 +1,22 @@
+import asyncio
+import logging
+from src.apps.crm.repositories import TaskRepository
+from src.db.base_db import async_session_maker
+
+logger = logging.getLogger(__name__)
+
+
+async def rebalance_task_ranks_forever(interval: float, max_length: int) -> None:
+    """
+    Rebalance board columns with too long task ranks once per interval
+    :param interval: seconds between runs
+    :param max_length: max length of the rank
+    """
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            async with async_session_maker() as session:
+                await TaskRepository(session).rebalance_long_ranks(max_length)
+        except Exception:
+            # the next run retries
+            logger.warning("Error rebalancing task ranks:", exc_info=True)
@@ -1,51 +1,301 @@
 import os
 import uuid
-from typing import List, Union, Dict
+from typing import List, Union, Dict, Optional, Iterable, Tuple
 from fastapi import File, status
 from fastapi.exceptions import HTTPException
 from pydantic import BaseModel
-from sqlalchemy import select
+from sqlalchemy import (
+    ColumnElement,
+    Select,
+    Table,
+    and_,
+    bindparam,
+    column,
+    or_,
+    select,
+    tuple_,
+    insert,
+    update,
+    delete,
+    exists,
+    func,
+    true,
+    values,
+)
 from sqlalchemy.exc import IntegrityError, DBAPIError
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import joinedload, selectinload
+from sqlalchemy.orm.attributes import set_committed_value
 from config import MEDIA_URL, BASE_SITE_URL
 from src.apps.auth.models import User, UserPermission
-from src.apps.crm.models import Department, Photo, Employee, Project, Task, task_project, task_employee
-from src.apps.crm.schemas import EmployeeRead, EmployeeReadWithTasks, MyEmployeeUpdate
-from src.base_utils.base_errors import ERROR_404
-from src.base_utils.base_repository import SQLAlchemyRepository, RepositoryWithoutInactive, get_obj_by_params
+from src.apps.auth.principals import principal_cache
+from src.apps.auth.refresh import refresh_tokens
+from src.apps.crm.models import (
+    Department,
+    Photo,
+    Employee,
+    Project,
+    Task,
+    TaskPriority,
+    TaskStatus,
+    task_project,
+    task_employee,
+)
+from src.apps.crm.schemas import EmployeeRead, EmployeeReadWithTasks, MyEmployeeUpdate, TaskCreate, TaskMove
+from src.apps.realtime.events import publish_events, publish_task_events
+from src.base_utils.base_errors import ERROR_404, ERROR_INVALID_CURSOR
+from src.base_utils.base_pagination import decode_json_cursor, encode_json_cursor
+from src.base_utils.base_rank import new_rank, rank_between, rank_sequence, ranks_between
+from src.cache.tags import get_write_tags, invalidate_on_commit
+from src.db.base_db import CHANGE_HORIZON, CHANGE_ID
+from src.base_utils.base_repository import (
+    SQLAlchemyRepository,
+    RepositoryWithoutInactive,
+    any_of,
+    get_obj_by_params,
+    get_objs_by_ids,
+    get_existing_ids,
+    paginate,
+)
+
+
+# advisory lock of the task rank rebalance
+TASK_RANK_LOCK_ID = 0x7461736B
+
+# TaskRead
+TASK_READ_OPTIONS = (selectinload(Task.projects), selectinload(Task.employees))
 
 
 class DepartmentRepository(SQLAlchemyRepository):
     model = Department
+    # DepartmentReadWithEmployees
+    one_options = (selectinload(Department.employees),)
 
 
 class ProjectRepository(SQLAlchemyRepository, RepositoryWithoutInactive):
     model = Project
+    # ProjectReadWithTasks
+    one_options = (selectinload(Project.tasks).options(*TASK_READ_OPTIONS),)
+
+    async def _publish(self, action: str, ids: Iterable[uuid.UUID]) -> None:
+        ids = list(ids)
+        await super()._publish(action, ids)
+        await publish_events(self.session, "project", action, ids, by_project=True)
+
+    async def touch_linked_tasks(self, ids: Iterable[uuid.UUID]) -> None:
+        """
+        Mark the tasks linked to the projects as changed. Links are deleted with the projects by the cascade,
+        the delta sync must resend the tasks without them. Doesn't commit
+        :param ids: uuids of the projects
+        """
+        linked_ids = select(task_project.c.task_id).where(any_of(task_project.c.project_id, ids))
+        stmt = (
+            update(Task)
+            .where(Task.id.in_(linked_ids))
+            .values(change_id=CHANGE_ID)
+            .execution_options(synchronize_session=False)
+        )
+        await self.session.execute(stmt)
+
+    async def delete_one(self, self_id: uuid.UUID) -> Dict:
+        await self.touch_linked_tasks([self_id])
+        return await super().delete_one(self_id)
+
+    async def delete_many(self, ids: List[uuid.UUID]) -> Dict:
+        await self.touch_linked_tasks(ids)
+        return await super().delete_many(ids)
+
+    async def get_board(
+        self,
+        project_id: uuid.UUID,
+        offset: int,
+        limit: int,
+        task_status: Optional[TaskStatus] = None,
+        priority: Optional[TaskPriority] = None,
+        employee_id: Optional[uuid.UUID] = None,
+    ) -> Dict:
+        """
+        Get active tasks of the project grouped by status with pagination inside every column.
+        Pages and totals of all the columns are selected by one statement
+        :param project_id: project uuid
+        :param offset: offset inside every column
+        :param limit: limit of every column
+        :param task_status: filter by status, returns one column
+        :param priority: filter by priority
+        :param employee_id: filter by assignee
+        :return: dictionary with the columns
+        """
+        statuses = [task_status] if task_status is not None else list(TaskStatus)
+        columns = values(column("status", Task.status.type), name="board_column").data([(i,) for i in statuses])
+        # the links keep copies of the status and activity of the tasks, the totals of all the columns are counted
+        # by one pass over the links of the project, every page is a range of the board index of the links
+        # and only the tasks of the pages are read
+        filters = [
+            task_project.c.project_id == project_id,
+            task_project.c.is_active.is_(True),
+            select(Project.is_active).where(Project.id == project_id).scalar_subquery().is_(True),
+        ]
+        task_filters = []
+        if priority is not None:
+            task_filters.append(Task.priority == priority)
+        if employee_id is not None:
+            task_filters.append(
+                exists().where(task_employee.c.task_id == Task.id, task_employee.c.employee_id == employee_id)
+            )
+        if task_filters:
+            filters.extend(task_filters)
+            links = task_project.join(Task, Task.id == task_project.c.task_id)
+        else:
+            links = task_project
+        totals = (
+            select(task_project.c.status, func.count().label("total"))
+            .select_from(links)
+            .where(*filters, *([task_project.c.status == task_status] if task_status is not None else []))
+            .group_by(task_project.c.status)
+            .subquery("board_total")
+        )
+        page = (
+            select(task_project.c.task_id, task_project.c.rank)
+            .select_from(links)
+            .where(*filters, task_project.c.status == columns.c.status)
+            .order_by(task_project.c.rank, task_project.c.task_id)
+            .offset(offset)
+            .limit(limit)
+            .lateral("board_page")
+        )
+        employees = (
+            select(func.array_agg(task_employee.c.employee_id))
+            .where(task_employee.c.task_id == page.c.task_id)
+            .scalar_subquery()
+        )
+        stmt = (
+            select(
+                columns.c.status,
+                func.coalesce(totals.c.total, 0).label("total"),
+                Task.id,
+                Task.title,
+                Task.description,
+                Task.priority,
+                Task.end,
+                Task.author_id,
+                page.c.rank,
+                employees.label("employees"),
+            )
+            .select_from(columns)
+            .outerjoin(totals, totals.c.status == columns.c.status)
+            .outerjoin(page, true())
+            .outerjoin(Task, Task.id == page.c.task_id)
+            .order_by(columns.c.status, page.c.rank, page.c.task_id)
+        )
+        rows = (await self.session.execute(stmt)).mappings().all()
+        board = {i: {"status": i, "total": 0, "tasks": []} for i in statuses}
+        for row in rows:
+            board[row["status"]]["total"] = row["total"]
+            if row["id"] is not None:
+                board[row["status"]]["tasks"].append({**row, "employees": row["employees"] or []})
+        if not any(board_column["total"] for board_column in board.values()):
+            await get_obj_by_params(Project, {"id": project_id, "is_active": True}, self.session)
+        return {"project_id": project_id, "columns": list(board.values())}
 
 
 class TaskRepository(SQLAlchemyRepository, RepositoryWithoutInactive):
     model = Task
+    list_options = TASK_READ_OPTIONS
+    # TaskReadWithProjectsAndEmployees
+    one_options = (joinedload(Task.author), *TASK_READ_OPTIONS)
+
+    async def _publish(self, action: str, ids: Iterable[uuid.UUID], project_ids: Iterable[uuid.UUID] = ()) -> None:
+        """
+        Publish events of the tasks to their projects and evict the cached task lists of the projects
+        :param action: create, update, delete or deactivate
+        :param ids: uuids of the changed tasks
+        :param project_ids: projects the tasks were unlinked from
+        """
+        ids = list(ids)
+        await super()._publish(action, ids)
+        if action in ("update", "deactivate"):
+            # every update of the tasks is published, the boards get the changes with the events
+            await self.sync_links(ids)
+        if action == "delete":
+            # links of the deleted tasks are already gone, all the subscribers get the event
+            # and task lists of all the projects are evicted
+            await publish_events(self.session, "task", action, ids)
+            invalidate_on_commit(self.session, ["project:tasks"])
+        else:
+            linked_ids = await publish_task_events(self.session, action, ids, project_ids)
+            invalidate_on_commit(self.session, [f"project:{project_id}:tasks" for project_id in linked_ids])
+
+    async def sync_links(self, ids: Iterable[uuid.UUID]) -> None:
+        """
+        Copy statuses and activity of the tasks to their links with the projects, which order the boards.
+        Doesn't commit
+        :param ids: uuids of the tasks
+        """
+        ids = list(ids)
+        if ids:
+            # columns of the table, the update of the links doesn't take onupdate values of the tasks
+            table = Task.__table__
+            stmt = (
+                update(task_project)
+                .where(
+                    task_project.c.task_id == table.c.id,
+                    any_of(table.c.id, ids),
+                    or_(
+                        task_project.c.status.is_distinct_from(table.c.status),
+                        task_project.c.is_active.is_distinct_from(table.c.is_active),
+                    ),
+                )
+                .values(status=table.c.status, is_active=table.c.is_active)
+            )
+            await self.session.execute(stmt)
+
+    async def _link(self, table: Table, column: str, task_id: uuid.UUID, ids: Iterable[uuid.UUID], **values) -> None:
+        """
+        Link task with exemplars by one multi-row insert into the association table
+        :param table: association table
+        :param column: association column of the exemplars
+        :param task_id: task uuid
+        :param ids: uuids of the exemplars
+        :param values: other columns of the links
+        """
+        rows = [{"task_id": task_id, column: self_id, **values} for self_id in ids]
+        if rows:
+            await self.session.execute(insert(table).values(rows))
+
+    async def _unlink(self, table: Table, column: str, task_id: uuid.UUID, ids: Iterable[uuid.UUID]) -> None:
+        """
+        Remove links of task with exemplars by one delete from the association table
+        :param table: association table
+        :param column: association column of the exemplars
+        :param task_id: task uuid
+        :param ids: uuids of the exemplars
+        """
+        ids = list(ids)
+        if ids:
+            await self.session.execute(delete(table).where(table.c.task_id == task_id, any_of(table.c[column], ids)))
 
     async def add_one_task(self, data: BaseModel, author_id: uuid.UUID = None):
         try:
+            projects = await get_objs_by_ids(Project, data.projects, self.session)
+            employees = await get_objs_by_ids(Employee, data.employees, self.session)
             # Workaround for solve bag sqlalchemy "object don't have _sa_instance_state"
             task = self.model(**data.model_dump(exclude=["projects", "employees"]))
             if author_id:
                 employee = await get_obj_by_params(Employee, {"user_id": author_id}, self.session)
                 task.author_id = employee.id
             self.session.add(task)
-            await self.session.commit()
-
-            for project_id in data.projects:
-                project = await get_obj_by_params(Project, {"id": project_id}, self.session)
-                project_res = task_project.insert().values(task_id=task.id, project_id=project.id)
-                await self.session.execute(project_res)
-            for employee_id in data.employees:
-                employee = await get_obj_by_params(Employee, {"id": employee_id}, self.session)
-                employee_res = task_employee.insert().values(task_id=task.id, employee_id=employee.id)
-                await self.session.execute(employee_res)
+            await self.session.flush()
 
+            project_ids = [project.id for project in projects]
+            await self._link(
+                task_project, "project_id", task.id, project_ids, status=task.status, is_active=task.is_active
+            )
+            await self._link(task_employee, "employee_id", task.id, [employee.id for employee in employees])
+            await self._publish("create", [task.id])
             await self.session.commit()
-            await self.session.refresh(task)
+
+            set_committed_value(task, "projects", projects)
+            set_committed_value(task, "employees", employees)
             return task
         except ValueError as e:
             raise HTTPException(status_code=400, detail=str(e))
@@ -56,9 +306,10 @@ class TaskRepository(SQLAlchemyRepository, RepositoryWithoutInactive):
 
     async def edit_one_task(self, self_id: uuid.UUID, data: BaseModel, author_id: uuid.UUID = None):
         try:
-            # Workaround for solve bag sqlalchemy "object don't have _sa_instance_state"
-            task = await get_obj_by_params(Task, {"id": self_id}, self.session)
-            employee = await get_obj_by_params(Employee, {"user_id": author_id}, self.session)
+            task = await get_obj_by_params(Task, {"id": self_id}, self.session, self.list_options)
+            employee = await get_obj_by_params(
+                Employee, {"user_id": author_id}, self.session, (joinedload(Employee.user),)
+            )
             if task.author_id != employee.id:
                 if (
                     employee.user.permission != UserPermission.moderator
@@ -66,33 +317,301 @@ class TaskRepository(SQLAlchemyRepository, RepositoryWithoutInactive):
                 ):
                     raise HTTPException(status_code=403, detail="Can't change task, where you are not author")
 
+            projects = await get_objs_by_ids(Project, data.projects or [], self.session)
+            employees = await get_objs_by_ids(Employee, data.employees or [], self.session)
+
             task_res = data.model_dump(exclude_unset=True, exclude=["projects", "employees"])
             for key, value in task_res.items():
                 setattr(task, key, value)
+            if data.projects is not None or data.employees is not None:
+                # links are part of the task for the delta sync
+                task.change_id = CHANGE_ID
             self.session.add(task)
+            await self.session.flush()
+
+            unlinked_ids = set()
+            if data.projects is not None:
+                old_ids = {project.id for project in task.projects}
+                new_ids = [project.id for project in projects]
+                unlinked_ids = old_ids.difference(new_ids)
+                await self._unlink(task_project, "project_id", task.id, unlinked_ids)
+                linked_ids = [i for i in new_ids if i not in old_ids]
+                await self._link(
+                    task_project, "project_id", task.id, linked_ids, status=task.status, is_active=task.is_active
+                )
+            if data.employees is not None:
+                old_ids = {employee.id for employee in task.employees}
+                new_ids = [employee.id for employee in employees]
+                await self._unlink(task_employee, "employee_id", task.id, old_ids.difference(new_ids))
+                await self._link(task_employee, "employee_id", task.id, [i for i in new_ids if i not in old_ids])
+            await self._publish("update", [task.id], unlinked_ids)
             await self.session.commit()
 
-            if data.projects:
-                task.projects = []
-                for project_id in data.projects:
-                    project = await get_obj_by_params(Project, {"id": project_id}, self.session)
-                    project_res = task_project.insert().values(task_id=task.id, project_id=project.id)
-                    await self.session.execute(project_res)
-            if data.employees:
-                task.employees = []
-                for employee_id in data.employees:
-                    employee = await get_obj_by_params(Employee, {"id": employee_id}, self.session)
-                    employee_res = task_employee.insert().values(task_id=task.id, employee_id=employee.id)
-                    await self.session.execute(employee_res)
-
-            await self.session.commit()
-            await self.session.refresh(task)
+            if data.projects is not None:
+                set_committed_value(task, "projects", projects)
+            if data.employees is not None:
+                set_committed_value(task, "employees", employees)
             return task
         except ValueError as e:
             raise HTTPException(status_code=400, detail=str(e))
         except IntegrityError as e:
             raise HTTPException(status_code=400, detail=str(e.orig).split(":")[-1].replace("\n", "").strip())
 
+    async def _get_for_update(self, ids: List[uuid.UUID], user: User, project_id: Optional[uuid.UUID] = None) -> Dict:
+        """
+        Lock active tasks by one query and mark the tasks where the user is author
+        :param ids: uuids of the tasks
+        :param user: current user
+        :param project_id: project uuid, the tasks must be on its board, their links are locked too
+        :return: dictionary with rows (id, status, is_author and rank on the board of the project) by id
+        """
+        author_id = select(Employee.id).where(Employee.user_id == user.id).scalar_subquery()
+        stmt = select(Task.id, Task.status, func.coalesce(Task.author_id == author_id, False).label("is_author")).where(
+            any_of(Task.id, ids), Task.is_active.is_(True)
+        )
+        if project_id is None:
+            stmt = stmt.with_for_update(of=Task)
+        else:
+            stmt = (
+                stmt.add_columns(task_project.c.rank)
+                .join(task_project, task_project.c.task_id == Task.id)
+                .where(task_project.c.project_id == project_id)
+                .with_for_update(of=(Task, task_project))
+            )
+        rows = {row.id: row for row in (await self.session.execute(stmt)).all()}
+        missing = set(ids) - set(rows)
+        if missing:
+            raise HTTPException(status_code=404, detail=f"Not found: {', '.join(sorted(map(str, missing)))}")
+        return rows
+
+    @staticmethod
+    def _check_author(rows: Iterable, user: User) -> None:
+        """
+        Users may change only their own tasks, moderators and admins any tasks
+        :param rows: rows of the tasks from _get_for_update
+        :param user: current user
+        """
+        if user.permission in (UserPermission.moderator, UserPermission.admin):
+            return
+        if not all(row.is_author for row in rows):
+            raise HTTPException(status_code=403, detail="Can't change task, where you are not author")
+
+    async def transition_many(self, ids: List[uuid.UUID], task_status: TaskStatus, user: User) -> Dict:
+        """
+        Move many active tasks to the status with one permission check and one set-based update
+        :param ids: uuids of the tasks
+        :param task_status: new status
+        :param user: current user
+        :return: dictionary with ids of the changed tasks and the status
+        """
+        rows = await self._get_for_update(ids, user)
+        self._check_author(rows.values(), user)
+
+        stmt = (
+            update(Task)
+            .where(any_of(Task.id, ids), Task.status.is_distinct_from(task_status))
+            .values(status=task_status)
+            .returning(Task.id)
+        )
+        changed = (await self.session.scalars(stmt)).all()
+        await self._publish("update", changed)
+        await self.session.commit()
+        return {"ids": changed, "status": task_status}
+
+    async def move_one_task(self, self_id: uuid.UUID, data: TaskMove, user: User) -> Dict:
+        """
+        Move task between two neighbors of the board column of the project.
+        Only the rank of the task on the board and the status of the task are written
+        :param self_id: task uuid
+        :param data: project, target status and neighbors, no previous task for the top, no next task for the bottom
+        :param user: current user
+        :return: dictionary with id, status and rank of the task
+        """
+        neighbor_ids = [i for i in (data.prev_id, data.next_id) if i is not None]
+        if self_id in neighbor_ids:
+            raise HTTPException(status_code=400, detail="Task can't be its own neighbor")
+        rows = await self._get_for_update([self_id, *neighbor_ids], user, data.project_id)
+        self._check_author([rows[self_id]], user)
+        old_status = rows[self_id].status
+        task_status = data.status or old_status
+        if any(rows[i].status != task_status for i in neighbor_ids):
+            raise HTTPException(status_code=400, detail="Neighbor tasks must be in the target column")
+
+        prev_rank = rows[data.prev_id].rank if data.prev_id else None
+        next_rank = rows[data.next_id].rank if data.next_id else None
+        if prev_rank is not None and next_rank is not None and prev_rank == next_rank:
+            # no room between tied ranks, respace only the tied tasks
+            await self.respace_tied_ranks(data.project_id, task_status, prev_rank)
+            rows = await self._get_for_update(neighbor_ids, user, data.project_id)
+            prev_rank, next_rank = rows[data.prev_id].rank, rows[data.next_id].rank
+        if prev_rank is not None and next_rank is not None and prev_rank > next_rank:
+            raise HTTPException(status_code=400, detail="Previous task must be above the next task")
+
+        if next_rank is None:
+            # the bottom of the column sorts with tasks created now
+            rank = new_rank()
+            if prev_rank is not None and rank <= prev_rank:
+                rank = rank_between(prev_rank, None)
+        else:
+            rank = rank_between(prev_rank, next_rank)
+        if task_status != old_status:
+            # ranks aren't synced, only a move to another column resends the task
+            await self.session.execute(update(Task).where(Task.id == self_id).values(status=task_status))
+        stmt = (
+            update(task_project)
+            .where(task_project.c.project_id == data.project_id, task_project.c.task_id == self_id)
+            .values(status=task_status, rank=rank)
+            .returning(task_project.c.task_id.label("id"), task_project.c.status, task_project.c.rank)
+        )
+        res = (await self.session.execute(stmt)).mappings().one()
+        await self._publish("update", [self_id])
+        await self.session.commit()
+        return dict(res)
+
+    async def respace_tied_ranks(self, project_id: uuid.UUID, task_status: TaskStatus, rank: str) -> int:
+        """
+        Give distinct ranks to the tasks of the column with the same rank, between the ranks around them.
+        Only the links of the tied tasks are locked and written. Doesn't commit
+        :param project_id: project uuid of the board
+        :param task_status: status of the column
+        :param rank: tied rank
+        :return: count of the tasks
+        """
+        column = and_(
+            task_project.c.project_id == project_id,
+            task_project.c.status == task_status,
+            task_project.c.is_active.is_(True),
+        )
+        stmt = (
+            select(task_project.c.task_id)
+            .where(column, task_project.c.rank == rank)
+            .order_by(task_project.c.task_id)
+            .with_for_update()
+        )
+        ids = (await self.session.scalars(stmt)).all()
+        before = await self.session.scalar(
+            select(func.max(task_project.c.rank)).where(column, task_project.c.rank < rank)
+        )
+        after = await self.session.scalar(
+            select(func.min(task_project.c.rank)).where(column, task_project.c.rank > rank)
+        )
+        await self._write_ranks(project_id, ids, ranks_between(before, after, len(ids)))
+        return len(ids)
+
+    async def rebalance_ranks(self, project_id: uuid.UUID, task_status: TaskStatus) -> int:
+        """
+        Replace ranks of all the tasks of the board column by short evenly spaced ranks in the same order.
+        Locks the whole column, runs only in the background job. Doesn't commit
+        :param project_id: project uuid of the board
+        :param task_status: status of the column
+        :return: count of the tasks
+        """
+        stmt = (
+            select(task_project.c.task_id)
+            .where(
+                task_project.c.project_id == project_id,
+                task_project.c.status == task_status,
+                task_project.c.is_active.is_(True),
+            )
+            .order_by(task_project.c.rank, task_project.c.task_id)
+            .with_for_update()
+        )
+        ids = (await self.session.scalars(stmt)).all()
+        if ids:
+            await self._write_ranks(project_id, ids, rank_sequence(len(ids), new_rank()))
+        return len(ids)
+
+    async def _write_ranks(self, project_id: uuid.UUID, ids: List[uuid.UUID], ranks: List[str]) -> None:
+        """
+        Write ranks of the tasks on the board by one executemany. Ranks are kept by the links,
+        so the rewrites of the columns don't change the tasks and don't resend them to the clients
+        :param project_id: project uuid of the board
+        :param ids: uuids of the tasks
+        :param ranks: new ranks in the order of the ids
+        """
+        stmt = (
+            update(task_project)
+            .where(task_project.c.project_id == project_id, task_project.c.task_id == bindparam("link_task_id"))
+            .values(rank=bindparam("link_rank"))
+        )
+        await self.session.execute(stmt, [{"link_task_id": i, "link_rank": rank} for i, rank in zip(ids, ranks)])
+
+    async def rebalance_long_ranks(self, max_length: int) -> List[Tuple[uuid.UUID, TaskStatus]]:
+        """
+        Rebalance the board columns which have ranks longer than max_length. Workers skip the run
+        while another worker holds the rebalance lock
+        :param max_length: max length of the rank
+        :return: project uuids and statuses of the rebalanced columns
+        """
+        if not await self.session.scalar(select(func.pg_try_advisory_xact_lock(TASK_RANK_LOCK_ID))):
+            return []
+        stmt = (
+            select(task_project.c.project_id, task_project.c.status)
+            .where(task_project.c.is_active.is_(True))
+            .group_by(task_project.c.project_id, task_project.c.status)
+            .having(func.max(func.length(task_project.c.rank)) > max_length)
+        )
+        columns = [tuple(row) for row in (await self.session.execute(stmt)).all()]
+        for project_id, task_status in columns:
+            await self.rebalance_ranks(project_id, task_status)
+        await self.session.commit()
+        return columns
+
+    async def add_many_tasks(self, data: List[TaskCreate]) -> Dict:
+        """
+        Add many task exemplars with their projects and employees in one transaction
+        :param data: tasks data
+        :return: dictionary with created exemplars and errors by item index
+        """
+        project_ids = await get_existing_ids(Project, [i for item in data for i in item.projects], self.session)
+        employee_ids = await get_existing_ids(
+            Employee, [i for item in data for i in item.employees + [item.author_id]], self.session
+        )
+
+        rows, errors = [], []
+        for index, item in enumerate(data):
+            missing = (set(item.projects) - project_ids) | (set(item.employees + [item.author_id]) - employee_ids)
+            if missing:
+                errors.append({"index": index, "detail": f"Not found: {', '.join(sorted(map(str, missing)))}"})
+                continue
+            try:
+                rows.append((index, self._validate_values(item.model_dump(exclude={"projects", "employees"}))))
+            except ValueError as e:
+                errors.append({"index": index, "detail": str(e)})
+
+        created = {}
+        if rows:
+            created, insert_errors = await self._insert_many(rows)
+            errors.extend(insert_errors)
+            project_links = [
+                {"task_id": task.id, "project_id": project_id, "status": task.status, "is_active": task.is_active}
+                for index, task in created.items()
+                for project_id in set(data[index].projects)
+            ]
+            employee_links = [
+                {"task_id": task.id, "employee_id": employee_id}
+                for index, task in created.items()
+                for employee_id in set(data[index].employees)
+            ]
+            if project_links:
+                await self.session.execute(insert(task_project), project_links)
+            if employee_links:
+                await self.session.execute(insert(task_employee), employee_links)
+            await self._publish("create", [task.id for task in created.values()])
+            await self.session.commit()
+
+        res = await self.session.scalars(
+            select(Task)
+            .where(Task.id.in_([task.id for task in created.values()]))
+            .options(*self.list_options)
+            .execution_options(populate_existing=True)
+        )
+        tasks = {task.id: task for task in res.all()}
+        return {
+            "items": [tasks[created[index].id] for index in sorted(created)],
+            "errors": sorted(errors, key=lambda e: e["index"]),
+        }
+
     async def deactivate_one_task_my(self, self_id: uuid.UUID, author_id: uuid.UUID) -> Dict:
         stmt = select(Task).join(Employee, Task.author_id == Employee.id).where(Employee.user_id == author_id)
         task = await self.session.execute(stmt)
@@ -104,24 +623,36 @@ class TaskRepository(SQLAlchemyRepository, RepositoryWithoutInactive):
 
 class EmployeeRepository(SQLAlchemyRepository):
     model = Employee
-
-    async def get_list_employees(self, offset: int, limit: int) -> List[EmployeeRead]:
+    # EmployeeReadWithTasks
+    one_options = (
+        joinedload(Employee.user),
+        joinedload(Employee.photo),
+        joinedload(Employee.department),
+        selectinload(Employee.my_tasks).options(*TASK_READ_OPTIONS),
+        selectinload(Employee.tasks).options(*TASK_READ_OPTIONS),
+    )
+
+    async def _publish(self, action: str, ids: Iterable[uuid.UUID]) -> None:
+        ids = list(ids)
+        await super()._publish(action, ids)
+        await publish_events(self.session, "employee", action, ids)
+
+    async def get_list_employees(
+        self, offset: int, limit: int, cursor: Optional[str] = None
+    ) -> Union[List[EmployeeRead], Dict]:
         """
         Get list of the employee exemplars
         :param offset: offset value
         :param limit: limit value
-        :return: list model exemplars
+        :param cursor: keyset cursor
+        :return: list model exemplars or cursor page
         """
         stmt = (
             select(self.model)
             .join(User, self.model.user_id == User.id)
             .where(User.is_active.is_(True), User.is_verify.is_(True))
-            .offset(offset)
-            .limit(limit)
         )
-        res = await self.session.execute(stmt)
-        res = [row[0] for row in res.all()]
-        return res
+        return await paginate(self.model, stmt, offset, limit, cursor, self.session)
 
     async def get_one_employee(self, self_id: uuid.UUID) -> Union[EmployeeReadWithTasks, None]:
         """
@@ -133,6 +664,7 @@ class EmployeeRepository(SQLAlchemyRepository):
             select(self.model)
             .join(User, self.model.user_id == User.id)
             .where(self.model.id == self_id, User.is_active.is_(True), User.is_verify.is_(True))
+            .options(*self.one_options)
         )
         res = await self.session.execute(stmt)
         res = res.scalar_one_or_none()
@@ -146,7 +678,7 @@ class EmployeeRepository(SQLAlchemyRepository):
         :param user_id: user uuid
         :return: model exemplar
         """
-        return await get_obj_by_params(Employee, {"user_id": user_id}, self.session)
+        return await get_obj_by_params(Employee, {"user_id": user_id}, self.session, self.one_options)
 
     async def edit_one_employee_me(
         self, user_id: uuid.UUID, data: MyEmployeeUpdate
@@ -157,8 +689,7 @@ class EmployeeRepository(SQLAlchemyRepository):
         :param data: new data
         :return: model exemplar
         """
-        employee = await get_obj_by_params(Employee, {"user_id": user_id}, self.session)
-        return await super().edit_one(employee.id, data)
+        return await self._update_one({"user_id": user_id}, self._get_update_values(data))
 
     async def deactivate_one_employee(self, employee_id: uuid.UUID) -> dict:
         """
@@ -173,15 +704,40 @@ class EmployeeRepository(SQLAlchemyRepository):
             raise ERROR_404
         user.is_active = False
         self.session.add(user)
+        await principal_cache.evict_on_commit(self.session, [user.id])
+        await refresh_tokens.revoke_users([user.id])
+        await self._publish("deactivate", [employee_id])
         await self.session.commit()
         return {"detail": "success"}
 
+    async def deactivate_many_employees(self, ids: List[uuid.UUID]) -> Dict:
+        """
+        Deactivate users of many employee exemplars with one UPDATE ... RETURNING
+        :param ids: uuids employee exemplars
+        :return: dictionary with deactivated employee ids and errors by id
+        """
+        stmt = (
+            update(User)
+            .where(User.id == Employee.user_id, Employee.id.in_(ids))
+            .values(is_active=False)
+            .returning(Employee.id, User.id)
+            .execution_options(synchronize_session=False)
+        )
+        res = (await self.session.execute(stmt)).all()
+        deactivated = [row[0] for row in res]
+        await principal_cache.evict_on_commit(self.session, [row[1] for row in res])
+        await refresh_tokens.revoke_users([row[1] for row in res])
+        await self._publish("deactivate", deactivated)
+        await self.session.commit()
+        errors = [{"id": self_id, "detail": ERROR_404.detail} for self_id in ids if self_id not in deactivated]
+        return {"ids": deactivated, "errors": errors}
+
 
 class PhotoRepository(SQLAlchemyRepository, RepositoryWithoutInactive):
     model = Photo
 
     async def __put_photo(self, user_id: uuid.UUID, image: File):
-        employee = await get_obj_by_params(Employee, {"user_id": user_id}, self.session)
+        employee = await get_obj_by_params(Employee, {"user_id": user_id}, self.session, (joinedload(Employee.user),))
 
         stmt = select(Photo).where(Photo.employee_id == employee.id)
         old_photo = await self.session.execute(stmt)
@@ -189,6 +745,7 @@ class PhotoRepository(SQLAlchemyRepository, RepositoryWithoutInactive):
         if old_photo:
             os.remove(old_photo.path)
             await self.session.delete(old_photo)
+            invalidate_on_commit(self.session, get_write_tags("photo", [old_photo.id]))
             await self.session.commit()
 
         try:
@@ -197,6 +754,7 @@ class PhotoRepository(SQLAlchemyRepository, RepositoryWithoutInactive):
             url = BASE_SITE_URL + "/media/" + image.filename
             res = Photo(url=url, path=filepath, employee_id=employee.id)
             self.session.add(res)
+            invalidate_on_commit(self.session, [*get_write_tags("photo", []), f"employee:{employee.id}"])
             await self.session.commit()
             await self.session.refresh(res)
 
@@ -213,6 +771,7 @@ class PhotoRepository(SQLAlchemyRepository, RepositoryWithoutInactive):
     async def __delete_photo(self, photo: Photo) -> dict:
         os.remove(photo.path)
         await self.session.delete(photo)
+        invalidate_on_commit(self.session, [*get_write_tags("photo", [photo.id]), f"employee:{photo.employee_id}"])
         await self.session.commit()
         return {"detail": "success"}
 
@@ -241,3 +800,102 @@ class PhotoRepository(SQLAlchemyRepository, RepositoryWithoutInactive):
         if not photo:
             raise ERROR_404
         return await self.__delete_photo(photo)
+
+
+class SyncRepository:
+    """
+    Changes of the tasks, projects and employees since the sync token.
+    The token is the oldest transaction which was running at the start of the sync,
+    rows of the transactions which commit later have no lower change_id.
+    Every model is paged by the (change_id, id) keyset, the continuation cursor keeps the token
+    of the first page and the last position of every model which has more rows
+    """
+
+    def __init__(self, session: AsyncSession):
+        self.session = session
+
+    async def _get_changed(
+        self,
+        stmt: Select,
+        is_active: ColumnElement,
+        changed: ColumnElement,
+        version: ColumnElement,
+        since: Optional[int],
+        after: Optional[List],
+        limit: int,
+    ) -> Tuple[List, List[uuid.UUID], Optional[List]]:
+        """
+        Get a page of the changed exemplars split by the activity
+        :param stmt: select of the model exemplars
+        :param is_active: activity of the exemplar
+        :param changed: condition of the change since the token
+        :param version: change_id of the exemplar, pages are ordered by it and by id
+        :param since: sync token, None for the first sync
+        :param after: [change_id, id] of the last exemplar of the previous page, None for the first page
+        :param limit: count of the exemplars in the page
+        :return: active exemplars, ids of inactive exemplars and position of the last exemplar if there are more
+        """
+        model = stmt.column_descriptions[0]["entity"]
+        stmt = stmt.where(is_active if since is None else changed)
+        if after is not None:
+            stmt = stmt.where(tuple_(version, model.id) > tuple_(after[0], uuid.UUID(after[1])))
+        stmt = stmt.add_columns(is_active, version).order_by(version, model.id).limit(limit + 1)
+        rows = (await self.session.execute(stmt)).all()
+        position = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            position = [rows[-1][2], str(rows[-1][0].id)]
+        return [row[0] for row in rows if row[1]], [row[0].id for row in rows if not row[1]], position
+
+    async def get_changes(self, since: Optional[int], limit: int, cursor: Optional[str] = None) -> Dict:
+        """
+        Get exemplars which were changed or deactivated since the token, at most limit of every model
+        :param since: sync token from the previous sync, None for the first sync
+        :param limit: count of the exemplars of every model in the page
+        :param cursor: next_cursor of the previous page, None for the first page
+        :return: dictionary with the changed exemplars, ids of the deactivated ones, the new token
+        and the cursor of the next page
+        """
+        if cursor is None:
+            token = await self.session.scalar(select(CHANGE_HORIZON))
+            positions = dict.fromkeys(("tasks", "projects", "employees"))
+        else:
+            state = decode_json_cursor(cursor)
+            try:
+                token, since = int(state.pop("token")), state.pop("since")
+                positions = {name: [int(state[name][0]), str(uuid.UUID(state[name][1]))] for name in state}
+            except (KeyError, IndexError, TypeError, ValueError):
+                raise ERROR_INVALID_CURSOR
+            if since is not None and not isinstance(since, int):
+                raise ERROR_INVALID_CURSOR
+        since_id = since or 0
+        queries = {
+            "tasks": (
+                select(Task).options(*TASK_READ_OPTIONS),
+                Task.is_active,
+                Task.change_id >= since_id,
+                Task.change_id,
+            ),
+            "projects": (select(Project), Project.is_active, Project.change_id >= since_id, Project.change_id),
+            "employees": (
+                select(Employee).join(User, Employee.user_id == User.id),
+                and_(User.is_active, User.is_verify),
+                or_(Employee.change_id >= since_id, User.change_id >= since_id),
+                func.greatest(Employee.change_id, User.change_id),
+            ),
+        }
+        changes, deleted, next_positions = {}, {}, {}
+        for name, (stmt, is_active, changed, version) in queries.items():
+            changes[name], deleted[name] = [], []
+            if name not in positions:
+                # all the changes of the model were sent by the previous pages
+                continue
+            changes[name], deleted[name], position = await self._get_changed(
+                stmt, is_active, changed, version, since, positions[name], limit
+            )
+            if position is not None:
+                next_positions[name] = position
+        next_cursor = None
+        if next_positions:
+            next_cursor = encode_json_cursor({"token": token, "since": since, **next_positions})
+        return {"token": token, **changes, "deleted": deleted, "next_cursor": next_cursor}
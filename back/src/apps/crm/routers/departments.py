@@ -1,14 +1,23 @@
 import uuid
-from typing import List
-from fastapi import APIRouter, Depends
-from fastapi_cache.decorator import cache
+from typing import Annotated, List, Union
+from fastapi import APIRouter, Body, Depends
 from sqlalchemy.ext.asyncio import AsyncSession
+from config import CACHE_EXPIRE_SECONDS
 from src.apps.auth.models import User
 from src.apps.auth.permissions import check_permission_user, check_permission_moderator
 from src.apps.crm.repositories import DepartmentRepository
-from src.apps.crm.schemas import DepartmentRead, DepartmentCreate, DepartmentUpdate, DepartmentReadWithEmployees
-from src.db.base_db import get_session
+from src.apps.crm.schemas import (
+    DepartmentRead,
+    DepartmentCreate,
+    DepartmentBulkUpdate,
+    DepartmentUpdate,
+    DepartmentReadWithEmployees,
+)
+from src.db.base_db import get_session, get_read_session
+from src.cache.decorator import cache
 from src.base_utils.base_depends import Pagination
+from src.base_utils.base_pagination import CursorPage
+from src.base_utils.base_schemas import BULK_MAX_ITEMS, BulkIds, BulkIdsResult, BulkResult
 
 router = APIRouter(
     prefix="/departments",
@@ -16,26 +25,53 @@ router = APIRouter(
 )
 
 
-@router.get("", response_model=List[DepartmentRead])
-@cache(expire=30)
+@router.get("", response_model=Union[List[DepartmentRead], CursorPage[DepartmentRead]])
+@cache(expire=CACHE_EXPIRE_SECONDS, tags=("department:list",))
 async def get_list(
     pagination: Pagination = Depends(Pagination),
-    session: AsyncSession = Depends(get_session),
+    session: AsyncSession = Depends(get_read_session),
     current_user: User = Depends(check_permission_user),
 ):
-    return await DepartmentRepository(session).get_list(pagination.skip, pagination.limit)
+    return await DepartmentRepository(session).get_list(pagination.skip, pagination.limit, pagination.cursor)
 
 
 @router.get("/{department_id}", response_model=DepartmentReadWithEmployees)
-@cache(expire=30)
+@cache(expire=CACHE_EXPIRE_SECONDS, tags=("employee:list",))
 async def get_one(
     department_id: uuid.UUID,
-    session: AsyncSession = Depends(get_session),
+    session: AsyncSession = Depends(get_read_session),
     current_user: User = Depends(check_permission_user),
 ):
     return await DepartmentRepository(session).get_one(department_id)
 
 
+@router.post("/bulk", response_model=BulkResult[DepartmentRead])
+async def add_many(
+    departments: Annotated[List[DepartmentCreate], Body(min_length=1, max_length=BULK_MAX_ITEMS)],
+    session: AsyncSession = Depends(get_session),
+    current_user: User = Depends(check_permission_moderator),
+):
+    return await DepartmentRepository(session).add_many(departments)
+
+
+@router.patch("/bulk", response_model=BulkResult[DepartmentRead])
+async def edit_many(
+    departments: Annotated[List[DepartmentBulkUpdate], Body(min_length=1, max_length=BULK_MAX_ITEMS)],
+    session: AsyncSession = Depends(get_session),
+    current_user: User = Depends(check_permission_moderator),
+):
+    return await DepartmentRepository(session).edit_many(departments)
+
+
+@router.post("/bulk/delete", response_model=BulkIdsResult)
+async def delete_many(
+    departments: BulkIds,
+    session: AsyncSession = Depends(get_session),
+    current_user: User = Depends(check_permission_moderator),
+):
+    return await DepartmentRepository(session).delete_many(departments.ids)
+
+
 @router.post("", response_model=DepartmentRead)
 async def add_one(
     department: DepartmentCreate,
@@ -1,8 +1,8 @@
 import uuid
-from typing import List
-from fastapi import APIRouter, Depends
-from fastapi_cache.decorator import cache
+from typing import Annotated, List, Union
+from fastapi import APIRouter, Body, Depends
 from sqlalchemy.ext.asyncio import AsyncSession
+from config import CACHE_EXPIRE_SECONDS
 from src.apps.auth.models import User
 from src.apps.auth.permissions import check_permission_user, check_permission_moderator
 from src.apps.auth.repositories import UserRepository
@@ -11,12 +11,16 @@ from src.apps.crm.schemas import (
     EmployeeRead,
     EmployeeReadWithTasks,
     EmployeeCreate,
+    EmployeeBulkUpdate,
     EmployeeUpdate,
     MyEmployeeCreate,
     MyEmployeeUpdate,
 )
-from src.db.base_db import get_session
+from src.db.base_db import get_session, get_read_session
+from src.cache.decorator import cache
 from src.base_utils.base_depends import Pagination
+from src.base_utils.base_pagination import CursorPage
+from src.base_utils.base_schemas import BULK_MAX_ITEMS, BulkIds, BulkIdsResult, BulkResult
 
 router = APIRouter(
     prefix="/employees",
@@ -24,26 +28,53 @@ router = APIRouter(
 )
 
 
-@router.get("", response_model=List[EmployeeRead])
-@cache(expire=30)
+@router.get("", response_model=Union[List[EmployeeRead], CursorPage[EmployeeRead]])
+@cache(expire=CACHE_EXPIRE_SECONDS, tags=("employee:list",))
 async def get_list(
     pagination: Pagination = Depends(Pagination),
-    session: AsyncSession = Depends(get_session),
+    session: AsyncSession = Depends(get_read_session),
     current_user: User = Depends(check_permission_user),
 ):
-    return await EmployeeRepository(session).get_list_employees(pagination.skip, pagination.limit)
+    return await EmployeeRepository(session).get_list_employees(pagination.skip, pagination.limit, pagination.cursor)
 
 
 @router.get("/{employee_id}", response_model=EmployeeReadWithTasks)
-@cache(expire=30)
+@cache(expire=CACHE_EXPIRE_SECONDS, tags=("task:list",))
 async def get_one(
     employee_id: uuid.UUID,
-    session: AsyncSession = Depends(get_session),
+    session: AsyncSession = Depends(get_read_session),
     current_user: User = Depends(check_permission_user),
 ):
     return await EmployeeRepository(session).get_one_employee(employee_id)
 
 
+@router.post("/bulk", response_model=BulkResult[EmployeeRead])
+async def add_many(
+    employees: Annotated[List[EmployeeCreate], Body(min_length=1, max_length=BULK_MAX_ITEMS)],
+    session: AsyncSession = Depends(get_session),
+    current_user: User = Depends(check_permission_moderator),
+):
+    return await EmployeeRepository(session).add_many(employees)
+
+
+@router.patch("/bulk", response_model=BulkResult[EmployeeRead])
+async def edit_many(
+    employees: Annotated[List[EmployeeBulkUpdate], Body(min_length=1, max_length=BULK_MAX_ITEMS)],
+    session: AsyncSession = Depends(get_session),
+    current_user: User = Depends(check_permission_moderator),
+):
+    return await EmployeeRepository(session).edit_many(employees)
+
+
+@router.post("/bulk/delete", response_model=BulkIdsResult)
+async def delete_many(
+    employees: BulkIds,
+    session: AsyncSession = Depends(get_session),
+    current_user: User = Depends(check_permission_moderator),
+):
+    return await EmployeeRepository(session).deactivate_many_employees(employees.ids)
+
+
 @router.post("", response_model=EmployeeRead)
 async def add_one(
     employee: EmployeeCreate,
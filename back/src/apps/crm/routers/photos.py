@@ -1,14 +1,16 @@
 import uuid
-from typing import List
+from typing import List, Union
 from fastapi import APIRouter, Depends, UploadFile, File
-from fastapi_cache.decorator import cache
 from sqlalchemy.ext.asyncio import AsyncSession
+from config import CACHE_EXPIRE_SECONDS
 from src.apps.auth.models import User
 from src.apps.auth.permissions import check_permission_user, check_permission_moderator
 from src.apps.crm.repositories import PhotoRepository
 from src.apps.crm.schemas import PhotoRead
-from src.db.base_db import get_session
+from src.db.base_db import get_session, get_read_session
+from src.cache.decorator import cache
 from src.base_utils.base_depends import Pagination
+from src.base_utils.base_pagination import CursorPage
 
 router = APIRouter(
     prefix="/photos",
@@ -16,21 +18,21 @@ router = APIRouter(
 )
 
 
-@router.get("", response_model=List[PhotoRead])
-@cache(expire=30)
+@router.get("", response_model=Union[List[PhotoRead], CursorPage[PhotoRead]])
+@cache(expire=CACHE_EXPIRE_SECONDS, tags=("photo:list",))
 async def get_list(
     pagination: Pagination = Depends(Pagination),
-    session: AsyncSession = Depends(get_session),
+    session: AsyncSession = Depends(get_read_session),
     current_user: User = Depends(check_permission_user),
 ):
-    return await PhotoRepository(session).get_list(pagination.skip, pagination.limit)
+    return await PhotoRepository(session).get_list(pagination.skip, pagination.limit, pagination.cursor)
 
 
 @router.get("/{photo_id}", response_model=PhotoRead)
-@cache(expire=30)
+@cache(expire=CACHE_EXPIRE_SECONDS)
 async def get_one(
     photo_id: uuid.UUID,
-    session: AsyncSession = Depends(get_session),
+    session: AsyncSession = Depends(get_read_session),
     current_user: User = Depends(check_permission_user),
 ):
     return await PhotoRepository(session).get_one(photo_id)
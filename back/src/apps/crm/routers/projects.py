@@ -1,14 +1,25 @@
 import uuid
-from typing import List
-from fastapi import APIRouter, Depends
-from fastapi_cache.decorator import cache
+from typing import Annotated, List, Optional, Union
+from fastapi import APIRouter, Body, Depends, Query
 from sqlalchemy.ext.asyncio import AsyncSession
+from config import CACHE_EXPIRE_SECONDS
 from src.apps.auth.models import User
 from src.apps.auth.permissions import check_permission_user, check_permission_moderator
+from src.apps.crm.models import TaskPriority, TaskStatus
 from src.apps.crm.repositories import ProjectRepository
-from src.apps.crm.schemas import ProjectRead, ProjectReadWithTasks, ProjectCreate, ProjectUpdate
-from src.db.base_db import get_session
+from src.apps.crm.schemas import (
+    BoardRead,
+    ProjectRead,
+    ProjectReadWithTasks,
+    ProjectCreate,
+    ProjectBulkUpdate,
+    ProjectUpdate,
+)
+from src.db.base_db import get_session, get_read_session
+from src.cache.decorator import cache
 from src.base_utils.base_depends import Pagination
+from src.base_utils.base_pagination import CursorPage
+from src.base_utils.base_schemas import BULK_MAX_ITEMS, BulkIds, BulkIdsResult, BulkResult
 
 router = APIRouter(
     prefix="/projects",
@@ -16,26 +27,70 @@ router = APIRouter(
 )
 
 
-@router.get("", response_model=List[ProjectRead])
-@cache(expire=30)
+@router.get("", response_model=Union[List[ProjectRead], CursorPage[ProjectRead]])
+@cache(expire=CACHE_EXPIRE_SECONDS, tags=("project:list",))
 async def get_list(
     pagination: Pagination = Depends(Pagination),
-    session: AsyncSession = Depends(get_session),
+    session: AsyncSession = Depends(get_read_session),
     current_user: User = Depends(check_permission_user),
 ):
-    return await ProjectRepository(session).get_list_without_inactive(pagination.skip, pagination.limit)
+    return await ProjectRepository(session).get_list_without_inactive(
+        pagination.skip, pagination.limit, pagination.cursor
+    )
 
 
 @router.get("/{project_id}", response_model=ProjectReadWithTasks)
-@cache(expire=30)
+@cache(expire=CACHE_EXPIRE_SECONDS, tags=("project:{project_id}:tasks", "project:tasks"))
 async def get_one(
     project_id: uuid.UUID,
-    session: AsyncSession = Depends(get_session),
+    session: AsyncSession = Depends(get_read_session),
     current_user: User = Depends(check_permission_user),
 ):
     return await ProjectRepository(session).get_one_without_inactive(project_id)
 
 
+@router.get("/{project_id}/board", response_model=BoardRead)
+@cache(expire=CACHE_EXPIRE_SECONDS, tags=("project:{project_id}", "project:{project_id}:tasks", "project:tasks"))
+async def get_board(
+    project_id: uuid.UUID,
+    skip: int = Query(0, ge=0, description="Offset inside every column"),
+    limit: int = Query(20, ge=1, le=100, description="Limit of every column"),
+    status: Optional[TaskStatus] = Query(None, description="Load only this column"),
+    priority: Optional[TaskPriority] = None,
+    employee_id: Optional[uuid.UUID] = Query(None, description="Assignee"),
+    session: AsyncSession = Depends(get_read_session),
+    current_user: User = Depends(check_permission_user),
+):
+    return await ProjectRepository(session).get_board(project_id, skip, limit, status, priority, employee_id)
+
+
+@router.post("/bulk", response_model=BulkResult[ProjectRead])
+async def add_many(
+    projects: Annotated[List[ProjectCreate], Body(min_length=1, max_length=BULK_MAX_ITEMS)],
+    session: AsyncSession = Depends(get_session),
+    current_user: User = Depends(check_permission_moderator),
+):
+    return await ProjectRepository(session).add_many(projects)
+
+
+@router.patch("/bulk", response_model=BulkResult[ProjectRead])
+async def edit_many(
+    projects: Annotated[List[ProjectBulkUpdate], Body(min_length=1, max_length=BULK_MAX_ITEMS)],
+    session: AsyncSession = Depends(get_session),
+    current_user: User = Depends(check_permission_moderator),
+):
+    return await ProjectRepository(session).edit_many(projects)
+
+
+@router.post("/bulk/delete", response_model=BulkIdsResult)
+async def delete_many(
+    projects: BulkIds,
+    session: AsyncSession = Depends(get_session),
+    current_user: User = Depends(check_permission_moderator),
+):
+    return await ProjectRepository(session).deactivate_many(projects.ids)
+
+
 @router.post("", response_model=ProjectRead)
 async def add_one(
     project: ProjectCreate,
@@ -0,0 +1,28 @@
+from typing import Optional
+from fastapi import APIRouter, Depends, Query
+from sqlalchemy.ext.asyncio import AsyncSession
+from src.apps.auth.models import User
+from src.apps.auth.permissions import check_permission_user
+from src.apps.crm.repositories import SyncRepository
+from src.apps.crm.schemas import SyncRead
+from src.db.base_db import get_read_session
+
+router = APIRouter(
+    prefix="/sync",
+    tags=["Sync"],
+)
+
+
+@router.get("", response_model=SyncRead)
+async def get_changes(
+    since: Optional[int] = Query(None, ge=0, description="Token from the previous sync, none for all active exemplars"),
+    limit: int = Query(500, ge=1, le=1000, description="Max count of the exemplars of every model in the page"),
+    cursor: Optional[str] = Query(
+        None,
+        description="next_cursor of the previous page, since is taken from it. "
+        "Keep the token only after the last page, which has no next_cursor",
+    ),
+    session: AsyncSession = Depends(get_read_session),
+    current_user: User = Depends(check_permission_user),
+):
+    return await SyncRepository(session).get_changes(since, limit, cursor)
@@ -1,8 +1,8 @@
 import uuid
-from typing import List
-from fastapi import APIRouter, Depends
-from fastapi_cache.decorator import cache
+from typing import Annotated, List, Union
+from fastapi import APIRouter, Body, Depends
 from sqlalchemy.ext.asyncio import AsyncSession
+from config import CACHE_EXPIRE_SECONDS
 from src.apps.auth.models import User
 from src.apps.auth.permissions import check_permission_user, check_permission_moderator
 from src.apps.crm.repositories import TaskRepository
@@ -10,12 +10,20 @@ from src.apps.crm.schemas import (
     TaskRead,
     TaskReadWithProjectsAndEmployees,
     TaskCreate,
+    TaskBulkUpdate,
     TaskUpdate,
     MyTaskCreate,
     MyTaskUpdate,
+    TaskTransition,
+    TaskTransitionResult,
+    TaskMove,
+    TaskMoveResult,
 )
-from src.db.base_db import get_session
+from src.db.base_db import get_session, get_read_session
+from src.cache.decorator import cache
 from src.base_utils.base_depends import Pagination
+from src.base_utils.base_pagination import CursorPage
+from src.base_utils.base_schemas import BULK_MAX_ITEMS, BulkIds, BulkIdsResult, BulkResult
 
 router = APIRouter(
     prefix="/tasks",
@@ -23,26 +31,62 @@ router = APIRouter(
 )
 
 
-@router.get("", response_model=List[TaskRead])
-@cache(expire=30)
+@router.get("", response_model=Union[List[TaskRead], CursorPage[TaskRead]])
+@cache(expire=CACHE_EXPIRE_SECONDS, tags=("task:list",))
 async def get_list(
     pagination: Pagination = Depends(Pagination),
-    session: AsyncSession = Depends(get_session),
+    session: AsyncSession = Depends(get_read_session),
     current_user: User = Depends(check_permission_user),
 ):
-    return await TaskRepository(session).get_list_without_inactive(pagination.skip, pagination.limit)
+    return await TaskRepository(session).get_list_without_inactive(pagination.skip, pagination.limit, pagination.cursor)
 
 
 @router.get("/{task_id}", response_model=TaskReadWithProjectsAndEmployees)
-@cache(expire=30)
+@cache(expire=CACHE_EXPIRE_SECONDS)
 async def get_one(
     task_id: uuid.UUID,
-    session: AsyncSession = Depends(get_session),
+    session: AsyncSession = Depends(get_read_session),
     current_user: User = Depends(check_permission_user),
 ):
     return await TaskRepository(session).get_one_without_inactive(task_id)
 
 
+@router.post("/bulk", response_model=BulkResult[TaskRead])
+async def add_many(
+    tasks: Annotated[List[TaskCreate], Body(min_length=1, max_length=BULK_MAX_ITEMS)],
+    session: AsyncSession = Depends(get_session),
+    current_user: User = Depends(check_permission_moderator),
+):
+    return await TaskRepository(session).add_many_tasks(tasks)
+
+
+@router.patch("/bulk", response_model=BulkResult[TaskRead])
+async def edit_many(
+    tasks: Annotated[List[TaskBulkUpdate], Body(min_length=1, max_length=BULK_MAX_ITEMS)],
+    session: AsyncSession = Depends(get_session),
+    current_user: User = Depends(check_permission_moderator),
+):
+    return await TaskRepository(session).edit_many(tasks)
+
+
+@router.post("/bulk/delete", response_model=BulkIdsResult)
+async def delete_many(
+    tasks: BulkIds,
+    session: AsyncSession = Depends(get_session),
+    current_user: User = Depends(check_permission_moderator),
+):
+    return await TaskRepository(session).deactivate_many(tasks.ids)
+
+
+@router.post("/transition", response_model=TaskTransitionResult)
+async def transition_many(
+    transition: TaskTransition,
+    session: AsyncSession = Depends(get_session),
+    current_user: User = Depends(check_permission_user),
+):
+    return await TaskRepository(session).transition_many(transition.ids, transition.status, current_user)
+
+
 @router.post("", response_model=TaskRead)
 async def add_one(
     task: TaskCreate,
@@ -62,6 +106,16 @@ async def edit_one(
     return await TaskRepository(session).edit_one_task(task_id, task, current_user.id)
 
 
+@router.patch("/{task_id}/move", response_model=TaskMoveResult)
+async def move_one(
+    task_id: uuid.UUID,
+    move: TaskMove,
+    session: AsyncSession = Depends(get_session),
+    current_user: User = Depends(check_permission_user),
+):
+    return await TaskRepository(session).move_one_task(task_id, move, current_user)
+
+
 @router.delete("/{task_id}")
 async def delete_one(
     task_id: uuid.UUID,
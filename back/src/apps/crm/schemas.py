@@ -4,6 +4,7 @@ from typing import Optional, List
 from pydantic import BaseModel
 from src.apps.auth.schemas import UserRead
 from src.apps.crm.models import TaskStatus, TaskPriority
+from src.base_utils.base_schemas import BulkIds
 
 
 class PhotoCreate(BaseModel):
@@ -55,6 +56,11 @@ class EmployeeUpdate(BaseModel):
     user_id: Optional[uuid.UUID] = None
 
 
+class EmployeeBulkUpdate(MyEmployeeUpdate):
+    id: uuid.UUID
+    user_id: Optional[uuid.UUID] = None
+
+
 class DepartmentCreate(BaseModel):
     title: str
 
@@ -67,6 +73,10 @@ class DepartmentUpdate(BaseModel):
     title: Optional[str] = None
 
 
+class DepartmentBulkUpdate(DepartmentUpdate):
+    id: uuid.UUID
+
+
 class ProjectCreate(BaseModel):
     title: str
     description: Optional[str] = None
@@ -82,6 +92,10 @@ class ProjectUpdate(BaseModel):
     description: Optional[str] = None
 
 
+class ProjectBulkUpdate(ProjectUpdate):
+    id: uuid.UUID
+
+
 class MyTaskCreate(BaseModel):
     title: str
     description: Optional[str] = None
@@ -117,6 +131,38 @@ class TaskUpdate(MyTaskUpdate):
     author_id: Optional[uuid.UUID] = None
 
 
+class TaskBulkUpdate(BaseModel):
+    id: uuid.UUID
+    title: Optional[str] = None
+    description: Optional[str] = None
+    status: Optional[TaskStatus] = None
+    priority: Optional[TaskPriority] = None
+    end: Optional[datetime.date] = None
+    author_id: Optional[uuid.UUID] = None
+
+
+class TaskTransition(BulkIds):
+    status: TaskStatus
+
+
+class TaskTransitionResult(BaseModel):
+    ids: List[uuid.UUID]
+    status: TaskStatus
+
+
+class TaskMove(BaseModel):
+    project_id: uuid.UUID
+    status: Optional[TaskStatus] = None
+    prev_id: Optional[uuid.UUID] = None
+    next_id: Optional[uuid.UUID] = None
+
+
+class TaskMoveResult(BaseModel):
+    id: uuid.UUID
+    status: TaskStatus
+    rank: str
+
+
 class TaskReadWithProjectsAndEmployees(BaseModel):
     id: uuid.UUID
     title: str
@@ -150,3 +196,41 @@ class EmployeeReadWithTasks(BaseModel):
 
 class ProjectReadWithTasks(ProjectRead):
     tasks: Optional[List[TaskRead]] = None
+
+
+class BoardTaskRead(BaseModel):
+    id: uuid.UUID
+    title: str
+    description: Optional[str] = None
+    status: TaskStatus
+    priority: TaskPriority
+    end: Optional[datetime.date] = None
+    author_id: uuid.UUID
+    rank: str
+    employees: List[uuid.UUID]
+
+
+class BoardColumnRead(BaseModel):
+    status: TaskStatus
+    total: int
+    tasks: List[BoardTaskRead]
+
+
+class BoardRead(BaseModel):
+    project_id: uuid.UUID
+    columns: List[BoardColumnRead]
+
+
+class SyncDeleted(BaseModel):
+    tasks: List[uuid.UUID]
+    projects: List[uuid.UUID]
+    employees: List[uuid.UUID]
+
+
+class SyncRead(BaseModel):
+    token: int
+    tasks: List[TaskRead]
+    projects: List[ProjectRead]
+    employees: List[EmployeeRead]
+    deleted: SyncDeleted
+    next_cursor: Optional[str] = None
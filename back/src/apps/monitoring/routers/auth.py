@@ -0,0 +1,20 @@
+from fastapi import APIRouter, Depends
+from src.apps.auth.hashing import hashing_pool
+from src.apps.auth.models import User
+from src.apps.auth.permissions import check_permission_moderator
+from src.apps.monitoring.schemas import HashingStatsRead
+
+router = APIRouter(
+    prefix="/monitoring/auth",
+    tags=["Monitoring"],
+)
+
+
+@router.get(
+    "/hashing",
+    response_model=HashingStatsRead,
+    summary="Get password hashing statistics",
+    description="Get load and queue times of the password hashing pool of this worker",
+)
+async def get_hashing(current_user: User = Depends(check_permission_moderator)):
+    return hashing_pool.as_dict()
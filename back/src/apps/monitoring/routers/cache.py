@@ -0,0 +1,33 @@
+from typing import Dict
+from fastapi import APIRouter, Depends
+from fastapi_cache import FastAPICache
+from src.apps.auth.models import User
+from src.apps.auth.permissions import check_permission_moderator
+from src.apps.monitoring.schemas import CacheRouteStatsRead, CacheTierStatsRead
+from src.cache.stats import cache_stats
+
+router = APIRouter(
+    prefix="/monitoring/cache",
+    tags=["Monitoring"],
+)
+
+
+@router.get(
+    "/routes",
+    response_model=Dict[str, CacheRouteStatsRead],
+    summary="Get cache statistics",
+    description="Get cache hits and misses of this worker by route",
+)
+async def get_routes(current_user: User = Depends(check_permission_moderator)):
+    return cache_stats.as_dict()
+
+
+@router.get(
+    "/tiers",
+    response_model=Dict[str, CacheTierStatsRead],
+    summary="Get cache tiers statistics",
+    description="Get hits and misses of the local and Redis tiers of this worker, empty for a single tier backend",
+)
+async def get_tiers(current_user: User = Depends(check_permission_moderator)):
+    as_dict = getattr(FastAPICache.get_backend(), "as_dict", None)
+    return as_dict() if as_dict else {}
@@ -0,0 +1,32 @@
+from fastapi import APIRouter, Depends
+from src.apps.auth.models import User
+from src.apps.auth.permissions import check_permission_moderator
+from src.apps.monitoring.schemas import PoolStatsRead, ReplicaStatsRead
+from src.db.base_db import engine, replica_monitor
+from src.db.pool import get_pool_stats
+
+router = APIRouter(
+    prefix="/monitoring/db",
+    tags=["Monitoring"],
+)
+
+
+@router.get(
+    "/pool",
+    response_model=PoolStatsRead,
+    summary="Get pool statistics",
+    description="Get live statistics of the database connection pool",
+)
+async def get_pool(current_user: User = Depends(check_permission_moderator)):
+    return get_pool_stats(engine)
+
+
+@router.get(
+    "/replica",
+    response_model=ReplicaStatsRead,
+    summary="Get replica state",
+    description="Get health and lag of the read replica",
+)
+async def get_replica(current_user: User = Depends(check_permission_moderator)):
+    await replica_monitor.is_available()
+    return replica_monitor.as_dict()
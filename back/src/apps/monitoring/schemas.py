@@ -0,0 +1,49 @@
+from typing import Optional
+from pydantic import BaseModel
+
+
+class PoolStatsRead(BaseModel):
+    pool_size: int
+    checked_in: int
+    checked_out: int
+    overflow: int
+    max_overflow: int
+    checkouts: int
+    timeouts: int
+    wait_total_ms: float
+    wait_avg_ms: float
+    wait_max_ms: float
+
+
+class ReplicaStatsRead(BaseModel):
+    configured: bool
+    healthy: bool
+    lag_seconds: Optional[float] = None
+
+
+class CacheRouteStatsRead(BaseModel):
+    hits: int
+    misses: int
+    hit_ratio: float
+
+
+class CacheTierStatsRead(BaseModel):
+    enabled: bool
+    rejected: Optional[int] = None
+    hits: int
+    misses: int
+    hit_ratio: float
+    entries: Optional[int] = None
+    bytes: Optional[int] = None
+
+
+class HashingStatsRead(BaseModel):
+    workers: int
+    max_pending: int
+    pending: int
+    calls: int
+    rejected: int
+    wait_total_ms: float
+    wait_avg_ms: float
+    wait_max_ms: float
+    run_avg_ms: float
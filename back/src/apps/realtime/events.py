@@ -0,0 +1,85 @@
+import json
+import uuid
+from typing import Iterable, List, Optional
+from sqlalchemy import Text, cast, func, literal, literal_column, select, true
+from sqlalchemy.dialects.postgresql import ARRAY, UUID
+from sqlalchemy.ext.asyncio import AsyncSession
+from config import REALTIME_CHANNEL
+from src.apps.crm.models import task_project
+from src.base_utils.base_repository import any_of
+
+# NOTIFY payloads are limited to 8000 bytes, events carry at most this count of ids
+EVENT_IDS_CHUNK = 100
+
+
+def _chunks(ids: Iterable[uuid.UUID]) -> List[List[uuid.UUID]]:
+    ids = list(dict.fromkeys(ids))
+    return [ids[start:][:EVENT_IDS_CHUNK] for start in range(0, len(ids), EVENT_IDS_CHUNK)]
+
+
+async def publish_events(
+    session: AsyncSession, entity: str, action: str, ids: Iterable[uuid.UUID], by_project: bool = False
+) -> None:
+    """
+    Publish change events by one NOTIFY statement. Postgres delivers them on commit of the session
+    :param session: async session inside the write transaction
+    :param entity: name of the changed model
+    :param action: create, update, delete or deactivate
+    :param ids: uuids of the changed exemplars
+    :param by_project: exemplars are projects, every event goes to the subscribers of its project,
+    otherwise events go to all the subscribers
+    """
+    if by_project:
+        payloads = [
+            json.dumps({"entity": entity, "action": action, "project": str(i), "ids": [str(i)]})
+            for chunk in _chunks(ids)
+            for i in chunk
+        ]
+    else:
+        payloads = [
+            json.dumps({"entity": entity, "action": action, "project": None, "ids": list(map(str, chunk))})
+            for chunk in _chunks(ids)
+        ]
+    if not payloads:
+        return
+    payload = func.unnest(cast(payloads, ARRAY(Text))).table_valued("payload").render_derived()
+    await session.execute(select(func.pg_notify(REALTIME_CHANNEL, payload.c.payload)))
+
+
+async def publish_task_events(
+    session: AsyncSession, action: str, ids: Iterable[uuid.UUID], project_ids: Optional[Iterable[uuid.UUID]] = None
+) -> List[uuid.UUID]:
+    """
+    Publish one change event per project of the tasks. Projects are taken from task_project
+    inside the same statement as NOTIFY
+    :param session: async session inside the write transaction
+    :param action: create, update, delete or deactivate
+    :param ids: uuids of the changed tasks
+    :param project_ids: projects which must get the events too, like projects the tasks were unlinked from
+    :return: uuids of the projects which got the events
+    """
+    res = set()
+    for chunk in _chunks(ids):
+        links = select(task_project.c.project_id, task_project.c.task_id).where(any_of(task_project.c.task_id, chunk))
+        if project_ids:
+            projects = func.unnest(cast(list(project_ids), ARRAY(UUID))).table_valued("project_id").render_derived()
+            tasks = func.unnest(cast(chunk, ARRAY(UUID))).table_valued("task_id").render_derived()
+            links = links.union(
+                select(projects.c.project_id, tasks.c.task_id).select_from(projects.join(tasks, true()))
+            )
+        links = links.subquery()
+        payload = func.json_build_object(
+            literal_column("'entity'"),
+            literal_column("'task'"),
+            literal_column("'action'"),
+            cast(literal(action), Text),
+            literal_column("'project'"),
+            links.c.project_id,
+            literal_column("'ids'"),
+            func.array_agg(links.c.task_id),
+        )
+        stmt = select(links.c.project_id, func.pg_notify(REALTIME_CHANNEL, cast(payload, Text))).group_by(
+            links.c.project_id
+        )
+        res.update((await session.execute(stmt)).scalars())
+    return list(res)
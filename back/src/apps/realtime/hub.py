@@ -0,0 +1,170 @@
+import asyncio
+import contextlib
+import json
+import logging
+from collections import defaultdict
+from typing import Callable, Dict, List, Optional, Set, Union
+import asyncpg
+from config import LISTEN_DATABASE_URL, REALTIME_CHANNEL, REALTIME_QUEUE_SIZE
+
+logger = logging.getLogger(__name__)
+
+RESYNC_EVENT = json.dumps({"action": "resync"})
+PING_EVENT = json.dumps({"action": "ping"})
+
+
+class EventHub:
+    """
+    Fan out of the change events to the subscribers of this worker by project
+    """
+
+    def __init__(self, queue_size: int):
+        self.queue_size = queue_size
+        self._subscribers: Dict[str, Set[asyncio.Queue]] = defaultdict(set)
+        self.events = 0
+        self.dropped = 0
+
+    def subscribe(self, project_id: str) -> asyncio.Queue:
+        """
+        Subscribe to the events of the project
+        :param project_id: project uuid
+        :return: queue of the event payloads
+        """
+        queue = asyncio.Queue(self.queue_size)
+        self._subscribers[project_id].add(queue)
+        return queue
+
+    def unsubscribe(self, project_id: str, queue: asyncio.Queue) -> None:
+        """
+        Remove the subscriber
+        :param project_id: project uuid
+        :param queue: queue from subscribe
+        """
+        queues = self._subscribers.get(project_id)
+        if queues is not None:
+            queues.discard(queue)
+            if not queues:
+                del self._subscribers[project_id]
+
+    def publish(self, payload: str) -> None:
+        """
+        Pass the event to the subscribers of its project, events without project go to all subscribers
+        :param payload: event json
+        """
+        try:
+            project_id = json.loads(payload).get("project")
+        except ValueError:
+            return
+        self.events += 1
+        if project_id is None:
+            targets = [queue for queues in self._subscribers.values() for queue in queues]
+        else:
+            targets = list(self._subscribers.get(project_id, ()))
+        for queue in targets:
+            self._put(queue, payload)
+
+    def resync(self) -> None:
+        """
+        Tell all the subscribers that events were lost and their data must be reloaded
+        """
+        for queues in self._subscribers.values():
+            for queue in list(queues):
+                self._put(queue, RESYNC_EVENT)
+
+    def _put(self, queue: asyncio.Queue, payload: str) -> None:
+        try:
+            queue.put_nowait(payload)
+        except asyncio.QueueFull:
+            # slow subscriber, its backlog is replaced by one resync event
+            self.dropped += queue.qsize()
+            while not queue.empty():
+                queue.get_nowait()
+            queue.put_nowait(RESYNC_EVENT)
+
+    def as_dict(self) -> Dict[str, int]:
+        """
+        Snapshot of the hub state
+        :return: dictionary
+        """
+        return {
+            "connections": sum(len(queues) for queues in self._subscribers.values()),
+            "projects": len(self._subscribers),
+            "events": self.events,
+            "dropped": self.dropped,
+        }
+
+
+class EventListener:
+    """
+    Dedicated connection which LISTENs the channel and passes the notifications to the hub.
+    Other channels can share the connection. Reconnects after loss of the connection
+    """
+
+    def __init__(self, dsn: str, channel: str, hub: EventHub, reconnect_delay: float = 1.0):
+        self.dsn = dsn
+        self.channel = channel
+        self.hub = hub
+        self.reconnect_delay = reconnect_delay
+        self.listening = False
+        self._handlers: Dict[str, List[Callable[[str], None]]] = {channel: [hub.publish]}
+        self._resyncs: List[Callable[[], None]] = [hub.resync]
+        self._task: Optional[asyncio.Task] = None
+
+    def add_channel(self, channel: str, on_payload: Callable[[str], None], on_resync: Callable[[], None]) -> None:
+        """
+        LISTEN one more channel or add one more callback of the channel, must be called before start
+        :param channel: name of the channel
+        :param on_payload: callback of the notifications
+        :param on_resync: callback after every connection, notifications could be lost
+        """
+        self._handlers.setdefault(channel, []).append(on_payload)
+        self._resyncs.append(on_resync)
+
+    def start(self) -> None:
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task:
+            self._task.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await self._task
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                conn = await asyncpg.connect(self.dsn)
+            except (OSError, asyncpg.PostgresError):
+                await asyncio.sleep(self.reconnect_delay)
+                continue
+            closed = asyncio.Event()
+            conn.add_termination_listener(lambda _: closed.set())
+            try:
+                for channel in self._handlers:
+                    await conn.add_listener(channel, self._on_notify)
+                self.listening = True
+                # notifications sent before the channels were listened are lost
+                for resync in self._resyncs:
+                    resync()
+                await closed.wait()
+            except (OSError, asyncpg.PostgresError, asyncpg.InterfaceError):
+                logger.warning("Error listening notifications, reconnecting:", exc_info=True)
+            finally:
+                self.listening = False
+                with contextlib.suppress(OSError, asyncpg.PostgresError, asyncpg.InterfaceError):
+                    await conn.close()
+            await asyncio.sleep(self.reconnect_delay)
+
+    def _on_notify(self, connection: asyncpg.Connection, pid: int, channel: str, payload: str) -> None:
+        for on_payload in self._handlers[channel]:
+            on_payload(payload)
+
+    def as_dict(self) -> Dict[str, Union[bool, int]]:
+        """
+        Snapshot of the listener and hub state
+        :return: dictionary
+        """
+        return {"listening": self.listening, **self.hub.as_dict()}
+
+
+event_hub = EventHub(REALTIME_QUEUE_SIZE)
+event_listener = EventListener(LISTEN_DATABASE_URL, REALTIME_CHANNEL, event_hub)
@@ -0,0 +1,104 @@
+import asyncio
+import uuid
+from typing import AsyncIterator
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, WebSocket, WebSocketDisconnect, status
+from fastapi.responses import StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
+from config import REALTIME_HEARTBEAT_SECONDS
+from src.apps.auth.models import User
+from src.apps.auth.permissions import check_permission_moderator, check_permission_user
+from src.apps.auth.utils import JWTBearer, get_user_by_token
+from src.apps.realtime.hub import PING_EVENT, event_hub, event_listener
+from src.apps.realtime.schemas import RealtimeStatsRead
+from src.db.base_db import get_session
+
+router = APIRouter(
+    prefix="/realtime",
+    tags=["Realtime"],
+)
+
+
+async def get_subscriber(token: str, session: AsyncSession) -> User:
+    """
+    Check the token and permissions of the subscriber, then release the session:
+    subscriptions live long and must not hold pool connections
+    :param token: access jwt token
+    :param session: async session
+    :return: user
+    """
+    try:
+        user = await get_user_by_token(token, session)
+    finally:
+        await session.close()
+    return await check_permission_user(user)
+
+
+async def subscriber(token: str = Depends(JWTBearer()), session: AsyncSession = Depends(get_session)) -> User:
+    return await get_subscriber(token, session)
+
+
+async def stream_events(request: Request, project_id: str) -> AsyncIterator[str]:
+    queue = event_hub.subscribe(project_id)
+    try:
+        while True:
+            try:
+                payload = await asyncio.wait_for(queue.get(), REALTIME_HEARTBEAT_SECONDS)
+            except asyncio.TimeoutError:
+                if await request.is_disconnected():
+                    break
+                yield ": ping\n\n"
+                continue
+            yield f"data: {payload}\n\n"
+    finally:
+        event_hub.unsubscribe(project_id, queue)
+
+
+@router.get(
+    "/projects/{project_id}/events",
+    summary="Subscribe to the project events",
+    description="Server-sent events with changes of the tasks of the project and of projects and employees",
+)
+async def get_project_events(project_id: uuid.UUID, request: Request, current_user: User = Depends(subscriber)):
+    return StreamingResponse(
+        stream_events(request, str(project_id)),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@router.websocket("/projects/{project_id}/ws")
+async def project_events_ws(
+    websocket: WebSocket,
+    project_id: uuid.UUID,
+    token: str = Query(description="Access token, browsers can't set headers of the WebSocket"),
+    session: AsyncSession = Depends(get_session),
+):
+    try:
+        await get_subscriber(token, session)
+    except HTTPException:
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
+        return
+    await websocket.accept()
+    queue = event_hub.subscribe(str(project_id))
+    try:
+        while True:
+            try:
+                payload = await asyncio.wait_for(queue.get(), REALTIME_HEARTBEAT_SECONDS)
+            except asyncio.TimeoutError:
+                # finds closed sockets of the idle projects
+                payload = PING_EVENT
+            await websocket.send_text(payload)
+    except WebSocketDisconnect:
+        pass
+    finally:
+        event_hub.unsubscribe(str(project_id), queue)
+
+
+@router.get(
+    "/stats",
+    response_model=RealtimeStatsRead,
+    summary="Get realtime statistics",
+    description="Get state of the LISTEN connection and subscribers of this worker",
+)
+async def get_stats(current_user: User = Depends(check_permission_moderator)):
+    return event_listener.as_dict()
@@ -0,0 +1,9 @@
+from pydantic import BaseModel
+
+
+class RealtimeStatsRead(BaseModel):
+    listening: bool
+    connections: int
+    projects: int
+    events: int
+    dropped: int
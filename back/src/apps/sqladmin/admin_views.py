@@ -1,7 +1,14 @@
+from typing import Any
+from fastapi import Request
 from sqladmin import ModelView
+from sqlalchemy.ext.asyncio import async_object_session
 
 from src.apps.auth.models import User
+from src.apps.auth.principals import principal_cache, publish_evictions
+from src.apps.auth.refresh import refresh_tokens
 from src.apps.crm.models import Department, Photo, Employee, Project, Task
+from src.apps.crm.repositories import ProjectRepository, TaskRepository
+from src.db.base_db import async_session_maker
 
 
 class UserAdmin(ModelView, model=User):
@@ -12,6 +19,26 @@ class UserAdmin(ModelView, model=User):
     # name_plural = "Categories"
     can_export = False
 
+    async def after_model_change(self, data: dict, model: Any, is_created: bool, request: Request) -> None:
+        await self._evict_principal(model)
+        if not model.is_active:
+            await refresh_tokens.revoke_users([model.id])
+
+    async def after_model_delete(self, model: Any, request: Request) -> None:
+        await self._evict_principal(model)
+        await refresh_tokens.revoke_users([model.id])
+
+    @staticmethod
+    async def _evict_principal(user: User) -> None:
+        """
+        Remove the user changed by admin from the principal caches of all the workers
+        :param user: changed user
+        """
+        principal_cache.evict([user.id])
+        async with async_session_maker() as session:
+            await publish_evictions(session, [user.id])
+            await session.commit()
+
 
 class DepartmentAdmin(ModelView, model=Department):
     column_list = "__all__"
@@ -48,6 +75,9 @@ class ProjectAdmin(ModelView, model=Project):
     # name_plural = "Categories"
     can_export = False
 
+    async def on_model_delete(self, model: Any, request: Request) -> None:
+        await ProjectRepository(async_object_session(model)).touch_linked_tasks([model.id])
+
 
 class TaskAdmin(ModelView, model=Task):
     column_list = "__all__"
@@ -56,3 +86,9 @@ class TaskAdmin(ModelView, model=Task):
     column_details_list = "__all__"
     # name_plural = "Categories"
     can_export = False
+
+    async def after_model_change(self, data: dict, model: Any, is_created: bool, request: Request) -> None:
+        # the form writes the task and its links without the copies of the task on the links
+        async with async_session_maker() as session:
+            await TaskRepository(session).sync_links([model.id])
+            await session.commit()
@@ -1,7 +1,18 @@
+from typing import Optional
 from fastapi import Query
 
 
 class Pagination:
-    def __init__(self, skip: int = 0, limit: int = Query(default=100, lte=100)):
+    def __init__(
+        self,
+        skip: int = 0,
+        limit: int = Query(default=100, lte=100),
+        cursor: Optional[str] = Query(
+            default=None,
+            description="Keyset pagination cursor. Pass an empty value for the first page, "
+            "then next_cursor of the previous page. Skip is ignored in this mode",
+        ),
+    ):
         self.skip = skip
         self.limit = limit
+        self.cursor = cursor
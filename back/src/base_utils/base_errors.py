@@ -2,3 +2,10 @@ from fastapi import HTTPException, status
 
 ERROR_401 = HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid authorization credentials")
 ERROR_404 = HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Not found")
+ERROR_503_BUSY = HTTPException(
+    status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail="Server is busy, try again later"
+)
+ERROR_503_UNAVAILABLE = HTTPException(
+    status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail="Service is temporarily unavailable, try again later"
+)
+ERROR_INVALID_CURSOR = HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor")
@@ -0,0 +1,59 @@
+import base64
+import binascii
+import json
+import uuid
+from typing import Any, Dict, Generic, List, Optional, TypeVar
+from pydantic import BaseModel
+from src.base_utils.base_errors import ERROR_INVALID_CURSOR
+
+T = TypeVar("T")
+
+
+class CursorPage(BaseModel, Generic[T]):
+    items: List[T]
+    next_cursor: Optional[str] = None
+
+
+def encode_cursor(last_id: uuid.UUID) -> str:
+    """
+    Make opaque cursor from the last id of the page
+    :param last_id: uuid of the last exemplar
+    :return: cursor
+    """
+    return base64.urlsafe_b64encode(last_id.bytes).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> uuid.UUID:
+    """
+    Get last id of the previous page from the cursor
+    :param cursor: cursor
+    :return: uuid of the last exemplar
+    """
+    try:
+        return uuid.UUID(bytes=base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+    except (ValueError, binascii.Error):
+        raise ERROR_INVALID_CURSOR
+
+
+def encode_json_cursor(state: Dict[str, Any]) -> str:
+    """
+    Make opaque cursor from the state of the pagination
+    :param state: json serializable dictionary
+    :return: cursor
+    """
+    return base64.urlsafe_b64encode(json.dumps(state, separators=(",", ":")).encode()).decode().rstrip("=")
+
+
+def decode_json_cursor(cursor: str) -> Dict[str, Any]:
+    """
+    Get state of the pagination from the cursor
+    :param cursor: cursor
+    :return: dictionary
+    """
+    try:
+        state = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+    except (ValueError, binascii.Error):
+        raise ERROR_INVALID_CURSOR
+    if not isinstance(state, dict):
+        raise ERROR_INVALID_CURSOR
+    return state
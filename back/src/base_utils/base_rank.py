@@ -0,0 +1,94 @@
+import random
+import string
+import time
+from typing import List, Optional
+
+# Ranks are compared as plain strings, so the alphabet is in ASCII order
+# and rank columns must use the "C" collation. Ranks never end with the first
+# char of the alphabet, otherwise no rank could be made right before them
+RANK_ALPHABET = string.digits + string.ascii_uppercase + string.ascii_lowercase
+RANK_BASE = len(RANK_ALPHABET)
+RANK_WIDTH = 10
+RANK_SUFFIX_LENGTH = 4
+
+
+def encode_rank(number: int, width: int = RANK_WIDTH) -> str:
+    """
+    Encode non negative number as fixed width rank
+    :param number: number
+    :param width: count of the rank digits
+    :return: rank
+    """
+    digits = []
+    for _ in range(width):
+        number, digit = divmod(number, RANK_BASE)
+        digits.append(RANK_ALPHABET[digit])
+    if number:
+        raise ValueError("Number is too big for the rank width")
+    return "".join(reversed(digits))
+
+
+def new_rank() -> str:
+    """
+    Rank of the new exemplar, after all ranks made before it.
+    Random suffix separates ranks made in the same microsecond
+    :return: rank
+    """
+    suffix = "".join(random.choices(RANK_ALPHABET[1:], k=RANK_SUFFIX_LENGTH))
+    return encode_rank(time.time_ns() // 1000) + suffix
+
+
+def rank_between(before: Optional[str], after: Optional[str]) -> str:
+    """
+    Make rank which sorts between two ranks
+    :param before: rank of the previous exemplar, None for the start
+    :param after: rank of the next exemplar, None for the end
+    :return: rank
+    """
+    before = before or ""
+    if after is not None and before >= after:
+        raise ValueError("Previous rank must be less than next rank")
+    res = []
+    i = 0
+    while True:
+        low = RANK_ALPHABET.index(before[i]) if i < len(before) else 0
+        high = RANK_ALPHABET.index(after[i]) if after is not None and i < len(after) else RANK_BASE
+        if high - low > 1:
+            res.append(RANK_ALPHABET[(low + high) // 2])
+            return "".join(res)
+        res.append(RANK_ALPHABET[low])
+        if high - low == 1:
+            # the prefix is already less than the next rank
+            after = None
+        i += 1
+
+
+def ranks_between(before: Optional[str], after: Optional[str], count: int) -> List[str]:
+    """
+    Make ranks which sort between two ranks, split in halves to keep them short
+    :param before: rank of the previous exemplar, None for the start
+    :param after: rank of the next exemplar, None for the end
+    :param count: count of the ranks
+    :return: list of ranks in ascending order
+    """
+    if count <= 0:
+        return []
+    middle = rank_between(before, after)
+    left = (count - 1) // 2
+    return [*ranks_between(before, middle, left), middle, *ranks_between(middle, after, count - 1 - left)]
+
+
+def rank_sequence(count: int, end: str) -> List[str]:
+    """
+    Make evenly spaced fixed width ranks which all sort before the end rank
+    :param count: count of the ranks
+    :param end: upper bound of the ranks
+    :return: list of ranks in ascending order
+    """
+    upper = 0
+    for char in end[:RANK_WIDTH].ljust(RANK_WIDTH, RANK_ALPHABET[0]):
+        upper = upper * RANK_BASE + RANK_ALPHABET.index(char)
+    step = upper // (count + 1)
+    if step == 0:
+        raise ValueError("Too many ranks for the bound")
+    return [encode_rank(step * (i + 1)) + RANK_ALPHABET[-1] for i in range(count)]
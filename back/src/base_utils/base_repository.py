@@ -1,23 +1,30 @@
 import uuid
-from typing import List, Dict, Union
+from typing import List, Dict, Optional, Union, Tuple, Iterable, Set, Sequence
 from fastapi import HTTPException, status
 from pydantic import BaseModel
-from sqlalchemy import select
+from sqlalchemy import ColumnElement, Select, any_, bindparam, select, insert, update, delete
+from sqlalchemy.dialects.postgresql import ARRAY, insert as pg_insert
 from sqlalchemy.exc import IntegrityError
 from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm.interfaces import LoaderOption
 from src.base_utils.base_errors import ERROR_404
+from src.base_utils.base_pagination import encode_cursor, decode_cursor
+from src.cache.tags import get_write_tags, invalidate_on_commit
 from src.db.base_db import Base
 
 
-async def get_obj_by_params(model: Base, filter_params: dict, session: AsyncSession) -> Union[BaseModel, None]:
+async def get_obj_by_params(
+    model: Base, filter_params: dict, session: AsyncSession, options: Sequence[LoaderOption] = ()
+) -> Union[BaseModel, None]:
     """
     Get model exemplar by user id
     :param model: ORM model
     :param filter_params: params for filter model
     :param session: async session
+    :param options: relationship loader options
     :return: model exemplar
     """
-    stmt = select(model).filter_by(**filter_params)
+    stmt = select(model).filter_by(**filter_params).options(*options)
     res = await session.execute(stmt)
     res = res.scalar_one_or_none()
     if not res:
@@ -25,27 +32,117 @@ async def get_obj_by_params(model: Base, filter_params: dict, session: AsyncSess
     return res
 
 
+def integrity_detail(e: IntegrityError) -> str:
+    """
+    Get human readable detail of the integrity error
+    :param e: integrity error
+    :return: detail
+    """
+    return str(e.orig).split(":")[-1].replace("\n", "").strip()
+
+
+def any_of(column: ColumnElement, values: Iterable) -> ColumnElement:
+    """
+    Make "column = ANY(:values)" condition with one array parameter
+    :param column: column
+    :param values: values for compare
+    :return: condition
+    """
+    return column == any_(bindparam(None, list(values), type_=ARRAY(column.type)))
+
+
+async def get_existing_ids(model: Base, ids: Iterable[uuid.UUID], session: AsyncSession) -> Set[uuid.UUID]:
+    """
+    Get ids which exist in the model table with one query
+    :param model: ORM model
+    :param ids: ids for check
+    :param session: async session
+    :return: set of existing ids
+    """
+    ids = set(ids)
+    if not ids:
+        return set()
+    res = await session.scalars(select(model.id).where(any_of(model.id, ids)))
+    return set(res.all())
+
+
+async def get_objs_by_ids(model: Base, ids: Iterable[uuid.UUID], session: AsyncSession) -> List[BaseModel]:
+    """
+    Get model exemplars by ids with one query, in order of the ids
+    :param model: ORM model
+    :param ids: ids of the exemplars
+    :param session: async session
+    :return: list model exemplars
+    """
+    ids = list(dict.fromkeys(ids))
+    if not ids:
+        return []
+    res = await session.scalars(select(model).where(any_of(model.id, ids)))
+    objs = {obj.id: obj for obj in res.all()}
+    if len(objs) != len(ids):
+        raise ERROR_404
+    return [objs[self_id] for self_id in ids]
+
+
+async def paginate(
+    model: Base, stmt: Select, offset: int, limit: int, cursor: Optional[str], session: AsyncSession
+) -> Union[List[BaseModel], Dict]:
+    """
+    Get one page of the select ordered by id
+    :param model: ORM model
+    :param stmt: select statement
+    :param offset: offset value, used without cursor
+    :param limit: limit value
+    :param cursor: keyset cursor, empty string for the first page, None for offset mode
+    :param session: async session
+    :return: list model exemplars or dictionary with items and next_cursor
+    """
+    stmt = stmt.order_by(model.id)
+    if cursor is None:
+        res = await session.execute(stmt.offset(offset).limit(limit))
+        return list(res.scalars().all())
+
+    if cursor:
+        stmt = stmt.where(model.id > decode_cursor(cursor))
+    res = await session.execute(stmt.limit(limit + 1))
+    items = list(res.scalars().all())
+    next_cursor = encode_cursor(items[limit - 1].id) if len(items) > limit else None
+    return {"items": items[:limit], "next_cursor": next_cursor}
+
+
 class BaseCRUDRepository:
     """
-    Base CRUD repository
+    Base CRUD repository.
+    Relationships are not loaded by default, list_options and one_options
+    declare the load graph for the list and get one response schemas
     """
 
     model = None
+    list_options: Sequence[LoaderOption] = ()
+    one_options: Sequence[LoaderOption] = ()
 
     def __init__(self, session: AsyncSession):
         self.session = session
 
-    async def get_list(self, offset: int, limit: int) -> List[BaseModel]:
+    async def _publish(self, action: str, ids: Iterable[uuid.UUID]) -> None:
+        """
+        Publish change events of the exemplars inside the write transaction, before commit.
+        By default evicts the cached responses of the exemplars and of the model lists after commit
+        :param action: create, update, delete or deactivate
+        :param ids: uuids of the changed exemplars
+        """
+        invalidate_on_commit(self.session, get_write_tags(self.model.__tablename__, ids))
+
+    async def get_list(self, offset: int, limit: int, cursor: Optional[str] = None) -> Union[List[BaseModel], Dict]:
         """
         Get list of the model exemplars
         :param offset: offset value
         :param limit: limit value
-        :return: list model exemplars
+        :param cursor: keyset cursor
+        :return: list model exemplars or cursor page
         """
-        stmt = select(self.model).offset(offset).limit(limit)
-        res = await self.session.execute(stmt)
-        res = [row[0] for row in res.all()]
-        return res
+        stmt = select(self.model).options(*self.list_options)
+        return await paginate(self.model, stmt, offset, limit, cursor, self.session)
 
     async def get_one(self, self_id: uuid.UUID) -> BaseModel:
         """
@@ -53,7 +150,7 @@ class BaseCRUDRepository:
         :param self_id: uuid of the exemplar
         :return: model exemplar
         """
-        return await get_obj_by_params(self.model, {"id": self_id}, self.session)
+        return await get_obj_by_params(self.model, {"id": self_id}, self.session, self.one_options)
 
     async def add_one(self, data: BaseModel, user_id: uuid.UUID = None) -> BaseModel:
         """
@@ -68,6 +165,8 @@ class BaseCRUDRepository:
                 data["user_id"] = user_id
             res = self.model(**data)
             self.session.add(res)
+            await self.session.flush()
+            await self._publish("create", [res.id])
             await self.session.commit()
             await self.session.refresh(res)
             return res
@@ -78,35 +177,208 @@ class BaseCRUDRepository:
                 status_code=status.HTTP_400_BAD_REQUEST, detail=str(e.orig).split(":")[-1].replace("\n", "").strip()
             )
 
-    async def edit_one(self, self_id: uuid.UUID, data: BaseModel) -> BaseModel:
+    async def edit_one(self, self_id: uuid.UUID, data: BaseModel) -> Dict:
         """
         Edit one model exemplar
         :param self_id: uuid model exemplar
         :param data: new data
         :return: exemplar data
         """
+        return await self._update_one({"id": self_id}, self._get_update_values(data))
+
+    async def delete_one(self, self_id: uuid.UUID) -> Dict:
+        """
+        Delete one model exemplar with one DELETE ... RETURNING
+        :param self_id: uuid model exemplar
+        :return: dictionary
+        """
+        stmt = delete(self.model).where(self.model.id == self_id).returning(self.model.id)
         try:
-            res = await get_obj_by_params(self.model, {"id": self_id}, self.session)
-            res_data = data.model_dump(exclude_unset=True)
-            for key, value in res_data.items():
-                setattr(res, key, value)
-            self.session.add(res)
+            res = await self.session.scalars(stmt)
+            deleted_id = res.one_or_none()
+            if deleted_id:
+                await self._publish("delete", [deleted_id])
             await self.session.commit()
-            await self.session.refresh(res)
-            return res
+        except IntegrityError as e:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=integrity_detail(e))
+        if not deleted_id:
+            raise ERROR_404
+        return {"detail": "success"}
+
+    async def _update_one(self, filter_params: Dict, values: Dict) -> Dict:
+        """
+        Update one row with UPDATE ... RETURNING and build exemplar data from the returned row
+        :param filter_params: params for filter model, must match one row
+        :param values: new column values
+        :return: exemplar data
+        """
+        columns = self.model.__table__.columns
+        if values:
+            stmt = update(self.model).filter_by(**filter_params).values(**values).returning(*columns)
+        else:
+            stmt = select(*columns).filter_by(**filter_params)
+        try:
+            res = await self.session.execute(stmt)
+            row = res.mappings().one_or_none()
+            if values and row:
+                await self._publish("update", [row["id"]])
+            await self.session.commit()
+        except IntegrityError as e:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=integrity_detail(e))
+        if not row:
+            raise ERROR_404
+        return dict(row)
+
+    def _get_update_values(self, data: BaseModel) -> Dict:
+        """
+        Get validated column values which were set in the data
+        :param data: new data
+        :return: column values
+        """
+        try:
+            return self._validate_values(
+                data.model_dump(exclude_unset=True, include=set(self.model.__table__.columns.keys()))
+            )
         except ValueError as e:
             raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
 
-    async def delete_one(self, self_id: uuid.UUID) -> Dict:
+    def _validate_values(self, values: Dict) -> Dict:
         """
-        Delete one model exemplar
-        :param self_id: uuid model exemplar
-        :return: dictionary
+        Run model validators over the values without adding exemplar to the session
+        :param values: column values
+        :return: validated values
+        """
+        exemplar = self.model(**values)
+        return {key: getattr(exemplar, key) for key in values}
+
+    async def _insert_many(self, rows: List[Tuple[int, Dict]]) -> Tuple[Dict[int, BaseModel], List[Dict]]:
+        """
+        Insert rows with one multi-row INSERT ... RETURNING. If the batch violates
+        a constraint, rows are retried one by one in savepoints for find failed ones
+        :param rows: pairs of the item index and column values
+        :return: created exemplars by item index and errors
+        """
+        stmt = insert(self.model).returning(self.model, sort_by_parameter_order=True)
+        try:
+            async with self.session.begin_nested():
+                res = await self.session.scalars(stmt, [values for _, values in rows])
+                return dict(zip([index for index, _ in rows], res.all())), []
+        except IntegrityError:
+            pass
+
+        created, errors = {}, []
+        for index, values in rows:
+            try:
+                async with self.session.begin_nested():
+                    res = await self.session.scalars(stmt, [values])
+                    created[index] = res.one()
+            except IntegrityError as e:
+                errors.append({"index": index, "detail": integrity_detail(e)})
+        return created, errors
+
+    async def add_many(self, data: List[BaseModel], exclude: Optional[Set[str]] = None) -> Dict:
+        """
+        Add many model exemplars in one transaction
+        :param data: exemplars data
+        :param exclude: fields of the data which are not model columns
+        :return: dictionary with created exemplars and errors by item index
+        """
+        rows, errors = [], []
+        for index, item in enumerate(data):
+            try:
+                rows.append((index, self._validate_values(item.model_dump(exclude=exclude))))
+            except ValueError as e:
+                errors.append({"index": index, "detail": str(e)})
+
+        created = {}
+        if rows:
+            created, insert_errors = await self._insert_many(rows)
+            errors.extend(insert_errors)
+            await self._publish("create", [exemplar.id for exemplar in created.values()])
+            await self.session.commit()
+        return {
+            "items": [created[index] for index in sorted(created)],
+            "errors": sorted(errors, key=lambda e: e["index"]),
+        }
+
+    async def edit_many(self, data: List[BaseModel]) -> Dict:
+        """
+        Edit many model exemplars with bulk UPDATE by primary key
+        :param data: new data, every item has id
+        :return: dictionary with changed exemplars and errors by item index
         """
-        res = await get_obj_by_params(self.model, {"id": self_id}, self.session)
-        await self.session.delete(res)
+        existing_ids = await get_existing_ids(self.model, [item.id for item in data], self.session)
+        rows, errors = [], []
+        for index, item in enumerate(data):
+            if item.id not in existing_ids:
+                errors.append({"index": index, "id": item.id, "detail": ERROR_404.detail})
+                continue
+            try:
+                values = self._validate_values(item.model_dump(exclude_unset=True, exclude={"id"}))
+            except ValueError as e:
+                errors.append({"index": index, "id": item.id, "detail": str(e)})
+                continue
+            if values:
+                rows.append((index, {"id": item.id, **values}))
+
+        try:
+            if rows:
+                async with self.session.begin_nested():
+                    await self.session.execute(update(self.model), [values for _, values in rows])
+        except IntegrityError:
+            for index, values in rows:
+                try:
+                    async with self.session.begin_nested():
+                        await self.session.execute(update(self.model), [values])
+                except IntegrityError as e:
+                    errors.append({"index": index, "id": values["id"], "detail": integrity_detail(e)})
+        failed_ids = {error["id"] for error in errors}
+        changed_ids = [item.id for item in data if item.id in existing_ids and item.id not in failed_ids]
+        await self._publish("update", [values["id"] for _, values in rows if values["id"] not in failed_ids])
+        await self.session.commit()
+
+        res = await self.session.scalars(
+            select(self.model)
+            .where(self.model.id.in_(changed_ids))
+            .options(*self.list_options)
+            .execution_options(populate_existing=True)
+        )
+        items = {item.id: item for item in res.all()}
+        return {
+            "items": [items[self_id] for self_id in changed_ids],
+            "errors": sorted(errors, key=lambda e: e["index"]),
+        }
+
+    async def delete_many(self, ids: List[uuid.UUID]) -> Dict:
+        """
+        Delete many model exemplars with one DELETE ... RETURNING
+        :param ids: uuids model exemplars
+        :return: dictionary with deleted ids and errors by id
+        """
+        stmt = delete(self.model).returning(self.model.id)
+        deleted, errors = [], []
+        try:
+            async with self.session.begin_nested():
+                res = await self.session.scalars(stmt.where(self.model.id.in_(ids)))
+                deleted = list(res.all())
+        except IntegrityError:
+            for self_id in ids:
+                try:
+                    async with self.session.begin_nested():
+                        res = await self.session.scalars(stmt.where(self.model.id == self_id))
+                        deleted.extend(res.all())
+                except IntegrityError as e:
+                    errors.append({"id": self_id, "detail": integrity_detail(e)})
+        await self._publish("delete", deleted)
         await self.session.commit()
-        return {"detail": "success"}
+
+        failed_ids = {error["id"] for error in errors}
+        errors.extend(
+            {"id": self_id, "detail": ERROR_404.detail}
+            for self_id in ids
+            if self_id not in failed_ids and self_id not in deleted
+        )
+        return {"ids": deleted, "errors": errors}
 
 
 class SQLAlchemyRepository(BaseCRUDRepository):
@@ -114,18 +386,40 @@ class SQLAlchemyRepository(BaseCRUDRepository):
     Base CRUD repository with PUT method
     """
 
-    async def put_one(self, self_id: uuid.UUID, data: BaseModel) -> BaseModel:
+    async def put_one(self, self_id: uuid.UUID, data: BaseModel) -> Dict:
         """
-        Put one model exemplar
+        Put one model exemplar with one INSERT ... ON CONFLICT (id) DO UPDATE ... RETURNING.
+        New exemplar gets all fields of the data, existing one only the fields which were set
         :param self_id: uuid model exemplar
-        :param data: new data
+        :param data: new data with all required fields, like for add_one
         :return: exemplar data
         """
-        res = await self.session.get(self.model, self_id)
-        if not res:
-            return await super().add_one(data)
-        else:
-            return await super().edit_one(self_id, data)
+        columns = self.model.__table__.columns
+        try:
+            values = self._validate_values(data.model_dump(include=set(columns.keys())))
+        except ValueError as e:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+        update_keys = set(self._get_update_values(data).keys()) or {"id"}
+
+        stmt = pg_insert(self.model).values(id=self_id, **values)
+        set_ = {key: stmt.excluded[key] for key in update_keys}
+        # ON CONFLICT DO UPDATE doesn't apply onupdate of the columns
+        set_.update(
+            {
+                column.key: column.onupdate.arg
+                for column in columns
+                if column.onupdate is not None and column.onupdate.is_clause_element
+            }
+        )
+        stmt = stmt.on_conflict_do_update(index_elements=[self.model.id], set_=set_).returning(*columns)
+        try:
+            res = await self.session.execute(stmt)
+            row = res.mappings().one()
+            await self._publish("update", [row["id"]])
+            await self.session.commit()
+        except IntegrityError as e:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=integrity_detail(e))
+        return dict(row)
 
 
 class RepositoryWithoutInactive:
@@ -135,18 +429,21 @@ class RepositoryWithoutInactive:
 
     model = None
     session = None
+    list_options: Sequence[LoaderOption] = ()
+    one_options: Sequence[LoaderOption] = ()
 
-    async def get_list_without_inactive(self, offset: int, limit: int) -> List[BaseModel]:
+    async def get_list_without_inactive(
+        self, offset: int, limit: int, cursor: Optional[str] = None
+    ) -> Union[List[BaseModel], Dict]:
         """
         Get list of the model exemplars without inactive
         :param offset: offset value
         :param limit: limit value
-        :return: list model exemplars
+        :param cursor: keyset cursor
+        :return: list model exemplars or cursor page
         """
-        stmt = select(self.model).where(self.model.is_active.is_(True)).offset(offset).limit(limit)
-        res = await self.session.execute(stmt)
-        res = [row[0] for row in res.all()]
-        return res
+        stmt = select(self.model).where(self.model.is_active.is_(True)).options(*self.list_options)
+        return await paginate(self.model, stmt, offset, limit, cursor, self.session)
 
     async def get_one_without_inactive(self, self_id: uuid.UUID) -> BaseModel:
         """
@@ -154,16 +451,34 @@ class RepositoryWithoutInactive:
         :param self_id: uuid of the exemplar
         :return: model exemplar
         """
-        return await get_obj_by_params(self.model, {"id": self_id, "is_active": True}, self.session)
+        return await get_obj_by_params(self.model, {"id": self_id, "is_active": True}, self.session, self.one_options)
 
     async def deactivate_one(self, self_id: uuid.UUID) -> Dict:
         """
-        Deactivate one model exemplar
+        Deactivate one model exemplar with one UPDATE ... RETURNING
         :param self_id: uuid model exemplar
         :return: dictionary
         """
-        res = await get_obj_by_params(self.model, {"id": self_id}, self.session)
-        res.is_active = False
-        self.session.add(res)
+        stmt = update(self.model).where(self.model.id == self_id).values(is_active=False).returning(self.model.id)
+        res = await self.session.scalars(stmt)
+        deactivated_id = res.one_or_none()
+        if deactivated_id:
+            await self._publish("deactivate", [deactivated_id])
         await self.session.commit()
+        if not deactivated_id:
+            raise ERROR_404
         return {"detail": "success"}
+
+    async def deactivate_many(self, ids: List[uuid.UUID]) -> Dict:
+        """
+        Deactivate many model exemplars with one UPDATE ... RETURNING
+        :param ids: uuids model exemplars
+        :return: dictionary with deactivated ids and errors by id
+        """
+        stmt = update(self.model).where(self.model.id.in_(ids)).values(is_active=False).returning(self.model.id)
+        res = await self.session.scalars(stmt)
+        deactivated = list(res.all())
+        await self._publish("deactivate", deactivated)
+        await self.session.commit()
+        errors = [{"id": self_id, "detail": ERROR_404.detail} for self_id in ids if self_id not in deactivated]
+        return {"ids": deactivated, "errors": errors}
@@ -0,0 +1,27 @@
+import uuid
+from typing import Generic, List, Optional, TypeVar
+from pydantic import BaseModel, Field
+
+T = TypeVar("T")
+
+BULK_MAX_ITEMS = 1000
+
+
+class BulkItemError(BaseModel):
+    index: Optional[int] = None
+    id: Optional[uuid.UUID] = None
+    detail: str
+
+
+class BulkResult(BaseModel, Generic[T]):
+    items: List[T]
+    errors: List[BulkItemError]
+
+
+class BulkIds(BaseModel):
+    ids: List[uuid.UUID] = Field(min_length=1, max_length=BULK_MAX_ITEMS)
+
+
+class BulkIdsResult(BaseModel):
+    ids: List[uuid.UUID]
+    errors: List[BulkItemError]
@@ -0,0 +1,297 @@
+import asyncio
+import contextlib
+import json
+import logging
+from typing import Awaitable, Callable, Dict, Iterable, Optional, Set, Tuple, TypeVar, Union
+from fastapi_cache import FastAPICache
+from fastapi_cache.backends.redis import RedisBackend
+from redis.asyncio.client import Pipeline
+from redis.asyncio.lock import Lock
+from redis.exceptions import RedisError
+from src.cache.breaker import CircuitBreaker
+from src.cache.local import LocalCache
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+# more tags failed to evict than this are replaced by the flush of the whole cache
+MAX_PENDING_TAGS = 10000
+
+
+class TaggedRedisBackend(RedisBackend):
+    """
+    Redis backend which indexes the keys by tags. A tag is a set of the keys,
+    eviction of the tags deletes the keys with a pipeline.
+    With the circuit breaker errors of Redis are logged and the calls return misses,
+    tags which failed to evict are evicted after recovery.
+    Every eviction marks the replica window, misses inside it are not computed on the lagging replica
+    """
+
+    def __init__(self, redis, tag_expire: int, breaker: Optional[CircuitBreaker] = None, replica_window: float = 0):
+        super().__init__(redis)
+        self.tag_expire = tag_expire
+        self.breaker = breaker
+        self.replica_window = replica_window
+        self._pending_tags: Set[str] = set()
+        self._flush = False
+        self._replay: Optional[asyncio.Task] = None
+
+    async def _guarded(self, call: Callable[[], Awaitable[T]], default: T) -> T:
+        """
+        Call Redis through the circuit breaker
+        :param call: coroutine function with the Redis commands
+        :param default: result of the rejected and failed calls
+        :return: result of the call or default
+        """
+        if self.breaker is None:
+            return await call()
+        if not self.breaker.allow():
+            return default
+        try:
+            res = await call()
+        except (RedisError, OSError, asyncio.TimeoutError):
+            self.breaker.failure()
+            logger.warning("Error calling Redis cache backend:", exc_info=True)
+            return default
+        self.breaker.success()
+        if (self._pending_tags or self._flush) and self._replay is None:
+            self._replay = asyncio.create_task(self._replay_invalidations())
+        return res
+
+    async def _replay_invalidations(self) -> None:
+        try:
+            if self._flush:
+                self._flush = False
+                self._pending_tags.clear()
+                if await self.clear(namespace=FastAPICache.get_prefix()) is None:
+                    self._flush = True
+            else:
+                await self.invalidate(())
+        finally:
+            self._replay = None
+
+    def _keep_pending(self, tags: Set[str]) -> None:
+        self._pending_tags.update(tags)
+        if len(self._pending_tags) > MAX_PENDING_TAGS:
+            self._pending_tags.clear()
+            self._flush = True
+
+    async def get_with_ttl(self, key: str) -> Tuple[int, Optional[bytes]]:
+        return await self._guarded(lambda: super(TaggedRedisBackend, self).get_with_ttl(key), (0, None))
+
+    async def get(self, key: str) -> Optional[bytes]:
+        return await self._guarded(lambda: super(TaggedRedisBackend, self).get(key), None)
+
+    async def set(self, key: str, value: bytes, expire: Optional[int] = None) -> None:
+        await self._guarded(lambda: super(TaggedRedisBackend, self).set(key, value, expire), None)
+
+    async def clear(self, namespace: Optional[str] = None, key: Optional[str] = None) -> Optional[int]:
+        return await self._guarded(lambda: super(TaggedRedisBackend, self).clear(namespace, key), None)
+
+    @staticmethod
+    def tag_key(tag: str) -> str:
+        return f"{FastAPICache.get_prefix()}:tag:{tag}"
+
+    @staticmethod
+    def evicted_key() -> str:
+        return f"{FastAPICache.get_prefix()}:evicted"
+
+    async def recently_evicted(self) -> bool:
+        """
+        Check if tags were evicted inside the replica window, the replica may not have the evicting writes yet
+        :return: bool, True while Redis is unavailable
+        """
+        if not self.replica_window:
+            return False
+        return bool(await self._guarded(lambda: self.redis.exists(self.evicted_key()), 1))
+
+    def recompute_lock(self, key: str, timeout: float) -> Optional[Lock]:
+        """
+        Lock which lets one worker recompute the key
+        :param key: cache key
+        :param timeout: the lock is released after this time if the worker is gone
+        :return: not blocking lock, None while the circuit breaker is open
+        """
+        if self.breaker is not None and not self.breaker.closed:
+            return None
+        return self.redis.lock(f"{key}:lock", timeout=timeout, blocking=False)
+
+    async def set_tagged(self, key: str, value: bytes, expire: Optional[int], tags: Iterable[str]) -> None:
+        """
+        Set the value and add the key to the tags
+        :param key: cache key
+        :param value: encoded response
+        :param expire: ttl of the key
+        :param tags: tags of the response
+        """
+
+        async def call() -> None:
+            async with self.redis.pipeline(transaction=False) as pipe:
+                pipe.set(key, value, ex=expire)
+                for tag in tags:
+                    # tags outlive the keys, Redis 6 can't only extend ttl
+                    pipe.sadd(self.tag_key(tag), key)
+                    pipe.expire(self.tag_key(tag), max(expire or 0, self.tag_expire))
+                await pipe.execute()
+
+        await self._guarded(call, None)
+
+    async def invalidate(self, tags: Iterable[str]) -> int:
+        """
+        Delete the keys of the tags, the tags which failed are kept for the next call
+        :param tags: tags of the stale responses
+        :return: count of the deleted keys
+        """
+        tags = {*tags, *self._pending_tags}
+        self._pending_tags.clear()
+        if not tags:
+            return 0
+        deleted = await self._guarded(lambda: self._invalidate(tags), None)
+        if deleted is None:
+            self._keep_pending(tags)
+            return 0
+        return deleted
+
+    async def _invalidate(self, tags: Set[str]) -> int:
+        tag_keys = [self.tag_key(tag) for tag in tags]
+        async with self.redis.pipeline(transaction=False) as pipe:
+            if self.replica_window:
+                pipe.set(self.evicted_key(), 1, px=int(self.replica_window * 1000))
+            for tag_key in tag_keys:
+                pipe.smembers(tag_key)
+            members = await pipe.execute()
+        if self.replica_window:
+            members = members[1:]
+        keys = set().union(*members)
+        if not keys:
+            return 0
+        async with self.redis.pipeline(transaction=False) as pipe:
+            pipe.delete(*keys)
+            # SREM keeps the keys which were added after SMEMBERS
+            for tag_key, tag_members in zip(tag_keys, members):
+                if tag_members:
+                    pipe.srem(tag_key, *tag_members)
+            self._on_delete(pipe, keys)
+            deleted, *_ = await pipe.execute()
+        return deleted
+
+    def _on_delete(self, pipe: Pipeline, keys: Set[str]) -> None:
+        """
+        Add commands to the pipeline which deletes the keys. Does nothing by default
+        :param pipe: pipeline
+        :param keys: deleted keys
+        """
+
+
+class TwoTierBackend(TaggedRedisBackend):
+    """
+    Tagged Redis backend with the in-process LRU in front of it. Workers publish the deleted keys
+    to the channel and evict them from their local tiers. The local tier is used only while
+    the worker is subscribed, invalidations sent without subscription would be lost
+    """
+
+    def __init__(
+        self,
+        redis,
+        tag_expire: int,
+        local: LocalCache,
+        channel: str,
+        breaker: Optional[CircuitBreaker] = None,
+        reconnect_delay: float = 1.0,
+        replica_window: float = 0,
+    ):
+        super().__init__(redis, tag_expire, breaker, replica_window)
+        self.local = local
+        self.channel = channel
+        self.reconnect_delay = reconnect_delay
+        self.subscribed = False
+        self.hits = 0
+        self.misses = 0
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self) -> None:
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task:
+            self._task.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await self._task
+
+    async def get_with_ttl(self, key: str) -> Tuple[int, Optional[bytes]]:
+        if self.subscribed:
+            entry = self.local.get(key)
+            if entry is not None:
+                return entry
+        ttl, value = await super().get_with_ttl(key)
+        self._count(value)
+        if value is not None and self.subscribed:
+            self.local.set(key, value, ttl)
+        return ttl, value
+
+    async def get(self, key: str) -> Optional[bytes]:
+        return (await self.get_with_ttl(key))[1]
+
+    async def set(self, key: str, value: bytes, expire: Optional[int] = None) -> None:
+        await super().set(key, value, expire)
+        if self.subscribed:
+            self.local.set(key, value, expire)
+
+    async def set_tagged(self, key: str, value: bytes, expire: Optional[int], tags: Iterable[str]) -> None:
+        await super().set_tagged(key, value, expire, tags)
+        if self.subscribed:
+            self.local.set(key, value, expire)
+
+    async def clear(self, namespace: Optional[str] = None, key: Optional[str] = None) -> Optional[int]:
+        self.local.clear()
+        return await super().clear(namespace, key)
+
+    def _on_delete(self, pipe: Pipeline, keys: Set[str]) -> None:
+        # the keys are evicted here at once, other workers get them from the channel
+        keys = [key.decode() if isinstance(key, bytes) else key for key in keys]
+        self.local.evict(keys)
+        pipe.publish(self.channel, json.dumps(keys))
+
+    def _count(self, value: Optional[bytes]) -> None:
+        if value is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+
+    async def _run(self) -> None:
+        while True:
+            pubsub = self.redis.pubsub(ignore_subscribe_messages=True)
+            try:
+                await pubsub.subscribe(self.channel)
+                self.subscribed = True
+                while True:
+                    # waits with timeout, a blocking read would fail by the socket timeout
+                    message = await pubsub.get_message(ignore_subscribe_messages=True, timeout=self.reconnect_delay)
+                    if message is not None:
+                        self.local.evict(json.loads(message["data"]))
+            except (RedisError, OSError, ValueError):
+                pass
+            finally:
+                self.subscribed = False
+                # entries could miss invalidations while there was no subscription
+                self.local.clear()
+                with contextlib.suppress(RedisError, OSError):
+                    await pubsub.close()
+            await asyncio.sleep(self.reconnect_delay)
+
+    def as_dict(self) -> Dict[str, Dict[str, Union[bool, int, float]]]:
+        """
+        Snapshot of the counters of both tiers
+        :return: dictionary by tier
+        """
+        lookups = self.hits + self.misses
+        return {
+            "local": {"enabled": self.subscribed, **self.local.as_dict()},
+            "redis": {
+                "enabled": self.breaker is None or self.breaker.closed,
+                "rejected": self.breaker.rejected if self.breaker else 0,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": round(self.hits / lookups, 3) if lookups else 0.0,
+            },
+        }
@@ -0,0 +1,64 @@
+import time
+from typing import Dict, Optional, Union
+
+
+class CircuitBreaker:
+    """
+    Circuit breaker of the cache backend. Opens after the count of failures in a row and
+    rejects the calls. Every reset timeout lets one probe call through, the breaker
+    closes if it succeeds
+    """
+
+    def __init__(self, max_failures: int, reset_timeout: float):
+        self.max_failures = max_failures
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self.opens = 0
+        self.rejected = 0
+
+    @property
+    def closed(self) -> bool:
+        return self.opened_at is None
+
+    def allow(self) -> bool:
+        """
+        Check if the call can go to the backend
+        :return: True for the closed breaker and for the probe call
+        """
+        if self.opened_at is None:
+            return True
+        now = time.monotonic()
+        if now >= self.opened_at + self.reset_timeout:
+            # other calls are rejected until the probe ends or the next timeout
+            self.opened_at = now
+            return True
+        self.rejected += 1
+        return False
+
+    def success(self) -> bool:
+        """
+        Register a successful call
+        :return: True if the call closed the open breaker
+        """
+        recovered = self.opened_at is not None
+        self.failures = 0
+        self.opened_at = None
+        return recovered
+
+    def failure(self) -> None:
+        """
+        Register a failed call
+        """
+        self.failures += 1
+        if self.opened_at is not None or self.failures >= self.max_failures:
+            if self.opened_at is None:
+                self.opens += 1
+            self.opened_at = time.monotonic()
+
+    def as_dict(self) -> Dict[str, Union[bool, int]]:
+        """
+        Snapshot of the breaker state
+        :return: dictionary
+        """
+        return {"closed": self.closed, "failures": self.failures, "opens": self.opens, "rejected": self.rejected}
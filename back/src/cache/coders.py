@@ -0,0 +1,121 @@
+import zlib
+from typing import Any, Callable, Dict, Optional, Tuple, Type
+import orjson
+from fastapi.encoders import jsonable_encoder
+from fastapi_cache.coder import Coder, JsonCoder
+from starlette.responses import JSONResponse
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+try:
+    import lz4.frame
+except ImportError:
+    lz4 = None
+
+# first byte of the compressed payloads, encoded JSON documents and msgpack maps and arrays never start with it
+COMPRESSED_MARK = b"\x00"
+
+
+def _default(value: Any) -> Any:
+    """
+    Encodable form of the values which orjson and msgpack don't encode by themselves.
+    The cache decorator passes the data dumped by the response model
+    :param value: pydantic model or other value
+    :return: jsonable value
+    """
+    return jsonable_encoder(value)
+
+
+class OrjsonCoder(Coder):
+    """
+    JSON by orjson. Dates and uuids are strings after decode, response models parse them back
+    """
+
+    @classmethod
+    def encode(cls, value: Any) -> bytes:
+        if isinstance(value, JSONResponse):
+            return value.body
+        return orjson.dumps(value, default=_default, option=orjson.OPT_NON_STR_KEYS)
+
+    @classmethod
+    def decode(cls, value: bytes) -> Any:
+        return orjson.loads(value)
+
+
+class MsgpackCoder(Coder):
+    """
+    MessagePack by msgpack. Dates and uuids are strings after decode, response models parse them back
+    """
+
+    @classmethod
+    def encode(cls, value: Any) -> bytes:
+        if isinstance(value, JSONResponse):
+            value = orjson.loads(value.body)
+        return msgpack.packb(value, default=_default)
+
+    @classmethod
+    def decode(cls, value: bytes) -> Any:
+        return msgpack.unpackb(value)
+
+
+def _get_compressors(level: int) -> Dict[str, Tuple[Callable[[bytes], bytes], Callable[[bytes], bytes]]]:
+    compressors = {"zlib": (lambda data: zlib.compress(data, level), zlib.decompress)}
+    if zstandard is not None:
+        compressors["zstd"] = (zstandard.ZstdCompressor(level=level).compress, zstandard.decompress)
+    if lz4 is not None:
+        compressors["lz4"] = (lambda data: lz4.frame.compress(data, compression_level=level), lz4.frame.decompress)
+    return compressors
+
+
+CODERS: Dict[str, Optional[Type[Coder]]] = {
+    "json": JsonCoder,
+    "orjson": OrjsonCoder,
+    "msgpack": MsgpackCoder if msgpack is not None else None,
+}
+
+
+def get_coder(name: str, compression: str = "", threshold: int = 0, level: int = 1) -> Type[Coder]:
+    """
+    Coder of the cached responses
+    :param name: json, orjson or msgpack
+    :param compression: zlib, zstd, lz4 or empty string for no compression
+    :param threshold: payloads shorter than it are not compressed
+    :param level: compression level
+    :return: coder class
+    """
+    coder = CODERS.get(name)
+    if coder is None:
+        raise ValueError(f"Unknown or not installed cache coder '{name}'")
+    if not compression:
+        return coder
+    compress, decompress = _get_compressors(level).get(compression, (None, None))
+    if compress is None:
+        raise ValueError(f"Unknown or not installed cache compression '{compression}'")
+
+    class CompressedCoder(coder):
+        """
+        Coder which compresses the payloads longer than the threshold.
+        Compressed payloads start with COMPRESSED_MARK
+        """
+
+        @classmethod
+        def encode(cls, value: Any) -> bytes:
+            data = coder.encode(value)
+            if len(data) < threshold:
+                return data
+            return COMPRESSED_MARK + compress(data)
+
+        @classmethod
+        def decode(cls, value: bytes) -> Any:
+            if value[:1] == COMPRESSED_MARK:
+                value = decompress(value[1:])
+            return coder.decode(value)
+
+    CompressedCoder.__name__ = f"{coder.__name__}With{compression.capitalize()}"
+    return CompressedCoder
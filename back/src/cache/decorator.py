@@ -0,0 +1,312 @@
+import asyncio
+import logging
+import time
+from functools import wraps
+from inspect import Parameter, signature
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional, Tuple
+from fastapi.dependencies.utils import get_typed_return_annotation
+from fastapi.encoders import jsonable_encoder
+from fastapi_cache import FastAPICache
+from fastapi_cache.types import Backend
+from pydantic import TypeAdapter
+from sqlalchemy.ext.asyncio import AsyncSession
+from starlette.requests import Request
+from starlette.responses import Response
+from starlette.status import HTTP_304_NOT_MODIFIED
+from config import CACHE_LOCK_TIMEOUT_SECONDS, CACHE_LOCK_WAIT_SECONDS, CACHE_STALE_SECONDS
+from src.cache.tags import get_content_tags
+from src.db.base_db import primary_read_session_maker, replica_engine
+
+logger = logging.getLogger(__name__)
+
+REQUEST_PARAM = "cache_request"
+RESPONSE_PARAM = "cache_response"
+LOCK_POLL_SECONDS = 0.05
+# result of the request which waited for the recompute of other request
+NOT_COMPUTED = object()
+
+# keys recomputed by this worker, other requests of the keys wait for the result
+_in_flight: Dict[str, asyncio.Future] = {}
+# keys refreshed in the background and their tasks, referenced until they finish
+_refreshing: Dict[str, asyncio.Task] = {}
+# adapters of the response models of the cached routes
+_adapters: Dict[Any, TypeAdapter] = {}
+
+
+def _uncacheable(request: Request) -> bool:
+    if not FastAPICache.get_enable():
+        return True
+    return request.method != "GET" or request.headers.get("Cache-Control") == "no-store"
+
+
+def dump_response(result: Any, response_model: Any) -> Any:
+    """
+    Data of the result as the route sends it. Attributes out of the response model,
+    like the password of the user of an employee, never reach the cache
+    :param result: endpoint result
+    :param response_model: response model of the route or None
+    :return: jsonable data
+    """
+    if response_model is None:
+        return jsonable_encoder(result)
+    adapter = _adapters.get(response_model)
+    if adapter is None:
+        adapter = _adapters[response_model] = TypeAdapter(response_model)
+    return adapter.dump_python(adapter.validate_python(result, from_attributes=True), mode="json")
+
+
+async def single_flight(key: str, compute: Callable[[], Awaitable[Tuple[Any, bytes]]]) -> Tuple[Any, bytes]:
+    """
+    Run one compute of the key at a time in this worker, concurrent calls get the encoded result
+    of the running compute. They compute by themselves if it fails
+    :param key: cache key
+    :param compute: coroutine function which returns the result and the encoded result
+    :return: result, NOT_COMPUTED for the waiting calls, and encoded result
+    """
+    future = _in_flight.get(key)
+    if future is not None:
+        await asyncio.wait([future])
+        if not future.cancelled():
+            return NOT_COMPUTED, future.result()
+        return await compute()
+    future = asyncio.get_running_loop().create_future()
+    _in_flight[key] = future
+    try:
+        result, encoded = await compute()
+        future.set_result(encoded)
+        return result, encoded
+    finally:
+        del _in_flight[key]
+        if not future.done():
+            future.cancel()
+
+
+async def _acquire_lock(backend: Backend, key: str) -> Tuple[Any, bool]:
+    """
+    Take the lock of the key across workers. Backends without locks and errors of the backend
+    don't stop the compute
+    :param backend: cache backend
+    :param key: cache key
+    :return: lock or None, True if the compute can run
+    """
+    make_lock = getattr(backend, "recompute_lock", None)
+    if make_lock is None:
+        return None, True
+    lock = make_lock(key, CACHE_LOCK_TIMEOUT_SECONDS)
+    if lock is None:
+        return None, True
+    try:
+        return lock, await lock.acquire()
+    except Exception:
+        logger.warning(f"Error locking cache key '{key}':", exc_info=True)
+        return None, True
+
+
+async def _release_lock(lock: Any) -> None:
+    if lock is None:
+        return
+    try:
+        await lock.release()
+    except Exception:
+        # the lock expired or the backend is unavailable, it expires by itself
+        logger.debug("Error releasing cache lock", exc_info=True)
+
+
+async def _wait_for_key(backend: Backend, key: str) -> Optional[bytes]:
+    """
+    Wait for the value which other worker computes
+    :param backend: cache backend
+    :param key: cache key
+    :return: value or None if it didn't appear in time
+    """
+    deadline = time.monotonic() + CACHE_LOCK_WAIT_SECONDS
+    while time.monotonic() < deadline:
+        await asyncio.sleep(LOCK_POLL_SECONDS)
+        try:
+            value = await backend.get(key)
+        except Exception:
+            return None
+        if value is not None:
+            return value
+    return None
+
+
+def _clone_sessions(kwargs: Dict[str, Any]) -> Dict[str, AsyncSession]:
+    """
+    New sessions like the sessions of the request, which are closed after the response
+    :param kwargs: endpoint arguments
+    :return: sessions by argument name
+    """
+    return {
+        name: type(value)(bind=value.bind, sync_session_class=type(value.sync_session), expire_on_commit=False)
+        for name, value in kwargs.items()
+        if isinstance(value, AsyncSession)
+    }
+
+
+def _replica_sessions(kwargs: Dict[str, Any]) -> List[str]:
+    """
+    Endpoint arguments with the sessions on the read replica
+    :param kwargs: endpoint arguments
+    :return: argument names
+    """
+    if replica_engine is None:
+        return []
+    return [name for name, value in kwargs.items() if isinstance(value, AsyncSession) and value.bind is replica_engine]
+
+
+async def _recently_evicted(backend: Backend) -> bool:
+    recently_evicted = getattr(backend, "recently_evicted", None)
+    if recently_evicted is None:
+        return False
+    try:
+        return await recently_evicted()
+    except Exception:
+        return True
+
+
+def cache(expire: Optional[int] = None, tags: Iterable[str] = (), stale: int = CACHE_STALE_SECONDS) -> Callable:
+    """
+    Cache responses of the GET endpoint in the FastAPICache backend.
+    Entries are tagged by the route tags, formatted with the endpoint arguments,
+    and by the exemplars in the response, so writes can evict them.
+    Misses of one key run one compute per worker and, with a Redis backend, one per all workers.
+    Expired entries are kept for the stale window and served while one request refreshes them in the background.
+    Misses read from the replica are computed on the primary for the replica window after a tag eviction
+    :param expire: ttl of the responses
+    :param tags: route tags like "project:{project_id}:tasks"
+    :param stale: seconds the expired responses are served for
+    :return: decorator
+    """
+    tags = tuple(tags)
+
+    def wrapper(func: Callable[..., Awaitable[Any]]) -> Callable[..., Awaitable[Any]]:
+        func_signature = signature(func)
+        return_type = get_typed_return_annotation(func)
+
+        async def run(
+            key: str, ttl: Optional[int], model: Any, args: Tuple, kwargs: Dict[str, Any]
+        ) -> Tuple[Any, bytes]:
+            backend = FastAPICache.get_backend()
+            replica = _replica_sessions(kwargs)
+            # the replica may not have the writes of the recent evictions yet, their misses are read from the primary
+            sessions = {}
+            if replica and await _recently_evicted(backend):
+                sessions = {name: primary_read_session_maker() for name in replica}
+            try:
+                result = await func(*args, **{**kwargs, **sessions})
+                encoded = FastAPICache.get_coder().encode(dump_response(result, model))
+            finally:
+                for session in sessions.values():
+                    await session.close()
+            if replica and not sessions and await _recently_evicted(backend):
+                # tags were evicted during the read, the result can be older than the eviction
+                return result, encoded
+            store_ttl = ttl + stale if ttl else ttl
+            try:
+                set_tagged = getattr(backend, "set_tagged", None)
+                if set_tagged:
+                    entry_tags = {tag.format(**kwargs) for tag in tags} | get_content_tags(result)
+                    await set_tagged(key, encoded, store_ttl, entry_tags)
+                else:
+                    await backend.set(key, encoded, store_ttl)
+            except Exception:
+                logger.warning(f"Error setting cache key '{key}' in backend:", exc_info=True)
+            return result, encoded
+
+        async def recompute(
+            key: str, ttl: Optional[int], model: Any, args: Tuple, kwargs: Dict[str, Any]
+        ) -> Tuple[Any, bytes]:
+            backend = FastAPICache.get_backend()
+            lock, acquired = await _acquire_lock(backend, key)
+            try:
+                if not acquired:
+                    cached = await _wait_for_key(backend, key)
+                    if cached is not None:
+                        return NOT_COMPUTED, cached
+                return await run(key, ttl, model, args, kwargs)
+            finally:
+                if acquired:
+                    await _release_lock(lock)
+
+        async def refresh(key: str, ttl: Optional[int], model: Any, args: Tuple, kwargs: Dict[str, Any]) -> None:
+            lock, acquired = await _acquire_lock(FastAPICache.get_backend(), key)
+            if not acquired:
+                # other worker refreshes the key
+                return
+            sessions = _clone_sessions(kwargs)
+            try:
+                await single_flight(key, lambda: run(key, ttl, model, args, {**kwargs, **sessions}))
+            except Exception:
+                logger.warning(f"Error refreshing cache key '{key}':", exc_info=True)
+            finally:
+                for session in sessions.values():
+                    await session.close()
+                await _release_lock(lock)
+
+        def schedule_refresh(key: str, ttl: Optional[int], model: Any, args: Tuple, kwargs: Dict[str, Any]) -> None:
+            if key in _refreshing or key in _in_flight:
+                return
+            _refreshing[key] = asyncio.create_task(refresh(key, ttl, model, args, kwargs))
+            _refreshing[key].add_done_callback(lambda _: _refreshing.pop(key, None))
+
+        @wraps(func)
+        async def inner(*args, **kwargs):
+            request: Request = kwargs.pop(REQUEST_PARAM)
+            response: Response = kwargs.pop(RESPONSE_PARAM)
+            if _uncacheable(request):
+                return await func(*args, **kwargs)
+
+            coder = FastAPICache.get_coder()
+            backend = FastAPICache.get_backend()
+            ttl = expire or FastAPICache.get_expire()
+            model = getattr(request.scope.get("route"), "response_model", None)
+            status_header = FastAPICache.get_cache_status_header()
+            key = FastAPICache.get_key_builder()(
+                func, f"{FastAPICache.get_prefix()}:", request=request, response=response, args=args, kwargs=kwargs
+            )
+
+            try:
+                key_ttl, cached = await backend.get_with_ttl(key)
+            except Exception:
+                logger.warning(f"Error retrieving cache key '{key}' from backend:", exc_info=True)
+                key_ttl, cached = 0, None
+            value = None
+            if cached is not None and request.headers.get("if-none-match") != f"W/{hash(cached)}":
+                try:
+                    value = coder.decode_as_type(cached, type_=return_type)
+                except Exception:
+                    # written by other coder, like before the change of CACHE_CODER
+                    logger.warning(f"Error decoding cache key '{key}':", exc_info=True)
+                    cached = None
+
+            if cached is None or request.headers.get("Cache-Control") == "no-cache":
+                result, encoded = await single_flight(key, lambda: recompute(key, ttl, model, args, kwargs))
+                response.headers.update(
+                    {"Cache-Control": f"max-age={ttl}", "ETag": f"W/{hash(encoded)}", status_header: "MISS"}
+                )
+                return coder.decode_as_type(encoded, type_=return_type) if result is NOT_COMPUTED else result
+
+            cache_status, max_age = "HIT", key_ttl
+            if ttl and stale and key_ttl >= 0:
+                max_age = key_ttl - stale
+                if max_age <= 0:
+                    cache_status, max_age = "STALE", 0
+                    schedule_refresh(key, ttl, model, args, kwargs)
+            etag = f"W/{hash(cached)}"
+            response.headers.update({"Cache-Control": f"max-age={max_age}", "ETag": etag, status_header: cache_status})
+            if request.headers.get("if-none-match") == etag:
+                response.status_code = HTTP_304_NOT_MODIFIED
+                return response
+            return value
+
+        inner.__signature__ = func_signature.replace(
+            parameters=[
+                *func_signature.parameters.values(),
+                Parameter(REQUEST_PARAM, Parameter.KEYWORD_ONLY, annotation=Request),
+                Parameter(RESPONSE_PARAM, Parameter.KEYWORD_ONLY, annotation=Response),
+            ]
+        )
+        return inner
+
+    return wrapper
@@ -0,0 +1,58 @@
+import enum
+import hashlib
+from typing import Any, Callable, Dict, Optional, Tuple
+from sqlalchemy.ext.asyncio import AsyncSession
+from starlette.requests import Request
+from starlette.responses import Response
+from src.db.base_db import Base
+
+ANONYMOUS_SCOPE = "anonymous"
+
+
+def get_permission_scope(kwargs: Dict[str, Any]) -> str:
+    """
+    Get the permission scope of the caller, all the callers of one scope get the same responses
+    :param kwargs: endpoint arguments
+    :return: name of the permission
+    """
+    permission = getattr(kwargs.get("current_user"), "permission", None)
+    return permission.name if permission is not None else ANONYMOUS_SCOPE
+
+
+def _param_value(value: Any) -> Any:
+    if isinstance(value, enum.Enum):
+        return value.name
+    if hasattr(value, "__dict__"):
+        # dependency classes like Pagination
+        return sorted(vars(value).items())
+    return value
+
+
+def request_key_builder(
+    func: Callable[..., Any],
+    namespace: str = "",
+    *,
+    request: Optional[Request] = None,
+    response: Optional[Response] = None,
+    args: Tuple[Any, ...] = (),
+    kwargs: Optional[Dict[str, Any]] = None,
+) -> str:
+    """
+    Cache key from the route, its resolved path and query params and the permission scope
+    of the caller. Sessions and the user exemplar are not the part of the key
+    :param func: endpoint
+    :param namespace: cache prefix and namespace
+    :param request: request
+    :param response: response
+    :param args: positional arguments of the endpoint
+    :param kwargs: keyword arguments of the endpoint
+    :return: cache key
+    """
+    kwargs = kwargs or {}
+    params = sorted(
+        (name, _param_value(value))
+        for name, value in kwargs.items()
+        if not isinstance(value, (AsyncSession, Base, Request, Response))
+    )
+    digest = hashlib.md5(repr(params).encode()).hexdigest()
+    return f"{namespace}:{func.__module__}.{func.__name__}:{get_permission_scope(kwargs)}:{digest}"
@@ -0,0 +1,89 @@
+import time
+from collections import OrderedDict
+from typing import Dict, Iterable, Optional, Tuple, Union
+
+
+class LocalCache:
+    """
+    In-process LRU of the encoded responses with ttl. Bounded by the count of entries
+    and by the size of the keys and values in bytes
+    """
+
+    def __init__(self, ttl: float, max_entries: int, max_bytes: int):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        # key: (local expiration, expiration in the shared tier or None, value)
+        self._entries: OrderedDict[str, Tuple[float, Optional[float], bytes]] = OrderedDict()
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: str) -> Optional[Tuple[int, bytes]]:
+        """
+        Get the entry and mark it as recently used
+        :param key: cache key
+        :return: remaining ttl in the shared tier, -1 without ttl, and value.
+        None if there is no fresh entry
+        """
+        now = time.monotonic()
+        entry = self._entries.get(key)
+        if entry is None or entry[0] <= now:
+            if entry is not None:
+                self._pop(key)
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        expires_at, shared_expires_at, value = entry
+        return (-1 if shared_expires_at is None else int(shared_expires_at - now)), value
+
+    def set(self, key: str, value: bytes, expire: Optional[float] = None) -> None:
+        """
+        Set the entry and evict the least recently used entries over the limits
+        :param key: cache key
+        :param value: encoded response
+        :param expire: ttl of the entry in the shared tier, the local ttl is not longer than it
+        """
+        now = time.monotonic()
+        shared_expires_at = None if not expire or expire < 0 else now + expire
+        ttl = self.ttl if shared_expires_at is None else min(self.ttl, expire)
+        entry_size = len(key) + len(value)
+        if ttl <= 0 or entry_size > self.max_bytes:
+            return
+        self._pop(key)
+        self._entries[key] = (now + ttl, shared_expires_at, value)
+        self.size += entry_size
+        while len(self._entries) > self.max_entries or self.size > self.max_bytes:
+            self._pop(next(iter(self._entries)))
+
+    def evict(self, keys: Iterable[str]) -> None:
+        """
+        Evict the entries
+        :param keys: cache keys
+        """
+        for key in keys:
+            self._pop(key)
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self.size = 0
+
+    def _pop(self, key: str) -> None:
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self.size -= len(key) + len(entry[2])
+
+    def as_dict(self) -> Dict[str, Union[int, float]]:
+        """
+        Snapshot of the counters
+        :return: dictionary
+        """
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / lookups, 3) if lookups else 0.0,
+            "entries": len(self._entries),
+            "bytes": self.size,
+        }
@@ -0,0 +1,37 @@
+from collections import defaultdict
+from typing import Dict, Optional, Union
+
+CACHE_STATUS_HEADER = "X-FastAPI-Cache"
+
+
+class CacheStats:
+    """
+    Counters of the cache hits and misses by route
+    """
+
+    def __init__(self):
+        self._routes: Dict[str, Dict[str, int]] = defaultdict(lambda: {"hits": 0, "misses": 0})
+
+    def add(self, route: str, cache_status: Optional[str]) -> None:
+        """
+        Register the cache status of one response
+        :param route: path of the route
+        :param cache_status: HIT, STALE, MISS or None for not cached responses
+        """
+        if cache_status in ("HIT", "STALE"):
+            self._routes[route]["hits"] += 1
+        elif cache_status == "MISS":
+            self._routes[route]["misses"] += 1
+
+    def as_dict(self) -> Dict[str, Dict[str, Union[int, float]]]:
+        """
+        Snapshot of the counters
+        :return: dictionary by route
+        """
+        return {
+            route: {**counters, "hit_ratio": round(counters["hits"] / (counters["hits"] + counters["misses"]), 3)}
+            for route, counters in self._routes.items()
+        }
+
+
+cache_stats = CacheStats()
@@ -0,0 +1,90 @@
+import logging
+import uuid
+from typing import Any, Iterable, List, Set
+from fastapi_cache import FastAPICache
+from redis.exceptions import RedisError
+from sqlalchemy import inspect
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import DeclarativeBase
+
+logger = logging.getLogger(__name__)
+
+# tags waiting for commit of the session
+PENDING_TAGS = "cache_tags"
+
+
+def get_write_tags(name: str, ids: Iterable[uuid.UUID]) -> List[str]:
+    """
+    Tags of the cached responses which a write of the exemplars makes stale
+    :param name: table name of the model
+    :param ids: uuids of the changed exemplars
+    :return: tags of the exemplars and of the model lists
+    """
+    return [f"{name}:list", *(f"{name}:{self_id}" for self_id in ids)]
+
+
+def get_content_tags(result: Any) -> Set[str]:
+    """
+    Tags of all the exemplars in the response, relationships loaded into it included
+    :param result: endpoint result
+    :return: tags like task:<id>
+    """
+    tags, seen, stack = set(), set(), [result]
+    while stack:
+        value = stack.pop()
+        if isinstance(value, dict):
+            stack.extend(value.values())
+        elif isinstance(value, (list, tuple, set)):
+            stack.extend(value)
+        elif isinstance(value, DeclarativeBase) and id(value) not in seen:
+            seen.add(id(value))
+            tags.add(f"{value.__tablename__}:{value.id}")
+            stack.extend(item for item in inspect(value).dict.values() if isinstance(item, (DeclarativeBase, list)))
+    return tags
+
+
+def invalidate_on_commit(session: AsyncSession, tags: Iterable[str]) -> None:
+    """
+    Evict the tags after commit of the session, nothing is evicted on rollback
+    :param session: async session with the changes
+    :param tags: tags of the stale responses
+    """
+    session.sync_session.info.setdefault(PENDING_TAGS, set()).update(tags)
+
+
+async def invalidate_tags(tags: Iterable[str]) -> None:
+    """
+    Evict the cached responses with the tags. Does nothing if the backend doesn't support tags
+    :param tags: tags of the stale responses
+    """
+    try:
+        backend = FastAPICache.get_backend()
+    except AssertionError:
+        return
+    invalidate = getattr(backend, "invalidate", None)
+    if invalidate is None:
+        return
+    try:
+        await invalidate(tags)
+    except (RedisError, OSError):
+        logger.warning("Error invalidating cache tags", exc_info=True)
+
+
+class InvalidatingSession(AsyncSession):
+    """
+    Async session which evicts the cache tags of the committed changes
+    """
+
+    async def commit(self) -> None:
+        await super().commit()
+        tags = self.sync_session.info.pop(PENDING_TAGS, None)
+        if tags:
+            await invalidate_tags(tags)
+
+    async def rollback(self) -> None:
+        self.sync_session.info.pop(PENDING_TAGS, None)
+        await super().rollback()
+
+    async def close(self) -> None:
+        self.sync_session.info.pop(PENDING_TAGS, None)
+        await super().close()
@@ -1,15 +1,72 @@
 import uuid
+from fastapi import Request
+from sqlalchemy import BigInteger, Text, cast, func
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession, async_sessionmaker
 from sqlalchemy.orm import DeclarativeBase, Mapped, mapped_column
-from config import DATABASE_URL
+from config import (
+    DATABASE_URL,
+    DB_POOL_SIZE,
+    DB_POOL_MAX_OVERFLOW,
+    DB_POOL_TIMEOUT,
+    DB_POOL_RECYCLE,
+    DB_POOL_PRE_PING,
+    REPLICA_DATABASE_URL,
+    DB_REPLICA_MAX_LAG_SECONDS,
+    DB_REPLICA_CHECK_INTERVAL_SECONDS,
+    DB_READ_YOUR_WRITES_SECONDS,
+    READ_YOUR_WRITES_PREFIX,
+)
 from sqlalchemy.dialects.postgresql import UUID
+from src.cache.tags import InvalidatingSession
+from src.db.pool import InstrumentedAsyncQueuePool
+from src.db.replica import ReadOnlySession, ReplicaMonitor, RecentWrites, get_principal_key
 
-engine = create_async_engine(DATABASE_URL)
+engine_params = {
+    "poolclass": InstrumentedAsyncQueuePool,
+    "pool_size": DB_POOL_SIZE,
+    "max_overflow": DB_POOL_MAX_OVERFLOW,
+    "pool_timeout": DB_POOL_TIMEOUT,
+    "pool_recycle": DB_POOL_RECYCLE,
+    "pool_pre_ping": DB_POOL_PRE_PING,
+}
+
+engine = create_async_engine(DATABASE_URL, **engine_params)
+async_session_maker = async_sessionmaker(engine, class_=InvalidatingSession, expire_on_commit=False)
+primary_read_session_maker = async_sessionmaker(
+    engine, class_=AsyncSession, sync_session_class=ReadOnlySession, expire_on_commit=False
+)
+
+replica_engine = create_async_engine(REPLICA_DATABASE_URL, **engine_params) if REPLICA_DATABASE_URL else None
+replica_read_session_maker = (
+    async_sessionmaker(replica_engine, class_=AsyncSession, sync_session_class=ReadOnlySession, expire_on_commit=False)
+    if replica_engine
+    else None
+)
+# id of the writing transaction, ids only grow and don't wrap around
+CHANGE_ID = cast(cast(func.pg_current_xact_id(), Text), BigInteger)
+# all the transactions with lower ids are finished for the current snapshot
+CHANGE_HORIZON = cast(cast(func.pg_snapshot_xmin(func.pg_current_snapshot()), Text), BigInteger)
+
+replica_monitor = ReplicaMonitor(replica_engine, DB_REPLICA_MAX_LAG_SECONDS, DB_REPLICA_CHECK_INTERVAL_SECONDS)
+recent_writes = RecentWrites(READ_YOUR_WRITES_PREFIX, DB_READ_YOUR_WRITES_SECONDS)
 
 
 async def get_session() -> AsyncSession:
-    async_session = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
-    async with async_session() as session:
+    async with async_session_maker() as session:
+        yield session
+
+
+async def get_read_session(request: Request) -> AsyncSession:
+    """
+    Read only session on the replica. Falls back to the primary if the replica is
+    unhealthy or lagging, or if the caller wrote data inside the read-your-writes window
+    :param request: request
+    :return: async session
+    """
+    session_maker = primary_read_session_maker
+    if await replica_monitor.is_available() and not await recent_writes.is_recent(get_principal_key(request)):
+        session_maker = replica_read_session_maker
+    async with session_maker() as session:
         yield session
 
 
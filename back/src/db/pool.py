@@ -0,0 +1,100 @@
+import asyncio
+import threading
+import time
+from typing import Dict, Union
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.ext.asyncio import AsyncEngine
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+
+
+class PoolWaitStats:
+    """
+    Counters of the time spent waiting for a free pool connection
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.checkouts = 0
+        self.timeouts = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+
+    def add(self, wait: float, timeout: bool = False) -> None:
+        """
+        Register one checkout attempt
+        :param wait: seconds spent waiting for connection
+        :param timeout: True if the attempt ended with pool timeout
+        """
+        with self._lock:
+            self.checkouts += 1
+            self.wait_total += wait
+            self.wait_max = max(self.wait_max, wait)
+            if timeout:
+                self.timeouts += 1
+
+    def as_dict(self) -> Dict[str, Union[int, float]]:
+        """
+        Snapshot of the counters
+        :return: dictionary
+        """
+        with self._lock:
+            return {
+                "checkouts": self.checkouts,
+                "timeouts": self.timeouts,
+                "wait_total_ms": round(self.wait_total * 1000, 3),
+                "wait_avg_ms": round(self.wait_total * 1000 / self.checkouts, 3) if self.checkouts else 0.0,
+                "wait_max_ms": round(self.wait_max * 1000, 3),
+            }
+
+
+class InstrumentedAsyncQueuePool(AsyncAdaptedQueuePool):
+    """
+    Async queue pool which measures how long checkouts wait for a connection
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.wait_stats = PoolWaitStats()
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            conn = super()._do_get()
+        except PoolTimeoutError:
+            self.wait_stats.add(time.perf_counter() - start, timeout=True)
+            raise
+        self.wait_stats.add(time.perf_counter() - start)
+        return conn
+
+
+def get_pool_stats(engine: AsyncEngine) -> Dict[str, Union[int, float]]:
+    """
+    Get live statistics of the engine pool
+    :param engine: async engine
+    :return: dictionary
+    """
+    pool = engine.sync_engine.pool
+    stats = {
+        "pool_size": pool.size(),
+        "checked_in": pool.checkedin(),
+        "checked_out": pool.checkedout(),
+        "overflow": pool.overflow(),
+        "max_overflow": pool._max_overflow,
+    }
+    wait_stats = getattr(pool, "wait_stats", None)
+    stats.update(wait_stats.as_dict() if wait_stats else PoolWaitStats().as_dict())
+    return stats
+
+
+async def warm_up_pool(engine: AsyncEngine, min_size: int) -> None:
+    """
+    Open min_size connections at once and return them to the pool
+    :param engine: async engine
+    :param min_size: count of connections for keep in the pool
+    """
+    min_size = min(min_size, engine.sync_engine.pool.size())
+    if min_size <= 0:
+        return
+    connections = await asyncio.gather(*[engine.connect() for _ in range(min_size)])
+    for conn in connections:
+        await conn.close()
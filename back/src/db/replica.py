@@ -0,0 +1,162 @@
+import asyncio
+import hashlib
+import logging
+import time
+from typing import Awaitable, Callable, Dict, Optional, TypeVar, Union
+from fastapi import Request
+from redis.exceptions import RedisError
+from sqlalchemy import event, text
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.ext.asyncio import AsyncEngine
+from sqlalchemy.orm import Session
+from src.cache.breaker import CircuitBreaker
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+# Zero lag when the replica has replayed everything it received,
+# otherwise the age of the last replayed transaction
+REPLICA_LAG_QUERY = text(
+    """
+    SELECT CASE
+        WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+        ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0)
+    END
+    """
+)
+
+
+class ReadOnlySession(Session):
+    """
+    Session which opens every transaction as READ ONLY
+    """
+
+
+@event.listens_for(ReadOnlySession, "after_begin")
+def _set_transaction_read_only(session: Session, transaction, connection) -> None:
+    connection.exec_driver_sql("SET TRANSACTION READ ONLY")
+
+
+class ReplicaMonitor:
+    """
+    Cached health and lag state of the read replica
+    """
+
+    def __init__(self, engine: Optional[AsyncEngine], max_lag: float, check_interval: float, timeout: float = 1.0):
+        self.engine = engine
+        self.max_lag = max_lag
+        self.check_interval = check_interval
+        self.timeout = timeout
+        self.healthy = False
+        self.lag: Optional[float] = None
+        self._checked_at: Optional[float] = None
+        self._lock = asyncio.Lock()
+
+    async def is_available(self) -> bool:
+        """
+        Check if reads may go to the replica, re-checking it at most once per interval
+        :return: bool
+        """
+        if self.engine is None:
+            return False
+        if self._is_stale():
+            async with self._lock:
+                if self._is_stale():
+                    await self._check()
+        return self.healthy
+
+    def _is_stale(self) -> bool:
+        return self._checked_at is None or time.monotonic() - self._checked_at >= self.check_interval
+
+    async def _check(self) -> None:
+        try:
+            self.lag = await asyncio.wait_for(self._fetch_lag(), self.timeout)
+            self.healthy = self.lag <= self.max_lag
+        except (DBAPIError, OSError, asyncio.TimeoutError):
+            self.lag = None
+            self.healthy = False
+        self._checked_at = time.monotonic()
+
+    async def _fetch_lag(self) -> float:
+        async with self.engine.connect() as conn:
+            lag = (await conn.execute(REPLICA_LAG_QUERY)).scalar()
+        return float(lag or 0)
+
+    def as_dict(self) -> Dict[str, Union[bool, float, None]]:
+        """
+        Snapshot of the replica state
+        :return: dictionary
+        """
+        return {"configured": self.engine is not None, "healthy": self.healthy, "lag_seconds": self.lag}
+
+
+class RecentWrites:
+    """
+    Principals which wrote data recently, kept in Redis with the window as expiration.
+    Every worker sees the writes made through the other workers.
+    Calls go through the circuit breaker of the cache, while it is open writes aren't remembered
+    and reads go to the primary without waiting for Redis
+    """
+
+    def __init__(self, prefix: str, window: float):
+        self.prefix = prefix
+        self.window = window
+        self.redis = None
+        self.breaker: Optional[CircuitBreaker] = None
+
+    def init(self, redis, breaker: Optional[CircuitBreaker] = None) -> None:
+        self.redis = redis
+        self.breaker = breaker
+
+    def key(self, principal_key: str) -> str:
+        return f"{self.prefix}:{principal_key}"
+
+    async def _guarded(self, call: Callable[[], Awaitable[T]], default: T) -> T:
+        """
+        Call Redis through the circuit breaker
+        :param call: coroutine function with the Redis command
+        :param default: result of the rejected and failed calls
+        :return: result of the call or default
+        """
+        if self.redis is None or (self.breaker is not None and not self.breaker.allow()):
+            return default
+        try:
+            res = await call()
+        except (RedisError, OSError, asyncio.TimeoutError):
+            if self.breaker is not None:
+                self.breaker.failure()
+            logger.warning("Error calling Redis for recent writes:", exc_info=True)
+            return default
+        if self.breaker is not None:
+            self.breaker.success()
+        return res
+
+    async def touch(self, key: str) -> None:
+        """
+        Remember write of the principal
+        :param key: principal key
+        """
+        await self._guarded(lambda: self.redis.set(self.key(key), 1, px=int(self.window * 1000)), None)
+
+    async def is_recent(self, key: Optional[str]) -> bool:
+        """
+        Check if the principal wrote data inside the window
+        :param key: principal key
+        :return: bool, True if Redis can't tell, the primary is always fresh
+        """
+        if key is None:
+            return False
+        return bool(await self._guarded(lambda: self.redis.exists(self.key(key)), 1))
+
+
+def get_principal_key(request: Request) -> Optional[str]:
+    """
+    Get key of the caller by Authorization header
+    :param request: request
+    :return: hashed header or None for anonymous callers
+    """
+    authorization = request.headers.get("Authorization")
+    if not authorization:
+        return None
+    return hashlib.sha256(authorization.encode()).hexdigest()
@@ -1,21 +1,27 @@
 import asyncio
+import contextlib
 import os
 import uuid
-from typing import AsyncGenerator
+from typing import AsyncGenerator, Iterator, List
 import pytest
 import redis
+from redis import asyncio as aioredis
 from dotenv import load_dotenv, find_dotenv
 from fastapi_cache import FastAPICache
 from fastapi.testclient import TestClient
 from httpx import AsyncClient
-from sqlalchemy import select
+from sqlalchemy import event, select
 from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from main import app
+from src.apps.auth.refresh import refresh_tokens
 from src.apps.auth.repositories import AuthRepository, UserRepository
 from src.apps.auth.schemas import UserCreate
 from src.apps.crm.repositories import DepartmentRepository, ProjectRepository
 from src.apps.crm.schemas import DepartmentCreate, ProjectCreate
-from src.db.base_db import Base, get_session
+from src.cache.keys import request_key_builder
+from src.cache.tags import InvalidatingSession
+from src.db.base_db import Base, get_session, get_read_session
+from src.db.replica import ReadOnlySession
 
 env_file = find_dotenv(".env.dev")
 load_dotenv(env_file)
@@ -30,13 +36,23 @@ engine = create_async_engine(TEST_DATABASE_URL)
 
 
 async def override_get_async_session() -> AsyncGenerator[AsyncSession, None]:
-    async_session = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+    async_session = async_sessionmaker(engine, class_=InvalidatingSession, expire_on_commit=False)
+    async with async_session() as session:
+        yield session
+
+
+async def override_get_async_read_session() -> AsyncGenerator[AsyncSession, None]:
+    async_session = async_sessionmaker(
+        engine, class_=AsyncSession, sync_session_class=ReadOnlySession, expire_on_commit=False
+    )
     async with async_session() as session:
         yield session
 
 
 app.dependency_overrides[get_session] = override_get_async_session
+app.dependency_overrides[get_read_session] = override_get_async_read_session
 Base.metadata.bind = engine
+refresh_tokens.init(aioredis.from_url("redis://localhost"))
 client = TestClient(app)
 
 
@@ -177,7 +193,7 @@ async def auth_ac_employee() -> AsyncGenerator[AsyncClient, None]:
 @pytest.fixture(scope="session", autouse=True)
 def cache_init():
     redis_client = redis.Redis(host="localhost", port=6379)
-    FastAPICache.init(backend=redis_client)
+    FastAPICache.init(backend=redis_client, key_builder=request_key_builder)
 
 
 async def get_model_uuid(model: Base, filter_params) -> uuid.UUID:
@@ -193,3 +209,21 @@ async def get_model_uuid(model: Base, filter_params) -> uuid.UUID:
         res = await session.execute(stmt)
         res = res.scalar_one()
         return res.id
+
+
+@contextlib.contextmanager
+def count_queries() -> Iterator[List[str]]:
+    """
+    Collect SQL statements which were sent to the test database
+    :return: list of statements
+    """
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(engine.sync_engine, "before_cursor_execute", before_cursor_execute)
+    try:
+        yield statements
+    finally:
+        event.remove(engine.sync_engine, "before_cursor_execute", before_cursor_execute)
@@ -1,4 +1,22 @@
+import asyncio
+import json
+import time
+import uuid
+import pytest
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import ec
+from fastapi import HTTPException
 from httpx import AsyncClient
+from jose import jwt
+from sqlalchemy.ext.asyncio import async_sessionmaker
+from src.apps.auth.claims import ClaimsCache, claims_cache
+from src.apps.auth.hashing import HashingPool
+from src.apps.auth.keys import signing_keys
+from src.apps.auth.refresh import refresh_tokens
+from src.apps.auth.models import UserPermission
+from src.apps.auth.utils import create_access_jwt, decode_jwt, get_user_by_claims, pwd_context
+from src.apps.auth.versions import user_versions
+from tests.conftest import engine
 
 
 async def test_get_access_token(auth_ac: AsyncClient):
@@ -52,3 +70,136 @@ async def test_get_refresh_token_invalid(auth_ac: AsyncClient):
 
     assert response.status_code == 401
     assert response.json()["detail"] == "Invalid authorization credentials"
+
+
+async def test_hashing_pool_off_event_loop():
+    pool = HashingPool(workers=1, max_pending=2)
+    ticks = []
+
+    async def tick():
+        for _ in range(10):
+            ticks.append(time.perf_counter())
+            await asyncio.sleep(0.01)
+
+    ticker = asyncio.create_task(tick())
+    hashes = asyncio.gather(*[pool.run(pwd_context.hash, "password") for _ in range(2)])
+    await asyncio.sleep(0)
+    with pytest.raises(HTTPException) as e:
+        await pool.run(pwd_context.hash, "password")
+    await asyncio.gather(hashes, ticker)
+    pool.shutdown()
+
+    assert e.value.status_code == 503
+    assert max(b - a for a, b in zip(ticks, ticks[1:])) < 0.1
+    assert pool.as_dict()["calls"] == 2
+    assert pool.as_dict()["rejected"] == 1
+    assert pool.as_dict()["wait_max_ms"] > 0
+
+
+async def test_claims_cache_expires_and_evicts():
+    cache = ClaimsCache(max_size=2)
+    cache.set("expired", {"email": "expired@example.com", "exp": time.time() - 1})
+    assert cache.get("expired") is None
+
+    cache.set("first", {"email": "first@example.com", "exp": time.time() + 60})
+    cache.set("second", {"email": "second@example.com", "exp": time.time() + 60})
+    assert cache.get("first")["email"] == "first@example.com"
+    cache.set("third", {"email": "third@example.com", "exp": time.time() + 60})
+    # the least recently used token is evicted
+    assert cache.get("second") is None
+    assert cache.get("third")["email"] == "third@example.com"
+    assert (cache.hits, cache.misses) == (2, 2)
+
+
+async def test_decode_jwt_once(monkeypatch):
+    token = await create_access_jwt({"email": "claims@example.com", "mode": "access_token"})
+    calls = []
+    decode = jwt.decode
+
+    def counted_decode(*args, **kwargs):
+        calls.append(args[0])
+        return decode(*args, **kwargs)
+
+    monkeypatch.setattr(jwt, "decode", counted_decode)
+    first = await decode_jwt(token)
+    first["email"] = "changed@example.com"
+    second = await decode_jwt(token)
+
+    assert calls == [token]
+    assert second["email"] == "claims@example.com"
+    assert await decode_jwt(token + "invalid") == {}
+    assert claims_cache.get(token + "invalid") is None
+
+
+async def test_stateless_access_token(auth_ac: AsyncClient, tmp_path, monkeypatch):
+    key = ec.generate_private_key(ec.SECP256R1())
+    (tmp_path / "private.pem").write_bytes(
+        key.private_bytes(serialization.Encoding.PEM, serialization.PrivateFormat.PKCS8, serialization.NoEncryption())
+    )
+    (tmp_path / "public").mkdir()
+    (tmp_path / "public" / "key1.pem").write_bytes(
+        key.public_key().public_bytes(serialization.Encoding.PEM, serialization.PublicFormat.SubjectPublicKeyInfo)
+    )
+    monkeypatch.setattr(signing_keys, "private_key_file", str(tmp_path / "private.pem"))
+    monkeypatch.setattr(signing_keys, "public_keys_dir", str(tmp_path / "public"))
+    monkeypatch.setattr(signing_keys, "key_id", "key1")
+    monkeypatch.setattr(signing_keys, "private_key", None)
+    monkeypatch.setattr(signing_keys, "public_keys", {})
+    monkeypatch.setattr(user_versions, "session_maker", async_sessionmaker(engine))
+    monkeypatch.setattr(user_versions, "loaded", False)
+    monkeypatch.setattr(user_versions, "_versions", {})
+    signing_keys.load()
+
+    response = await auth_ac.post("/access", json={"email": "user@user.com", "password": "12345"})
+    token = response.json()["access_token"]
+    claims = await decode_jwt(token)
+    assert jwt.get_unverified_header(token)["kid"] == "key1"
+    assert claims["permission"] == UserPermission.user.name
+    response = await auth_ac.get("/jwks")
+    assert [key["kid"] for key in response.json()["keys"]] == ["key1"]
+
+    # authorized by the claims without the session
+    await user_versions.load()
+    user = await get_user_by_claims(claims, None)
+    assert (str(user.id), user.permission) == (claims["id"], UserPermission.user)
+
+    # a change of the user revokes the token
+    user_versions.on_notify(json.dumps([[claims["id"], claims["ver"] + 1]]))
+    assert not user_versions.is_current(uuid.UUID(claims["id"]), claims["ver"])
+    # tokens of the unknown keys are invalid
+    other = ec.generate_private_key(ec.SECP256R1())
+    forged = jwt.encode(
+        claims,
+        other.private_bytes(
+            serialization.Encoding.PEM, serialization.PrivateFormat.PKCS8, serialization.NoEncryption()
+        ),
+        "ES256",
+        headers={"kid": "key2"},
+    )
+    assert await decode_jwt(forged) == {}
+
+
+async def test_refresh_token_reuse(auth_ac: AsyncClient):
+    response = await auth_ac.post("/access", json={"email": "user@user.com", "password": "12345"})
+    first = response.json()["refresh_token"]
+    response = await auth_ac.post("/refresh", json={"refresh_token": first})
+    assert response.status_code == 200
+    second = response.json()["refresh_token"]
+    reuses = refresh_tokens.reuses
+
+    # the replaced token is reused, the whole family is revoked
+    response = await auth_ac.post("/refresh", json={"refresh_token": first})
+    assert response.status_code == 401
+    assert refresh_tokens.reuses == reuses + 1
+    response = await auth_ac.post("/refresh", json={"refresh_token": second})
+    assert response.status_code == 401
+
+
+async def test_refresh_token_revoke_users(auth_ac: AsyncClient):
+    response = await auth_ac.post("/access", json={"email": "user@user.com", "password": "12345"})
+    refresh_token = response.json()["refresh_token"]
+    claims = await decode_jwt(refresh_token)
+    await refresh_tokens.revoke_users([uuid.UUID(claims["id"])])
+
+    response = await auth_ac.post("/refresh", json={"refresh_token": refresh_token})
+    assert response.status_code == 401
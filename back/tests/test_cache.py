@@ -0,0 +1,358 @@
+import asyncio
+import datetime
+import json
+import time
+import uuid
+import pytest
+from fastapi_cache import FastAPICache
+from fastapi_cache.backends.inmemory import InMemoryBackend
+from fastapi_cache.coder import JsonCoder
+from httpx import AsyncClient
+from redis import asyncio as aioredis
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm.attributes import set_committed_value
+from src.apps.auth.models import User, UserPermission
+from src.apps.auth.principals import PrincipalCache
+from src.apps.crm.models import Employee, Project, Task
+from src.apps.crm.routers.tasks import get_list, get_one
+from src.apps.crm.schemas import EmployeeReadWithTasks
+from src.base_utils.base_depends import Pagination
+from src.cache.backend import TaggedRedisBackend, TwoTierBackend
+from src.cache.breaker import CircuitBreaker
+from src.cache.coders import COMPRESSED_MARK, OrjsonCoder, get_coder
+from src.cache.decorator import NOT_COMPUTED, dump_response, single_flight
+from src.cache.keys import request_key_builder
+from src.cache.local import LocalCache
+from src.cache.stats import CACHE_STATUS_HEADER
+from src.cache.tags import get_content_tags
+from tests.conftest import count_queries, engine
+
+base_url = "/monitoring/cache"
+
+
+def build_key(func, permission: UserPermission, **params) -> str:
+    kwargs = {
+        **params,
+        "session": AsyncSession(engine),
+        "current_user": User(id=uuid.uuid4(), email=f"{uuid.uuid4()}@test.com", permission=permission),
+    }
+    return request_key_builder(func, "prefix:", kwargs=kwargs)
+
+
+async def test_key_builder():
+    task_id = uuid.uuid4()
+    key = build_key(get_one, UserPermission.user, task_id=task_id)
+
+    assert key == build_key(get_one, UserPermission.user, task_id=task_id)
+    assert key.startswith("prefix::src.apps.crm.routers.tasks.get_one:user:")
+    assert key != build_key(get_one, UserPermission.user, task_id=uuid.uuid4())
+    assert key != build_key(get_one, UserPermission.admin, task_id=task_id)
+
+
+async def test_key_builder_dependency_params():
+    def pagination(skip: int) -> Pagination:
+        return Pagination(skip=skip, limit=100, cursor=None)
+
+    key = build_key(get_list, UserPermission.user, pagination=pagination(0))
+
+    assert key == build_key(get_list, UserPermission.user, pagination=pagination(0))
+    assert key != build_key(get_list, UserPermission.user, pagination=pagination(100))
+
+
+async def test_get_cache_routes(auth_ac_admin: AsyncClient):
+    await auth_ac_admin.get("/tasks")
+    response = await auth_ac_admin.get(base_url + "/routes")
+
+    assert response.status_code == 200
+    assert response.json()["/tasks"]["misses"] >= 1
+    assert 0 <= response.json()["/tasks"]["hit_ratio"] <= 1
+
+
+async def test_get_cache_routes_forbidden(auth_ac_user: AsyncClient):
+    response = await auth_ac_user.get(base_url + "/routes")
+
+    assert response.status_code == 403
+
+
+async def test_principal_cache():
+    cache = PrincipalCache(ttl=60, max_size=1)
+    user1 = User(id=uuid.uuid4(), email="principal1@test.com", permission=UserPermission.user, is_active=True)
+    user2 = User(id=uuid.uuid4(), email="principal2@test.com", permission=UserPermission.admin, is_active=True)
+    cache.set(user1)
+    cached = cache.get(user1.email)
+
+    assert cached is not user1
+    assert (cached.id, cached.permission) == (user1.id, user1.permission)
+
+    cache.set(user2)
+    assert cache.get(user1.email) is None
+    assert cache.get(user2.email).permission == UserPermission.admin
+
+    cache.evict([user2.id])
+    assert cache.get(user2.email) is None
+
+    # evictions of other workers
+    cache.set(user2)
+    cache.on_notify("invalid")
+    cache.on_notify(json.dumps([[str(user1.id), 1]]))
+    assert cache.get(user2.email) is not None
+    cache.on_notify(json.dumps([[str(user2.id), None]]))
+    assert cache.get(user2.email) is None
+
+    cache.set(user2)
+    cache.clear()
+    assert cache.get(user2.email) is None
+
+
+async def test_cache_hit_without_database(auth_ac_user: AsyncClient):
+    backend = FastAPICache.get_backend()
+    FastAPICache.reset()
+    FastAPICache.init(InMemoryBackend(), key_builder=request_key_builder)
+    checkouts = []
+
+    def on_checkout(*args):
+        checkouts.append(args)
+
+    event.listen(engine.sync_engine.pool, "checkout", on_checkout)
+    try:
+        await auth_ac_user.get("/tasks")
+        checkouts.clear()
+        with count_queries() as statements:
+            response = await auth_ac_user.get("/tasks")
+    finally:
+        event.remove(engine.sync_engine.pool, "checkout", on_checkout)
+        FastAPICache.reset()
+        FastAPICache.init(backend, key_builder=request_key_builder)
+
+    assert response.status_code == 200
+    assert response.headers["X-FastAPI-Cache"] == "HIT"
+    assert statements == []
+    assert checkouts == []
+
+
+async def test_get_content_tags():
+    project = Project(id=uuid.uuid4(), title="TagProject")
+    task = Task(id=uuid.uuid4(), title="TagTask", projects=[project])
+
+    assert get_content_tags({"items": [task]}) == {f"task:{task.id}", f"project:{project.id}"}
+    assert get_content_tags({"detail": "success"}) == set()
+
+
+async def test_tagged_backend_invalidate():
+    redis = aioredis.from_url("redis://localhost")
+    backend = FastAPICache.get_backend()
+    FastAPICache.reset()
+    FastAPICache.init(TaggedRedisBackend(redis, 60), prefix=f"test-{uuid.uuid4()}")
+    try:
+        tagged = TaggedRedisBackend(redis, 60)
+        await tagged.set_tagged("key1", b"1", 60, ["task:1", "task:list"])
+        await tagged.set_tagged("key2", b"2", 60, ["task:2", "task:list"])
+
+        assert await tagged.invalidate(["task:1"]) == 1
+        assert await tagged.get("key1") is None
+        assert await tagged.get("key2") == b"2"
+        assert await tagged.invalidate(["task:list", "task:3"]) == 1
+        assert await tagged.get("key2") is None
+        assert await redis.exists(tagged.tag_key("task:list")) == 0
+    finally:
+        await redis.delete("key1", "key2")
+        await redis.close()
+        FastAPICache.reset()
+        FastAPICache.init(backend, key_builder=request_key_builder)
+
+
+async def test_local_cache_limits():
+    cache = LocalCache(ttl=60, max_entries=2, max_bytes=20)
+    cache.set("k1", b"1")
+    cache.set("k2", b"2")
+    cache.get("k1")
+    cache.set("k3", b"3")
+
+    assert cache.get("k2") is None
+    assert cache.get("k1") == (-1, b"1")
+    cache.set("k4", b"x" * 14)
+    assert cache.get("k3") is None
+    assert cache.as_dict()["entries"] == 2
+    assert cache.as_dict()["bytes"] == 19
+    cache.set("k5", b"5", expire=-1)
+    cache.set("k6", b"x" * 20)
+    assert cache.get("k6") is None
+    cache.set("k7", b"7", expire=120)
+    assert cache.get("k7") == (119, b"7")
+
+
+async def test_two_tier_invalidation():
+    redis = aioredis.from_url("redis://localhost")
+    backend = FastAPICache.get_backend()
+    FastAPICache.reset()
+    FastAPICache.init(TaggedRedisBackend(redis, 60), prefix=f"test-{uuid.uuid4()}")
+    channel = f"test-{uuid.uuid4()}"
+    worker1 = TwoTierBackend(redis, 60, LocalCache(60, 10, 1000), channel)
+    worker2 = TwoTierBackend(redis, 60, LocalCache(60, 10, 1000), channel)
+    worker1.start()
+    worker2.start()
+    try:
+        while not (worker1.subscribed and worker2.subscribed):
+            await asyncio.sleep(0.01)
+        await worker1.set_tagged("key1", b"1", 60, ["task:1"])
+        assert await worker2.get("key1") == b"1"
+        assert await worker2.get("key1") == b"1"
+        assert worker2.as_dict()["redis"]["hits"] == 1
+        assert worker2.as_dict()["local"]["hits"] == 1
+
+        await worker1.invalidate(["task:1"])
+        assert worker1.local.get("key1") is None
+        for _ in range(100):
+            if worker2.local.get("key1") is None:
+                break
+            await asyncio.sleep(0.01)
+        assert await worker2.get("key1") is None
+    finally:
+        await worker1.stop()
+        await worker2.stop()
+        await redis.delete("key1")
+        await redis.close()
+        FastAPICache.reset()
+        FastAPICache.init(backend, key_builder=request_key_builder)
+
+
+async def test_get_cache_tiers(auth_ac_admin: AsyncClient):
+    response = await auth_ac_admin.get(base_url + "/tiers")
+
+    assert response.status_code == 200
+    assert response.json() == {}
+
+
+async def test_single_flight():
+    calls = []
+
+    async def compute():
+        calls.append(1)
+        await asyncio.sleep(0.05)
+        return "result", b"encoded"
+
+    async def fail():
+        raise ValueError
+
+    results = await asyncio.gather(*[single_flight("key", compute) for _ in range(5)])
+
+    assert len(calls) == 1
+    assert results.count(("result", b"encoded")) == 1
+    assert results.count((NOT_COMPUTED, b"encoded")) == 4
+
+    results = await asyncio.gather(single_flight("key", fail), single_flight("key", compute), return_exceptions=True)
+    assert isinstance(results[0], ValueError)
+    assert results[1] == ("result", b"encoded")
+
+
+async def test_orjson_coder():
+    # data is dumped by the response model before the coder
+    project = {"id": str(uuid.uuid4()), "title": "CoderProject", "description": None, "is_active": True}
+    page = {"items": [project], "next_cursor": None}
+
+    assert OrjsonCoder.decode(OrjsonCoder.encode(page)) == JsonCoder.decode(JsonCoder.encode(page))
+
+
+async def test_dump_response_by_response_model():
+    user = User(
+        id=uuid.uuid4(),
+        email="dump@test.com",
+        password="$2b$12$hash",
+        is_active=True,
+        is_verify=True,
+        registration_date=datetime.datetime(2024, 1, 1),
+        permission=UserPermission.user,
+    )
+    employee = Employee(id=uuid.uuid4(), family="Family", name="Name", surname="Surname", phone="000000000000")
+    set_committed_value(employee, "user", user)
+    for attr in ("photo", "department", "my_tasks", "tasks"):
+        set_committed_value(employee, attr, None)
+    data = dump_response(employee, EmployeeReadWithTasks)
+
+    # attributes out of the response model aren't cached
+    assert data["user"]["email"] == "dump@test.com"
+    assert "password" not in OrjsonCoder.encode(data).decode()
+
+
+async def test_compressed_coder():
+    coder = get_coder("orjson", "zlib", threshold=100)
+    small, large = {"title": "small"}, {"items": ["large"] * 100}
+
+    assert coder.encode(small) == OrjsonCoder.encode(small)
+    assert coder.encode(large).startswith(COMPRESSED_MARK)
+    assert len(coder.encode(large)) < len(OrjsonCoder.encode(large))
+    assert coder.decode(coder.encode(large)) == large
+    assert coder.decode(OrjsonCoder.encode(large)) == large
+    with pytest.raises(ValueError):
+        get_coder("orjson", "unknown")
+
+
+def dead_redis() -> aioredis.Redis:
+    return aioredis.from_url("redis://localhost:1", socket_connect_timeout=0.1, socket_timeout=0.1)
+
+
+async def test_circuit_breaker():
+    breaker = CircuitBreaker(max_failures=2, reset_timeout=0.05)
+    breaker.failure()
+    assert breaker.allow()
+    breaker.failure()
+    assert not breaker.allow()
+    assert breaker.as_dict() == {"closed": False, "failures": 2, "opens": 1, "rejected": 1}
+
+    await asyncio.sleep(0.05)
+    assert breaker.allow()
+    assert not breaker.allow()
+    breaker.failure()
+    assert not breaker.allow()
+
+    await asyncio.sleep(0.05)
+    assert breaker.allow()
+    assert breaker.success()
+    assert breaker.allow()
+    assert breaker.as_dict()["opens"] == 1
+
+
+async def test_backend_outage_and_recovery():
+    redis = aioredis.from_url("redis://localhost")
+    backend = FastAPICache.get_backend()
+    FastAPICache.reset()
+    FastAPICache.init(TaggedRedisBackend(redis, 60), prefix=f"test-{uuid.uuid4()}")
+    tagged = TaggedRedisBackend(dead_redis(), 60, CircuitBreaker(max_failures=2, reset_timeout=60))
+    try:
+        await TaggedRedisBackend(redis, 60).set_tagged("key1", b"1", 60, ["task:1"])
+        assert await tagged.get_with_ttl("key1") == (0, None)
+        assert await tagged.invalidate(["task:1"]) == 0
+        start = time.monotonic()
+        assert await tagged.get("key1") is None
+        assert time.monotonic() - start < 0.05
+        assert tagged.recompute_lock("key1", 1) is None
+        assert tagged.breaker.rejected == 1
+
+        # Redis is back, the probe closes the breaker and the failed tags are evicted
+        tagged.redis, tagged.breaker.opened_at = redis, 0
+        assert await tagged.get("key1") == b"1"
+        await tagged._replay
+        assert await redis.get("key1") is None
+        assert tagged.breaker.closed
+    finally:
+        await redis.delete("key1")
+        await redis.close()
+        FastAPICache.reset()
+        FastAPICache.init(backend, key_builder=request_key_builder)
+
+
+async def test_cache_outage_served_from_database(auth_ac_user: AsyncClient):
+    backend = FastAPICache.get_backend()
+    FastAPICache.reset()
+    tagged = TaggedRedisBackend(dead_redis(), 60, CircuitBreaker(max_failures=1, reset_timeout=60))
+    FastAPICache.init(tagged, key_builder=request_key_builder, cache_status_header=CACHE_STATUS_HEADER)
+    try:
+        responses = [await auth_ac_user.get("/tasks") for _ in range(3)]
+    finally:
+        FastAPICache.reset()
+        FastAPICache.init(backend, key_builder=request_key_builder)
+
+    assert [response.status_code for response in responses] == [200, 200, 200]
+    assert responses[-1].headers[CACHE_STATUS_HEADER] == "MISS"
+    assert not tagged.breaker.closed
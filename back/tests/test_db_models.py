@@ -1,5 +1,13 @@
+import time
+import uuid
+from redis import asyncio as aioredis
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
 from src.apps.auth.models import User
 from src.apps.crm.models import Department, Project, Employee, Photo, Task
+from src.cache.breaker import CircuitBreaker
+from src.db.replica import ReadOnlySession, RecentWrites
+from tests.conftest import engine
 
 
 async def test_model():
@@ -18,3 +26,47 @@ async def test_model():
     assert str(employee) == "Model M.M."
     assert str(photo) == "Model"
     assert str(task) == "Model"
+
+
+async def test_read_session_is_read_only():
+    async_session = async_sessionmaker(
+        engine, class_=AsyncSession, sync_session_class=ReadOnlySession, expire_on_commit=False
+    )
+    async with async_session() as session:
+        res = await session.execute(text("SHOW transaction_read_only"))
+
+        assert res.scalar() == "on"
+
+
+async def test_recent_writes_are_shared_by_workers():
+    redis = aioredis.from_url("redis://localhost")
+    prefix = f"test-recent-{uuid.uuid4().hex}"
+    # two workers with their own registries
+    writer, reader = RecentWrites(prefix, 5), RecentWrites(prefix, 5)
+    writer.init(redis)
+    reader.init(redis)
+
+    assert not await reader.is_recent("principal")
+    await writer.touch("principal")
+    assert await reader.is_recent("principal")
+    assert not await reader.is_recent("other")
+    assert not await reader.is_recent(None)
+    assert 0 < await redis.pttl(f"{prefix}:principal") <= 5000
+    await redis.delete(f"{prefix}:principal")
+    await redis.close()
+
+
+async def test_recent_writes_with_dead_redis():
+    dead_redis = aioredis.from_url("redis://localhost:1", socket_connect_timeout=0.1, socket_timeout=0.1)
+    recent_writes = RecentWrites(f"test-recent-{uuid.uuid4().hex}", 5)
+    recent_writes.init(dead_redis, CircuitBreaker(max_failures=1, reset_timeout=60))
+
+    # the failed call opens the breaker, the reads go to the primary
+    assert await recent_writes.is_recent("principal")
+    assert not recent_writes.breaker.closed
+    start = time.monotonic()
+    await recent_writes.touch("principal")
+    assert await recent_writes.is_recent("principal")
+    assert time.monotonic() - start < 0.05
+    assert recent_writes.breaker.rejected == 2
+    await dead_redis.close()
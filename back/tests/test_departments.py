@@ -49,6 +49,24 @@ async def test_edit_one_department(auth_ac_admin: AsyncClient):
     assert response.json()["id"] == uuid
 
 
+async def test_edit_one_department_invalid_title_unique(auth_ac_admin: AsyncClient):
+    uuid = str(await get_model_uuid(Department, {"title": "Changed title"}))
+    uuid_url = base_url + "/" + uuid
+    data = {"title": "Department1"}
+    response = await auth_ac_admin.patch(uuid_url, json=data)
+
+    assert response.status_code == 400
+    assert response.json()["detail"] == "Key (title)=(Department1) already exists."
+
+
+async def test_edit_one_department_not_found(auth_ac_admin: AsyncClient):
+    uuid_url = base_url + "/00000000-0000-0000-0000-000000000000"
+    response = await auth_ac_admin.patch(uuid_url, json={"title": "Missing"})
+
+    assert response.status_code == 404
+    assert response.json()["detail"] == "Not found"
+
+
 async def test_delete_one_department(auth_ac_admin: AsyncClient):
     uuid = str(await get_model_uuid(Department, {"title": "Changed title"}))
     uuid_url = base_url + "/" + uuid
@@ -56,3 +74,66 @@ async def test_delete_one_department(auth_ac_admin: AsyncClient):
 
     assert response.status_code == 200
     assert response.json()["detail"] == "success"
+
+
+async def test_get_list_departments_cursor(auth_ac_user: AsyncClient):
+    response = await auth_ac_user.get(base_url, params={"cursor": "", "limit": 1})
+
+    assert response.status_code == 200
+    assert len(response.json()["items"]) == 1
+    assert response.json()["next_cursor"] is not None
+
+    next_response = await auth_ac_user.get(base_url, params={"cursor": response.json()["next_cursor"], "limit": 1})
+
+    assert next_response.status_code == 200
+    assert len(next_response.json()["items"]) == 1
+    assert next_response.json()["next_cursor"] is None
+    assert next_response.json()["items"][0]["id"] > response.json()["items"][-1]["id"]
+
+
+async def test_get_list_departments_invalid_cursor(auth_ac_user: AsyncClient):
+    response = await auth_ac_user.get(base_url, params={"cursor": "invalid"})
+
+    assert response.status_code == 400
+    assert response.json()["detail"] == "Invalid cursor"
+
+
+async def test_add_many_departments(auth_ac_admin: AsyncClient):
+    data = [{"title": "Bulk department1"}, {"title": "Bulk department2"}, {"title": "Department1"}]
+    response = await auth_ac_admin.post(base_url + "/bulk", json=data)
+
+    assert response.status_code == 200
+    assert [item["title"] for item in response.json()["items"]] == ["Bulk department1", "Bulk department2"]
+    assert response.json()["errors"][0]["index"] == 2
+    assert response.json()["errors"][0]["detail"] == "Key (title)=(Department1) already exists."
+
+
+async def test_edit_many_departments(auth_ac_admin: AsyncClient):
+    uuid = str(await get_model_uuid(Department, {"title": "Bulk department1"}))
+    missing_uuid = "00000000-0000-0000-0000-000000000000"
+    data = [{"id": uuid, "title": "Bulk changed title"}, {"id": missing_uuid, "title": "Missing"}]
+    response = await auth_ac_admin.patch(base_url + "/bulk", json=data)
+
+    assert response.status_code == 200
+    assert response.json()["items"][0]["id"] == uuid
+    assert response.json()["items"][0]["title"] == "Bulk changed title"
+    assert response.json()["errors"] == [{"index": 1, "id": missing_uuid, "detail": "Not found"}]
+
+
+async def test_delete_many_departments(auth_ac_admin: AsyncClient):
+    uuid_1 = str(await get_model_uuid(Department, {"title": "Bulk changed title"}))
+    uuid_2 = str(await get_model_uuid(Department, {"title": "Bulk department2"}))
+    missing_uuid = "00000000-0000-0000-0000-000000000000"
+    data = {"ids": [uuid_1, uuid_2, missing_uuid]}
+    response = await auth_ac_admin.post(base_url + "/bulk/delete", json=data)
+
+    assert response.status_code == 200
+    assert sorted(response.json()["ids"]) == sorted([uuid_1, uuid_2])
+    assert response.json()["errors"] == [{"index": None, "id": missing_uuid, "detail": "Not found"}]
+
+
+async def test_add_many_departments_forbidden(auth_ac_user: AsyncClient):
+    response = await auth_ac_user.post(base_url + "/bulk", json=[{"title": "Forbidden"}])
+
+    assert response.status_code == 403
+    assert response.json()["detail"] == "Don't have permissions"
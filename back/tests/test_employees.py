@@ -2,9 +2,12 @@ from httpx import AsyncClient
 
 from src.apps.auth.models import User
 from src.apps.crm.models import Department, Employee
-from tests.conftest import get_model_uuid
+from tests.conftest import count_queries, get_model_uuid
 
 base_url = "/employees"
+# user check, SET TRANSACTION READ ONLY, employee with user, photo and department,
+# my_tasks and tasks with their projects and employees
+ONE_QUERY_BUDGET = 9
 
 
 async def test_add_one_employee_invalid_user_name(auth_ac_admin: AsyncClient):
@@ -103,6 +106,17 @@ async def test_get_one_employee(auth_ac_user: AsyncClient):
     assert response.json()["id"] == uuid
 
 
+async def test_get_one_employee_query_budget(auth_ac_user: AsyncClient):
+    user_id = await get_model_uuid(User, {"email": "employee@employee.com"})
+    uuid = str(await get_model_uuid(Employee, {"user_id": user_id}))
+    with count_queries() as statements:
+        response = await auth_ac_user.get(base_url + "/" + uuid)
+
+    assert response.status_code == 200
+    assert response.json()["user"]["email"] == "employee@employee.com"
+    assert len(statements) <= ONE_QUERY_BUDGET, statements
+
+
 async def test_get_one_employee_forbidden(auth_ac: AsyncClient):
     user_id = await get_model_uuid(User, {"email": "employee@employee.com"})
     uuid = str(await get_model_uuid(Employee, {"user_id": user_id}))
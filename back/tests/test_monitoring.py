@@ -0,0 +1,36 @@
+from httpx import AsyncClient
+
+base_url = "/monitoring"
+
+
+async def test_get_db_pool(auth_ac_admin: AsyncClient):
+    response = await auth_ac_admin.get(base_url + "/db/pool")
+
+    assert response.status_code == 200
+    assert response.json()["pool_size"] > 0
+    assert response.json()["checked_out"] >= 0
+    assert response.json()["wait_avg_ms"] >= 0
+
+
+async def test_get_db_pool_forbidden(auth_ac_user: AsyncClient):
+    response = await auth_ac_user.get(base_url + "/db/pool")
+
+    assert response.status_code == 403
+    assert response.json()["detail"] == "Don't have permissions"
+
+
+async def test_get_db_replica_not_configured(auth_ac_admin: AsyncClient):
+    response = await auth_ac_admin.get(base_url + "/db/replica")
+
+    assert response.status_code == 200
+    assert response.json()["configured"] is False
+    assert response.json()["healthy"] is False
+
+
+async def test_get_auth_hashing(auth_ac_admin: AsyncClient):
+    response = await auth_ac_admin.get(base_url + "/auth/hashing")
+
+    assert response.status_code == 200
+    assert response.json()["calls"] > 0
+    assert response.json()["pending"] == 0
+    assert response.json()["wait_max_ms"] >= response.json()["wait_avg_ms"] >= 0
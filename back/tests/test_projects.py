@@ -1,7 +1,12 @@
+import uuid
+
 from httpx import AsyncClient
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
 
 from src.apps.crm.models import Project
-from tests.conftest import get_model_uuid
+from src.apps.crm.repositories import ProjectRepository
+from src.apps.crm.schemas import ProjectCreate
+from tests.conftest import engine, get_model_uuid
 
 base_url = "/projects"
 
@@ -56,3 +61,19 @@ async def test_delete_one_project(auth_ac_admin: AsyncClient):
 
     assert response.status_code == 200
     assert response.json()["detail"] == "success"
+
+
+async def test_put_one_project():
+    async_session = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+    async with async_session() as session:
+        project_id = uuid.uuid4()
+        created = await ProjectRepository(session).put_one(project_id, ProjectCreate(title="Put project"))
+        changed = await ProjectRepository(session).put_one(
+            project_id, ProjectCreate(title="Put project", description="Put description")
+        )
+
+    assert created["id"] == project_id
+    assert created["is_active"] is True
+    assert changed["id"] == project_id
+    assert changed["title"] == "Put project"
+    assert changed["description"] == "Put description"
@@ -0,0 +1,139 @@
+import asyncio
+import json
+import asyncpg
+import pytest
+from httpx import AsyncClient
+from starlette.websockets import WebSocketDisconnect
+from config import REALTIME_CHANNEL
+from src.apps.crm.models import Employee, Project
+from src.apps.realtime.hub import RESYNC_EVENT, EventHub, EventListener
+from tests.conftest import DB_HOST, DB_NAME, DB_PASS, DB_PORT, DB_USER, client, get_model_uuid
+
+base_url = "/realtime"
+
+
+async def test_event_hub_fan_out():
+    hub = EventHub(queue_size=2)
+    project1, project2 = hub.subscribe("p1"), hub.subscribe("p2")
+    hub.publish(json.dumps({"entity": "task", "project": "p1", "ids": ["t1"]}))
+    hub.publish(json.dumps({"entity": "employee", "project": None, "ids": ["e1"]}))
+
+    assert json.loads(project1.get_nowait())["ids"] == ["t1"]
+    assert json.loads(project1.get_nowait())["ids"] == ["e1"]
+    assert json.loads(project2.get_nowait())["ids"] == ["e1"]
+    assert project2.empty()
+
+    hub.unsubscribe("p2", project2)
+    assert hub.as_dict()["connections"] == 1
+    assert hub.as_dict()["projects"] == 1
+
+
+async def test_event_hub_slow_subscriber():
+    hub = EventHub(queue_size=2)
+    queue = hub.subscribe("p1")
+    for i in range(3):
+        hub.publish(json.dumps({"entity": "task", "project": "p1", "ids": [str(i)]}))
+
+    assert queue.get_nowait() == RESYNC_EVENT
+    assert queue.empty()
+    assert hub.as_dict()["dropped"] == 2
+
+
+async def test_task_events_notify(auth_ac_admin: AsyncClient):
+    project_id = await get_model_uuid(Project, {"title": "Project1"})
+    employee_id = await get_model_uuid(Employee, {"family": "Admin"})
+    events = asyncio.Queue()
+    conn = await asyncpg.connect(user=DB_USER, password=DB_PASS, host=DB_HOST, port=DB_PORT, database=DB_NAME)
+    await conn.add_listener(REALTIME_CHANNEL, lambda *args: events.put_nowait(json.loads(args[-1])))
+    try:
+        data = {"title": "RealtimeTask", "projects": [str(project_id)], "employees": [], "author_id": str(employee_id)}
+        response = await auth_ac_admin.post("/tasks", json=data)
+        assert response.status_code == 200
+        task_id = response.json()["id"]
+        event = await asyncio.wait_for(events.get(), 5)
+        assert event == {"entity": "task", "action": "create", "project": str(project_id), "ids": [task_id]}
+
+        response = await auth_ac_admin.delete(f"/tasks/{task_id}")
+        assert response.status_code == 200
+        event = await asyncio.wait_for(events.get(), 5)
+        assert event == {"entity": "task", "action": "deactivate", "project": str(project_id), "ids": [task_id]}
+    finally:
+        await conn.close()
+
+
+async def test_ws_invalid_token():
+    project_id = await get_model_uuid(Project, {"title": "Project1"})
+    with pytest.raises(WebSocketDisconnect) as e:
+        with client.websocket_connect(f"{base_url}/projects/{project_id}/ws?token=invalid"):
+            pass
+
+    assert e.value.code == 1008
+
+
+async def test_get_stats(auth_ac_admin: AsyncClient):
+    response = await auth_ac_admin.get(base_url + "/stats")
+
+    assert response.status_code == 200
+    assert response.json()["listening"] is False
+    assert response.json()["connections"] == 0
+
+
+async def test_get_stats_forbidden(auth_ac_user: AsyncClient):
+    response = await auth_ac_user.get(base_url + "/stats")
+
+    assert response.status_code == 403
+    assert response.json()["detail"] == "Don't have permissions"
+
+
+async def test_event_listener_channels():
+    hub = EventHub(queue_size=10)
+    listener = EventListener("", REALTIME_CHANNEL, hub)
+    payloads = []
+    listener.add_channel("other", payloads.append, lambda: None)
+    listener.add_channel("other", payloads.append, lambda: None)
+    listener._on_notify(None, 0, "other", '["id"]')
+
+    assert payloads == ['["id"]', '["id"]']
+    assert hub.events == 0
+
+
+async def test_event_listener_reconnects(monkeypatch):
+    class Connection:
+        def __init__(self, fail: bool):
+            self.fail = fail
+            self.closed = False
+
+        def add_termination_listener(self, callback):
+            pass
+
+        async def add_listener(self, channel, callback):
+            if self.fail:
+                raise asyncpg.exceptions.ConnectionDoesNotExistError("connection was closed")
+
+        async def close(self):
+            self.closed = True
+
+    connections = [Connection(fail=True), Connection(fail=False)]
+
+    opened, resyncs = [], []
+
+    async def connect(dsn):
+        opened.append(dsn)
+        return connections[len(opened) - 1]
+
+    monkeypatch.setattr(asyncpg, "connect", connect)
+    listener = EventListener("dsn", REALTIME_CHANNEL, EventHub(queue_size=10), reconnect_delay=0)
+    listener.add_channel("other", lambda payload: None, lambda: resyncs.append(True))
+    listener.start()
+    try:
+        for _ in range(100):
+            if listener.listening:
+                break
+            await asyncio.sleep(0.01)
+
+        assert listener.listening
+        assert len(opened) == 2
+        assert connections[0].closed
+        assert resyncs == [True]
+    finally:
+        await listener.stop()
@@ -0,0 +1,124 @@
+import uuid
+from httpx import AsyncClient
+from sqlalchemy.ext.asyncio import async_sessionmaker
+from src.apps.crm.models import Employee, Project
+from src.apps.crm.repositories import ProjectRepository
+from src.cache.tags import InvalidatingSession
+from tests.conftest import count_queries, engine, get_model_uuid
+
+base_url = "/sync"
+# user check, SET TRANSACTION READ ONLY, token, tasks, projects, employees
+SYNC_QUERY_BUDGET = 6
+
+
+async def test_sync_all(auth_ac_user: AsyncClient):
+    response = await auth_ac_user.get(base_url)
+
+    assert response.status_code == 200
+    assert response.json()["token"] > 0
+    assert "Project1" in [project["title"] for project in response.json()["projects"]]
+    assert "Admin" in [employee["family"] for employee in response.json()["employees"]]
+    assert "RealtimeTask" not in [task["title"] for task in response.json()["tasks"]]
+    assert response.json()["deleted"] == {"tasks": [], "projects": [], "employees": []}
+
+
+async def test_sync_empty_delta(auth_ac_user: AsyncClient):
+    token = (await auth_ac_user.get(base_url)).json()["token"]
+    with count_queries() as statements:
+        response = await auth_ac_user.get(base_url, params={"since": token})
+
+    assert response.status_code == 200
+    assert response.json()["token"] >= token
+    assert response.json()["tasks"] == []
+    assert response.json()["projects"] == []
+    assert response.json()["employees"] == []
+    assert len(statements) <= SYNC_QUERY_BUDGET, statements
+
+
+async def test_sync_changes(auth_ac_admin: AsyncClient):
+    project_id = str(await get_model_uuid(Project, {"title": "Project1"}))
+    employee_id = str(await get_model_uuid(Employee, {"family": "Admin"}))
+    token = (await auth_ac_admin.get(base_url)).json()["token"]
+
+    data = {"title": "SyncTask", "projects": [project_id], "employees": [], "author_id": employee_id}
+    task_id = (await auth_ac_admin.post("/tasks", json=data)).json()["id"]
+    await auth_ac_admin.patch("/projects/bulk", json=[{"id": project_id, "description": "Synced"}])
+    response = await auth_ac_admin.get(base_url, params={"since": token})
+
+    assert response.status_code == 200
+    assert [task["id"] for task in response.json()["tasks"]] == [task_id]
+    assert [project["description"] for project in response.json()["projects"]] == ["Synced"]
+    assert response.json()["employees"] == []
+
+    token = response.json()["token"]
+    await auth_ac_admin.patch(f"/tasks/{task_id}", json={"employees": [employee_id]})
+    response = await auth_ac_admin.get(base_url, params={"since": token})
+
+    assert [task["employees"][0]["id"] for task in response.json()["tasks"]] == [employee_id]
+
+    token = response.json()["token"]
+    await auth_ac_admin.delete(f"/tasks/{task_id}")
+    response = await auth_ac_admin.get(base_url, params={"since": token})
+
+    assert response.json()["tasks"] == []
+    assert response.json()["deleted"]["tasks"] == [task_id]
+
+
+async def test_sync_pages(auth_ac_user: AsyncClient):
+    full = (await auth_ac_user.get(base_url)).json()
+    pages, params = [], {"limit": 1}
+    while True:
+        response = await auth_ac_user.get(base_url, params=params)
+        assert response.status_code == 200
+        pages.append(response.json())
+        if response.json()["next_cursor"] is None:
+            break
+        params = {"limit": 1, "cursor": response.json()["next_cursor"]}
+
+    assert len(pages) == max(len(full["tasks"]), len(full["projects"]), len(full["employees"]))
+    assert {page["token"] for page in pages} == {pages[0]["token"]}
+    for name in ("tasks", "projects", "employees"):
+        assert all(len(page[name]) <= 1 for page in pages)
+        assert sorted(item["id"] for page in pages for item in page[name]) == sorted(item["id"] for item in full[name])
+
+
+async def test_sync_invalid_cursor(auth_ac_user: AsyncClient):
+    for cursor in ("invalid", "e30", "eyJ0b2tlbiI6MX0"):
+        response = await auth_ac_user.get(base_url, params={"cursor": cursor})
+
+        assert response.status_code == 400
+
+
+async def test_sync_skips_rank_moves(auth_ac_admin: AsyncClient):
+    project_id = str(await get_model_uuid(Project, {"title": "Project1"}))
+    employee_id = str(await get_model_uuid(Employee, {"family": "Admin"}))
+    data = {"title": "SyncRankTask", "projects": [project_id], "employees": [], "author_id": employee_id}
+    task_id = (await auth_ac_admin.post("/tasks", json=data)).json()["id"]
+    token = (await auth_ac_admin.get(base_url)).json()["token"]
+
+    await auth_ac_admin.patch(f"/tasks/{task_id}/move", json={"project_id": project_id})
+    response = await auth_ac_admin.get(base_url, params={"since": token})
+
+    assert response.json()["tasks"] == []
+
+    await auth_ac_admin.patch(f"/tasks/{task_id}/move", json={"project_id": project_id, "status": "В работе"})
+    response = await auth_ac_admin.get(base_url, params={"since": token})
+
+    assert [task["id"] for task in response.json()["tasks"]] == [task_id]
+    await auth_ac_admin.delete(f"/tasks/{task_id}")
+
+
+async def test_sync_project_delete(auth_ac_admin: AsyncClient):
+    project_id = (await auth_ac_admin.post("/projects", json={"title": "SyncDeletedProject"})).json()["id"]
+    employee_id = str(await get_model_uuid(Employee, {"family": "Admin"}))
+    data = {"title": "SyncProjectTask", "projects": [project_id], "employees": [], "author_id": employee_id}
+    task_id = (await auth_ac_admin.post("/tasks", json=data)).json()["id"]
+    token = (await auth_ac_admin.get(base_url)).json()["token"]
+
+    # the links are deleted by the cascade
+    async with async_sessionmaker(engine, class_=InvalidatingSession, expire_on_commit=False)() as session:
+        assert await ProjectRepository(session).delete_one(uuid.UUID(project_id)) == {"detail": "success"}
+    response = await auth_ac_admin.get(base_url, params={"since": token})
+
+    assert [(task["id"], task["projects"]) for task in response.json()["tasks"]] == [(task_id, [])]
+    await auth_ac_admin.delete(f"/tasks/{task_id}")
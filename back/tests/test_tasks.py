@@ -1,9 +1,33 @@
+import asyncio
+import uuid
+from fastapi_cache import FastAPICache
 from httpx import AsyncClient
-
-from src.apps.crm.models import Department, Project, Employee, Task
-from tests.conftest import get_model_uuid
+from redis import asyncio as aioredis
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from src.apps.crm.models import Department, Project, Employee, Task, TaskStatus, task_project
+from src.apps.crm.repositories import TaskRepository
+from src.base_utils.base_rank import rank_between, ranks_between
+from src.cache.backend import TaggedRedisBackend
+from src.cache.coders import get_coder
+from src.cache import decorator
+from src.cache.decorator import _refreshing
+from src.cache.keys import request_key_builder
+from src.cache.stats import CACHE_STATUS_HEADER
+from tests.conftest import count_queries, engine, get_model_uuid
 
 base_url = "/tasks"
+# user check, projects, employees, task insert, task_project insert, task_employee insert, notify
+ADD_QUERY_BUDGET = 7
+# user check, SET TRANSACTION READ ONLY, tasks, projects, employees
+LIST_QUERY_BUDGET = 5
+# user check, SET TRANSACTION READ ONLY, task with author, projects, employees
+ONE_QUERY_BUDGET = 5
+# user check, SET TRANSACTION READ ONLY, board
+BOARD_QUERY_BUDGET = 3
+# user check, permission check, update, statuses of the links, notify
+TRANSITION_QUERY_BUDGET = 5
 
 
 async def test_init_employee_admin(auth_ac_admin: AsyncClient):
@@ -44,6 +68,43 @@ async def test_add_one_task(auth_ac_admin: AsyncClient):
     assert response.json()["title"] == data["title"]
 
 
+async def test_add_one_task_query_budget(auth_ac_admin: AsyncClient):
+    project_ids = [str(await get_model_uuid(Project, {"title": title})) for title in ("Project1", "Project2")]
+    employee_ids = [str(await get_model_uuid(Employee, {"family": family})) for family in ("Admin", "User")]
+    data = {"title": "BudgetTask", "projects": project_ids, "employees": employee_ids, "author_id": employee_ids[0]}
+    with count_queries() as statements:
+        response = await auth_ac_admin.post(base_url, json=data)
+
+    assert response.status_code == 200
+    assert [project["id"] for project in response.json()["projects"]] == project_ids
+    assert [employee["id"] for employee in response.json()["employees"]] == employee_ids
+    assert len(statements) <= ADD_QUERY_BUDGET, statements
+
+
+async def test_edit_one_task_links_diff(auth_ac_admin: AsyncClient):
+    uuid = str(await get_model_uuid(Task, {"title": "BudgetTask"}))
+    employee_id = str(await get_model_uuid(Employee, {"family": "User"}))
+    data = {"employees": [employee_id]}
+    response = await auth_ac_admin.patch(base_url + "/" + uuid, json=data)
+
+    assert response.status_code == 200
+    assert [employee["id"] for employee in response.json()["employees"]] == [employee_id]
+    assert len(response.json()["projects"]) == 2
+
+    response = await auth_ac_admin.delete(base_url + "/" + uuid)
+    assert response.status_code == 200
+
+
+async def test_add_one_task_invalid_project(auth_ac_admin: AsyncClient):
+    employee_id = str(await get_model_uuid(Employee, {"family": "Admin"}))
+    missing_uuid = "00000000-0000-0000-0000-000000000000"
+    data = {"title": "InvalidTask", "projects": [missing_uuid], "employees": [employee_id], "author_id": employee_id}
+    response = await auth_ac_admin.post(base_url, json=data)
+
+    assert response.status_code == 404
+    assert response.json()["detail"] == "Not found"
+
+
 async def test_get_list_tasks(auth_ac_user: AsyncClient):
     response = await auth_ac_user.get(base_url)
 
@@ -60,6 +121,24 @@ async def test_get_one_task(auth_ac_user: AsyncClient):
     assert response.json()["id"] == uuid
 
 
+async def test_get_list_tasks_query_budget(auth_ac_user: AsyncClient):
+    with count_queries() as statements:
+        response = await auth_ac_user.get(base_url)
+
+    assert response.status_code == 200
+    assert len(statements) <= LIST_QUERY_BUDGET, statements
+
+
+async def test_get_one_task_query_budget(auth_ac_user: AsyncClient):
+    uuid = str(await get_model_uuid(Task, {"title": "Task1"}))
+    with count_queries() as statements:
+        response = await auth_ac_user.get(base_url + "/" + uuid)
+
+    assert response.status_code == 200
+    assert response.json()["author"]["id"] is not None
+    assert len(statements) <= ONE_QUERY_BUDGET, statements
+
+
 async def test_edit_one_task(auth_ac_admin: AsyncClient):
     project_1_id = str(await get_model_uuid(Project, {"title": "Project1"}))
     project_2_id = str(await get_model_uuid(Project, {"title": "Project2"}))
@@ -115,3 +194,451 @@ async def test_delete_one_task_my(auth_ac_user: AsyncClient):
 
     assert response.status_code == 200
     assert response.json()["detail"] == "success"
+
+
+async def test_add_many_tasks(auth_ac_admin: AsyncClient):
+    project_id = str(await get_model_uuid(Project, {"title": "Project1"}))
+    employee_id = str(await get_model_uuid(Employee, {"family": "Admin"}))
+    missing_uuid = "00000000-0000-0000-0000-000000000000"
+    data = [
+        {"title": "BulkTask1", "projects": [project_id], "employees": [employee_id], "author_id": employee_id},
+        {"title": "BulkTask2", "projects": [missing_uuid], "employees": [employee_id], "author_id": employee_id},
+    ]
+    response = await auth_ac_admin.post(base_url + "/bulk", json=data)
+
+    assert response.status_code == 200
+    assert response.json()["items"][0]["title"] == "BulkTask1"
+    assert response.json()["items"][0]["projects"][0]["id"] == project_id
+    assert response.json()["items"][0]["employees"][0]["id"] == employee_id
+    assert response.json()["errors"] == [{"index": 1, "id": None, "detail": f"Not found: {missing_uuid}"}]
+
+
+async def test_edit_many_tasks(auth_ac_admin: AsyncClient):
+    uuid = str(await get_model_uuid(Task, {"title": "BulkTask1"}))
+    data = [{"id": uuid, "status": "В работе"}]
+    response = await auth_ac_admin.patch(base_url + "/bulk", json=data)
+
+    assert response.status_code == 200
+    assert response.json()["items"][0]["status"] == "В работе"
+    assert response.json()["items"][0]["title"] == "BulkTask1"
+
+
+async def test_get_board(auth_ac_user: AsyncClient):
+    project_id = str(await get_model_uuid(Project, {"title": "Project1"}))
+    employee_id = str(await get_model_uuid(Employee, {"family": "Admin"}))
+    with count_queries() as statements:
+        response = await auth_ac_user.get(f"/projects/{project_id}/board", params={"limit": 1})
+
+    assert response.status_code == 200
+    assert response.json()["project_id"] == project_id
+    columns = {column["status"]: column for column in response.json()["columns"]}
+    assert list(columns) == ["Запланировано", "В работе", "На проверке", "Завершено"]
+    assert [task["title"] for task in columns["В работе"]["tasks"]] == ["BulkTask1"]
+    assert columns["В работе"]["tasks"][0]["employees"] == [employee_id]
+    assert all(len(column["tasks"]) <= 1 for column in columns.values())
+    assert all(column["total"] >= len(column["tasks"]) for column in columns.values())
+    assert len(statements) <= BOARD_QUERY_BUDGET, statements
+
+
+async def test_get_board_column_filters(auth_ac_user: AsyncClient):
+    project_id = str(await get_model_uuid(Project, {"title": "Project1"}))
+    employee_id = str(await get_model_uuid(Employee, {"family": "Admin"}))
+    url = f"/projects/{project_id}/board"
+    params = {"status": "В работе", "employee_id": employee_id}
+    response = await auth_ac_user.get(url, params=params)
+
+    assert response.status_code == 200
+    assert response.json()["columns"][0]["total"] == 1
+    assert response.json()["columns"][0]["tasks"][0]["title"] == "BulkTask1"
+
+    response = await auth_ac_user.get(url, params={**params, "skip": 1})
+
+    assert response.json()["columns"] == [{"status": "В работе", "total": 1, "tasks": []}]
+
+    response = await auth_ac_user.get(url, params={**params, "priority": "Высокий приоритет"})
+
+    assert response.json()["columns"] == [{"status": "В работе", "total": 0, "tasks": []}]
+
+
+async def test_get_board_not_found(auth_ac_user: AsyncClient):
+    response = await auth_ac_user.get("/projects/00000000-0000-0000-0000-000000000000/board")
+
+    assert response.status_code == 404
+
+
+async def test_get_board_deactivated_task(auth_ac_admin: AsyncClient):
+    project_id = str(await get_model_uuid(Project, {"title": "Project1"}))
+    employee_id = str(await get_model_uuid(Employee, {"family": "Admin"}))
+    url = f"/projects/{project_id}/board"
+    params = {"status": "Запланировано", "limit": 100}
+    total = (await auth_ac_admin.get(url, params=params)).json()["columns"][0]["total"]
+    data = {"title": "BoardInactiveTask", "projects": [project_id], "employees": [], "author_id": employee_id}
+    task_id = (await auth_ac_admin.post(base_url, json=data)).json()["id"]
+
+    column = (await auth_ac_admin.get(url, params=params)).json()["columns"][0]
+    assert column["total"] == total + 1
+    assert task_id in [task["id"] for task in column["tasks"]]
+
+    await auth_ac_admin.delete(f"{base_url}/{task_id}")
+
+    column = (await auth_ac_admin.get(url, params=params)).json()["columns"][0]
+    assert column["total"] == total
+    assert task_id not in [task["id"] for task in column["tasks"]]
+
+
+async def test_transition_tasks_not_author(auth_ac_user: AsyncClient):
+    uuid = str(await get_model_uuid(Task, {"title": "BulkTask1"}))
+    response = await auth_ac_user.post(base_url + "/transition", json={"ids": [uuid], "status": "На проверке"})
+
+    assert response.status_code == 403
+
+
+async def test_transition_tasks_not_found(auth_ac_admin: AsyncClient):
+    uuid = str(await get_model_uuid(Task, {"title": "BulkTask1"}))
+    inactive_uuid = str(await get_model_uuid(Task, {"title": "BudgetTask"}))
+    data = {"ids": [uuid, inactive_uuid], "status": "На проверке"}
+    response = await auth_ac_admin.post(base_url + "/transition", json=data)
+
+    assert response.status_code == 404
+    assert response.json()["detail"] == f"Not found: {inactive_uuid}"
+
+
+async def test_transition_tasks(auth_ac_admin: AsyncClient):
+    uuid = str(await get_model_uuid(Task, {"title": "BulkTask1"}))
+    data = {"ids": [uuid, uuid], "status": "На проверке"}
+    with count_queries() as statements:
+        response = await auth_ac_admin.post(base_url + "/transition", json=data)
+
+    assert response.status_code == 200
+    assert response.json()["ids"] == [uuid]
+    assert response.json()["status"] == "На проверке"
+    assert len(statements) <= TRANSITION_QUERY_BUDGET, statements
+
+    response = await auth_ac_admin.post(base_url + "/transition", json=data)
+
+    assert response.status_code == 200
+    assert response.json()["ids"] == []
+
+
+async def get_column_titles(ac: AsyncClient, status: str, project_id: str = None) -> list:
+    project_id = project_id or str(await get_model_uuid(Project, {"title": "Project1"}))
+    response = await ac.get(f"/projects/{project_id}/board", params={"status": status})
+    return [task["title"] for task in response.json()["columns"][0]["tasks"]]
+
+
+def test_rank_between():
+    assert "0" < rank_between(None, "1") < "1"
+    assert "1" < rank_between("1", "2") < "2"
+    assert "1" < rank_between("1", "1V") < "1V"
+    assert "z" < rank_between("z", None)
+    assert not rank_between("1", "11").endswith("0")
+
+
+def test_ranks_between():
+    ranks = ranks_between("1", "2", 7)
+
+    assert len(set(ranks)) == 7
+    assert ["1", *ranks, "2"] == sorted(["1", *ranks, "2"])
+    assert max(map(len, ranks)) <= 4
+    assert ranks_between(None, None, 0) == []
+
+
+async def test_move_one_task(auth_ac_admin: AsyncClient):
+    project_id = str(await get_model_uuid(Project, {"title": "Project1"}))
+    employee_id = str(await get_model_uuid(Employee, {"family": "Admin"}))
+    for title in ("RankTask1", "RankTask2"):
+        data = {
+            "title": title,
+            "status": "На проверке",
+            "projects": [project_id],
+            "employees": [],
+            "author_id": employee_id,
+        }
+        await auth_ac_admin.post(base_url, json=data)
+    bulk_id = str(await get_model_uuid(Task, {"title": "BulkTask1"}))
+    rank_1_id = str(await get_model_uuid(Task, {"title": "RankTask1"}))
+    rank_2_id = str(await get_model_uuid(Task, {"title": "RankTask2"}))
+
+    assert await get_column_titles(auth_ac_admin, "На проверке") == ["BulkTask1", "RankTask1", "RankTask2"]
+
+    data = {"project_id": project_id, "next_id": bulk_id}
+    response = await auth_ac_admin.patch(f"{base_url}/{rank_2_id}/move", json=data)
+
+    assert response.status_code == 200
+    assert response.json()["id"] == rank_2_id
+    assert await get_column_titles(auth_ac_admin, "На проверке") == ["RankTask2", "BulkTask1", "RankTask1"]
+
+    data = {"project_id": project_id, "prev_id": bulk_id, "next_id": rank_1_id}
+    response = await auth_ac_admin.patch(f"{base_url}/{rank_2_id}/move", json=data)
+
+    assert response.status_code == 200
+    assert await get_column_titles(auth_ac_admin, "На проверке") == ["BulkTask1", "RankTask2", "RankTask1"]
+
+    data = {"project_id": project_id, "status": "Завершено"}
+    response = await auth_ac_admin.patch(f"{base_url}/{bulk_id}/move", json=data)
+
+    assert response.status_code == 200
+    assert response.json()["status"] == "Завершено"
+    assert await get_column_titles(auth_ac_admin, "Завершено") == ["BulkTask1"]
+
+    data = {"project_id": project_id, "status": "На проверке", "prev_id": rank_2_id, "next_id": rank_1_id}
+    response = await auth_ac_admin.patch(f"{base_url}/{bulk_id}/move", json=data)
+
+    assert response.status_code == 200
+    assert await get_column_titles(auth_ac_admin, "На проверке") == ["RankTask2", "BulkTask1", "RankTask1"]
+
+
+async def test_move_one_task_invalid_neighbors(auth_ac_admin: AsyncClient):
+    project_id = str(await get_model_uuid(Project, {"title": "Project1"}))
+    rank_1_id = str(await get_model_uuid(Task, {"title": "RankTask1"}))
+    rank_2_id = str(await get_model_uuid(Task, {"title": "RankTask2"}))
+    data = {"project_id": project_id, "prev_id": rank_1_id, "next_id": rank_2_id}
+    response = await auth_ac_admin.patch(f"{base_url}/{rank_2_id}/move", json=data)
+
+    assert response.status_code == 400
+
+    bulk_id = str(await get_model_uuid(Task, {"title": "BulkTask1"}))
+    data = {"project_id": project_id, "prev_id": rank_1_id, "next_id": rank_2_id}
+    response = await auth_ac_admin.patch(f"{base_url}/{bulk_id}/move", json=data)
+
+    assert response.status_code == 400
+    assert response.json()["detail"] == "Previous task must be above the next task"
+
+    data = {"project_id": project_id, "status": "В работе", "prev_id": rank_1_id}
+    response = await auth_ac_admin.patch(f"{base_url}/{bulk_id}/move", json=data)
+
+    assert response.status_code == 400
+    assert response.json()["detail"] == "Neighbor tasks must be in the target column"
+
+    other_project_id = str(await get_model_uuid(Project, {"title": "Project2"}))
+    data = {"project_id": other_project_id, "prev_id": rank_1_id}
+    response = await auth_ac_admin.patch(f"{base_url}/{bulk_id}/move", json=data)
+
+    assert response.status_code == 404
+
+
+async def test_move_one_task_not_author(auth_ac_user: AsyncClient):
+    project_id = str(await get_model_uuid(Project, {"title": "Project1"}))
+    rank_1_id = str(await get_model_uuid(Task, {"title": "RankTask1"}))
+    response = await auth_ac_user.patch(f"{base_url}/{rank_1_id}/move", json={"project_id": project_id})
+
+    assert response.status_code == 403
+
+
+async def test_move_one_task_tied_ranks(auth_ac_admin: AsyncClient):
+    project_id = await get_model_uuid(Project, {"title": "Project1"})
+    rank_1_id = await get_model_uuid(Task, {"title": "RankTask1"})
+    rank_2_id = await get_model_uuid(Task, {"title": "RankTask2"})
+    bulk_id = await get_model_uuid(Task, {"title": "BulkTask1"})
+    async_session = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+    async with async_session() as session:
+        stmt = (
+            update(task_project)
+            .where(task_project.c.project_id == project_id, task_project.c.task_id.in_([rank_2_id, bulk_id]))
+            .values(rank="1")
+        )
+        await session.execute(stmt)
+        await session.commit()
+        other_ranks = await get_link_ranks(session, task_project.c.rank != "1")
+    first, second = sorted([str(rank_2_id), str(bulk_id)])
+    data = {"project_id": str(project_id), "prev_id": first, "next_id": second}
+    response = await auth_ac_admin.patch(f"{base_url}/{rank_1_id}/move", json=data)
+
+    assert response.status_code == 200
+    titles = await get_column_titles(auth_ac_admin, "На проверке")
+    assert titles.index("RankTask1") == 1
+    # only the tied tasks and the moved task got new ranks
+    async with async_session() as session:
+        ranks = await get_link_ranks(session)
+    assert {i for i in other_ranks if ranks[i] != other_ranks[i]} == {(project_id, rank_1_id)}
+
+
+async def get_link_ranks(session: AsyncSession, *filters) -> dict:
+    stmt = select(task_project.c.project_id, task_project.c.task_id, task_project.c.rank).where(*filters)
+    return {(project_id, task_id): rank for project_id, task_id, rank in await session.execute(stmt)}
+
+
+async def test_move_one_task_other_project(auth_ac_admin: AsyncClient):
+    project_1_id = str(await get_model_uuid(Project, {"title": "Project1"}))
+    project_2_id = str(await get_model_uuid(Project, {"title": "Project2"}))
+    employee_id = str(await get_model_uuid(Employee, {"family": "Admin"}))
+    ids = []
+    for title in ("OtherRankTask1", "OtherRankTask2"):
+        data = {"title": title, "projects": [project_1_id, project_2_id], "employees": [], "author_id": employee_id}
+        ids.append((await auth_ac_admin.post(base_url, json=data)).json()["id"])
+    titles = await get_column_titles(auth_ac_admin, "Запланировано", project_2_id)
+
+    data = {"project_id": project_1_id, "next_id": ids[0]}
+    response = await auth_ac_admin.patch(f"{base_url}/{ids[1]}/move", json=data)
+
+    assert response.status_code == 200
+    column = await get_column_titles(auth_ac_admin, "Запланировано", project_1_id)
+    assert column.index("OtherRankTask2") < column.index("OtherRankTask1")
+    # ranks are kept per project
+    assert await get_column_titles(auth_ac_admin, "Запланировано", project_2_id) == titles
+
+    await auth_ac_admin.post(base_url + "/transition", json={"ids": ids, "status": "В работе"})
+
+    column = await get_column_titles(auth_ac_admin, "В работе", project_2_id)
+    assert [title for title in column if title.startswith("OtherRankTask")] == ["OtherRankTask1", "OtherRankTask2"]
+    await auth_ac_admin.post(base_url + "/bulk/delete", json={"ids": ids})
+
+
+async def test_rebalance_long_ranks():
+    async_session = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+    project_id = await get_model_uuid(Project, {"title": "Project1"})
+    async with async_session() as session:
+        titles = await get_column_titles_by_rank(session, project_id)
+        columns = await TaskRepository(session).rebalance_long_ranks(0)
+
+        assert (project_id, TaskStatus.done) in columns
+        assert await get_column_titles_by_rank(session, project_id) == titles
+
+
+async def get_column_titles_by_rank(session: AsyncSession, project_id: uuid.UUID) -> list:
+    stmt = (
+        select(Task.title)
+        .join(task_project, task_project.c.task_id == Task.id)
+        .where(task_project.c.project_id == project_id, task_project.c.status == TaskStatus.done)
+        .order_by(task_project.c.rank, task_project.c.task_id)
+    )
+    return list(await session.scalars(stmt))
+
+
+async def test_delete_many_tasks(auth_ac_admin: AsyncClient):
+    uuid = str(await get_model_uuid(Task, {"title": "BulkTask1"}))
+    response = await auth_ac_admin.post(base_url + "/bulk/delete", json={"ids": [uuid]})
+
+    assert response.status_code == 200
+    assert response.json()["ids"] == [uuid]
+    assert response.json()["errors"] == []
+
+
+async def test_write_evicts_cached_response(auth_ac_admin: AsyncClient):
+    project_id = str(await get_model_uuid(Project, {"title": "Project1"}))
+    employee_id = str(await get_model_uuid(Employee, {"family": "Admin"}))
+    data = {"title": "CachedTask", "projects": [project_id], "employees": [], "author_id": employee_id}
+    task_id = (await auth_ac_admin.post("/tasks", json=data)).json()["id"]
+    redis = aioredis.from_url("redis://localhost")
+    prefix = f"test-{uuid.uuid4()}"
+    backend = FastAPICache.get_backend()
+    FastAPICache.reset()
+    FastAPICache.init(
+        TaggedRedisBackend(redis, 60),
+        prefix=prefix,
+        coder=get_coder("orjson", "zlib", threshold=0),
+        key_builder=request_key_builder,
+        cache_status_header=CACHE_STATUS_HEADER,
+    )
+    try:
+        await auth_ac_admin.get(f"/tasks/{task_id}")
+        await auth_ac_admin.get(f"/projects/{project_id}/board")
+        response = await auth_ac_admin.get(f"/tasks/{task_id}")
+        assert response.headers[CACHE_STATUS_HEADER] == "HIT"
+        assert response.json()["title"] == "CachedTask"
+        assert response.json()["projects"][0]["id"] == project_id
+        assert (await auth_ac_admin.get(f"/projects/{project_id}/board")).headers[CACHE_STATUS_HEADER] == "HIT"
+
+        await auth_ac_admin.patch(f"/tasks/{task_id}", json={"title": "CachedTaskEdited"})
+        response = await auth_ac_admin.get(f"/tasks/{task_id}")
+        board = await auth_ac_admin.get(f"/projects/{project_id}/board")
+
+        assert response.headers[CACHE_STATUS_HEADER] == "MISS"
+        assert response.json()["title"] == "CachedTaskEdited"
+        assert board.headers[CACHE_STATUS_HEADER] == "MISS"
+    finally:
+        await redis.delete(*[key async for key in redis.scan_iter(f"{prefix}:*")] or ["none"])
+        await redis.close()
+        FastAPICache.reset()
+        FastAPICache.init(backend, key_builder=request_key_builder)
+        await auth_ac_admin.delete(f"/tasks/{task_id}")
+
+
+async def test_stale_response_refreshed(auth_ac_admin: AsyncClient):
+    project_id = str(await get_model_uuid(Project, {"title": "Project1"}))
+    employee_id = str(await get_model_uuid(Employee, {"family": "Admin"}))
+    data = {"title": "StaleTask", "projects": [project_id], "employees": [], "author_id": employee_id}
+    task_id = (await auth_ac_admin.post("/tasks", json=data)).json()["id"]
+    redis = aioredis.from_url("redis://localhost")
+    prefix = f"test-{uuid.uuid4()}"
+    backend = FastAPICache.get_backend()
+    FastAPICache.reset()
+    FastAPICache.init(
+        TaggedRedisBackend(redis, 60),
+        prefix=prefix,
+        coder=get_coder("orjson", "zlib", threshold=0),
+        key_builder=request_key_builder,
+        cache_status_header=CACHE_STATUS_HEADER,
+    )
+    try:
+        await auth_ac_admin.get(f"/tasks/{task_id}")
+        (key,) = [key async for key in redis.scan_iter(f"{prefix}::src.apps.crm.routers.tasks.get_one:*")]
+        await redis.expire(key, 10)
+        # the change is not evicted, only the refresh can show it
+        async with engine.begin() as conn:
+            await conn.execute(update(Task).where(Task.id == task_id).values(title="StaleTaskEdited"))
+
+        response = await auth_ac_admin.get(f"/tasks/{task_id}")
+        assert response.headers[CACHE_STATUS_HEADER] == "STALE"
+        assert response.json()["title"] == "StaleTask"
+
+        await asyncio.gather(*_refreshing.values())
+        response = await auth_ac_admin.get(f"/tasks/{task_id}")
+        assert response.headers[CACHE_STATUS_HEADER] == "HIT"
+        assert response.json()["title"] == "StaleTaskEdited"
+        assert await redis.ttl(key) > 60
+    finally:
+        await redis.delete(*[key async for key in redis.scan_iter(f"{prefix}:*")] or ["none"])
+        await redis.close()
+        FastAPICache.reset()
+        FastAPICache.init(backend, key_builder=request_key_builder)
+        await auth_ac_admin.delete(f"/tasks/{task_id}")
+
+
+async def test_misses_after_eviction_read_from_primary(auth_ac_admin: AsyncClient, monkeypatch):
+    project_id = str(await get_model_uuid(Project, {"title": "Project1"}))
+    employee_id = str(await get_model_uuid(Employee, {"family": "Admin"}))
+    data = {"title": "ReplicaTask", "projects": [project_id], "employees": [], "author_id": employee_id}
+    task_id = (await auth_ac_admin.post("/tasks", json=data)).json()["id"]
+    redis = aioredis.from_url("redis://localhost")
+    prefix = f"test-{uuid.uuid4()}"
+    backend = FastAPICache.get_backend()
+    tagged = TaggedRedisBackend(redis, 60, replica_window=5)
+    FastAPICache.reset()
+    FastAPICache.init(tagged, prefix=prefix, key_builder=request_key_builder, cache_status_header=CACHE_STATUS_HEADER)
+    # the read sessions of the tests play the replica
+    primary_sessions = []
+    primary_maker = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+
+    def primary_read_session():
+        primary_sessions.append(primary_maker())
+        return primary_sessions[-1]
+
+    monkeypatch.setattr(decorator, "replica_engine", engine)
+    monkeypatch.setattr(decorator, "primary_read_session_maker", primary_read_session)
+    try:
+        assert (await auth_ac_admin.get(f"/tasks/{task_id}")).headers[CACHE_STATUS_HEADER] == "MISS"
+        assert (await auth_ac_admin.get(f"/tasks/{task_id}")).headers[CACHE_STATUS_HEADER] == "HIT"
+        assert primary_sessions == []
+
+        await auth_ac_admin.patch(f"/tasks/{task_id}", json={"title": "ReplicaTaskEdited"})
+        assert 0 < await redis.pttl(tagged.evicted_key()) <= 5000
+        response = await auth_ac_admin.get(f"/tasks/{task_id}")
+        assert response.headers[CACHE_STATUS_HEADER] == "MISS"
+        assert response.json()["title"] == "ReplicaTaskEdited"
+        assert len(primary_sessions) == 1
+        assert (await auth_ac_admin.get(f"/tasks/{task_id}")).headers[CACHE_STATUS_HEADER] == "HIT"
+
+        # the eviction happens while the replica is read, the result is not cached
+        await redis.delete(*[key async for key in redis.scan_iter(f"{prefix}::*get_one*")])
+        evictions = iter([False, True])
+        monkeypatch.setattr(tagged, "recently_evicted", lambda: asyncio.sleep(0, next(evictions, False)))
+        assert (await auth_ac_admin.get(f"/tasks/{task_id}")).headers[CACHE_STATUS_HEADER] == "MISS"
+        assert (await auth_ac_admin.get(f"/tasks/{task_id}")).headers[CACHE_STATUS_HEADER] == "MISS"
+        assert len(primary_sessions) == 1
+    finally:
+        await redis.delete(*[key async for key in redis.scan_iter(f"{prefix}:*")] or ["none"])
+        await redis.close()
+        FastAPICache.reset()
+        FastAPICache.init(backend, key_builder=request_key_builder)
+        await auth_ac_admin.delete(f"/tasks/{task_id}")
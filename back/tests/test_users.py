@@ -1,7 +1,12 @@
+import asyncio
+import json
+import asyncpg
 from httpx import AsyncClient
 
+from config import PRINCIPAL_CHANNEL
 from src.apps.auth.models import User
-from tests.conftest import get_model_uuid
+from src.apps.auth.refresh import refresh_tokens
+from tests.conftest import DB_HOST, DB_NAME, DB_PASS, DB_PORT, DB_USER, get_model_uuid
 
 base_url = "/users"
 
@@ -113,13 +118,39 @@ async def test_return_user(auth_ac_admin: AsyncClient):
     assert response.json()["id"] == uuid
 
 
-async def test_delete_me(auth_ac_user: AsyncClient):
-    uuid_url = base_url + "/me/"
-    response = await auth_ac_user.delete(uuid_url)
+async def test_edit_user_notifies_principal_evictions(auth_ac_admin: AsyncClient):
+    uuid = str(await get_model_uuid(User, {"email": "user@user.com"}))
+    evictions = asyncio.Queue()
+    conn = await asyncpg.connect(user=DB_USER, password=DB_PASS, host=DB_HOST, port=DB_PORT, database=DB_NAME)
+    await conn.add_listener(PRINCIPAL_CHANNEL, lambda *args: evictions.put_nowait(json.loads(args[-1])))
+    try:
+        response = await auth_ac_admin.patch(base_url + "/" + uuid, json={"email": "user@user.com"})
+        assert response.status_code == 200
+        [[user_id, version]] = await asyncio.wait_for(evictions.get(), 5)
+        assert user_id == uuid
+        assert version > 0
+    finally:
+        await conn.close()
+
+
+async def test_delete_me_revokes_refresh_tokens(auth_ac: AsyncClient):
+    data = {"email": "user@user.com", "password": "12345"}
+    tokens = (await auth_ac.post("/access", json=data)).json()
+    user_id = await get_model_uuid(User, {"email": "user@user.com"})
+
+    assert await refresh_tokens.redis.exists(refresh_tokens.user_key(user_id)) == 1
+
+    headers = {"Authorization": f"Bearer {tokens['access_token']}"}
+    response = await auth_ac.delete(base_url + "/me/", headers=headers)
 
     assert response.status_code == 200
     assert response.json()["detail"] == "success"
 
+    response = await auth_ac.post("/refresh", json={"refresh_token": tokens["refresh_token"]})
+
+    assert response.status_code == 401
+    assert await refresh_tokens.redis.exists(refresh_tokens.user_key(user_id)) == 0
+
 
 async def test_get_one_user_inactive(auth_ac_admin: AsyncClient):
     uuid = str(await get_model_uuid(User, {"email": "user@user.com"}))